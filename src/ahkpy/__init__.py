@@ -19,24 +19,24 @@ except ModuleNotFoundError:
     del _shim
 
 
+import importlib as _importlib
+import sys as _sys
+
+# The modules that are needed to register the hotkeys are imported eagerly.
+# So are the modules that have a function of the same name, because importing
+# them later would replace the function with the module.
 from .hotkey_context import *  # noqa: F401 F403
 
 from .block_input import *  # noqa: F401 F403
-from .clipboard import *  # noqa: F401 F403
 from .exceptions import *  # noqa: F401 F403
 from .flow import *  # noqa: F401 F403
 from .hotkey import *  # noqa: F401 F403
 from .hotstring import *  # noqa: F401 F403
 from .key_state import *  # noqa: F401 F403
-from .menu import *  # noqa: F401 F403
 from .message_box import *  # noqa: F401 F403
-from .mouse import *  # noqa: F401 F403
 from .remap_key import *  # noqa: F401 F403
 from .sending import *  # noqa: F401 F403
 from .settings import *  # noqa: F401 F403
-from .timer import *  # noqa: F401 F403
-from .tooltip import *  # noqa: F401 F403
-from .window import *  # noqa: F401 F403
 from .window_message import *  # noqa: F401 F403
 
 # Override modules with functions
@@ -44,4 +44,64 @@ hotkey = default_context.hotkey  # noqa: F405
 remap_key = default_context.remap_key  # noqa: F405
 hotstring = default_context.hotstring  # noqa: F405
 
+# The public names of the modules that are imported on the first access to
+# any of them, so that the scripts don't pay for the modules they don't use.
+# Must be kept in sync with the __all__ lists of the modules.
+_LAZY_MODULES = {
+    "clipboard": [
+        "ClipboardHandler", "ClipboardHistory", "ClipboardSnapshot", "clipboard_snapshot", "get_clipboard",
+        "get_clipboard_data", "get_clipboard_formats", "on_clipboard_change", "set_clipboard",
+        "set_clipboard_data", "wait_clipboard",
+    ],
+    "colors": [],
+    "input_hook": ["InputHook", "KeyEvent"],
+    "ipc": [],
+    "macro": ["Macro", "MacroRecorder", "record", "replay"],
+    "menu": ["Menu", "TrayMenu", "tray_menu"],
+    "mouse": [
+        "MouseSampler", "click", "double_click", "drag_path", "get_control_under_mouse", "get_cursor_type",
+        "get_mouse_pos", "get_window_under_mouse", "mouse_move", "mouse_path", "mouse_press", "mouse_release",
+        "mouse_scroll", "right_click",
+    ],
+    "scheduler": ["CronSpec", "Job", "Scheduler", "schedule"],
+    "screen": ["RegionWatcher", "Screenshot"],
+    "timer": [
+        "FrameLoop", "FrameTask", "Timer", "TimerStats", "TimerWheel", "WheelTimer", "get_timer_stats",
+        "set_countdown", "set_timer", "timer_report",
+    ],
+    "tooltip": ["ToolTip"],
+    "window": [
+        "Control", "ExWindowStyle", "Window", "Windows", "WindowStyle", "all_windows", "visible_windows",
+        "windows",
+    ],
+}
+_LAZY_NAMES = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+
+def __getattr__(name):
+    module_name = _LAZY_NAMES.get(name)
+    if module_name is None:
+        if name in _LAZY_MODULES:
+            return _importlib.import_module(f".{name}", __name__)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = _importlib.import_module(f".{module_name}", __name__)
+    for module_attr in _LAZY_MODULES[module_name]:
+        globals()[module_attr] = getattr(module, module_attr)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_NAMES, *_LAZY_MODULES})
+
+
+_EAGER_MODULES = [
+    "block_input", "exceptions", "flow", "hotkey", "hotkey_context", "hotstring", "key_state", "message_box",
+    "remap_key", "sending", "settings", "window_message",
+]
+__all__ = sorted({
+    *(name for module in _EAGER_MODULES for name in _sys.modules[f"{__name__}.{module}"].__all__),
+    *_LAZY_NAMES,
+    *(name for name in ["executable", "script_full_path"] if name in globals()),
+})
+
 __version__ = "0.2"
@@ -1,14 +1,30 @@
+import collections
+import contextlib
+import ctypes
 import dataclasses as dc
 import functools
-from typing import Callable
-
+import hashlib
+import os
+import struct
+import time
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from .exceptions import Error
 from .flow import ahk_call, _wait_for, _wrap_callback
+from .timer import set_countdown
 
 __all__ = [
     "ClipboardHandler",
+    "ClipboardHistory",
+    "ClipboardSnapshot",
+    "clipboard_snapshot",
     "get_clipboard",
+    "get_clipboard_data",
+    "get_clipboard_formats",
     "on_clipboard_change",
     "set_clipboard",
+    "set_clipboard_data",
     "wait_clipboard",
 ]
 
@@ -31,6 +47,290 @@ def set_clipboard(value):
     return ahk_call("SetVar", "Clipboard", str(value))
 
 
+CF_UNICODETEXT = 13
+CF_DIB = 8
+CF_HDROP = 15
+
+# The formats that can be referred to by name. The strings are the names of the
+# registered formats.
+CLIPBOARD_FORMATS = {
+    "text": CF_UNICODETEXT,
+    "dib": CF_DIB,
+    "files": CF_HDROP,
+    "html": "HTML Format",
+    "rtf": "Rich Text Format",
+    "png": "PNG",
+}
+
+# The formats that hold GDI handles rather than memory and cannot be copied as
+# bytes. Windows synthesizes CF_BITMAP and CF_PALETTE from CF_DIB.
+GDI_CLIPBOARD_FORMATS = {
+    2,  # CF_BITMAP
+    3,  # CF_METAFILEPICT
+    9,  # CF_PALETTE
+    14,  # CF_ENHMETAFILE
+    0x0080,  # CF_OWNERDISPLAY
+    0x0082,  # CF_DSPBITMAP
+    0x0083,  # CF_DSPMETAFILEPICT
+    0x008E,  # CF_DSPENHMETAFILE
+}
+
+ClipboardFormat = Union[int, str]
+
+
+def get_clipboard_formats() -> List[int]:
+    """Get the IDs of the formats currently available in the clipboard.
+
+    :command: `EnumClipboardFormats
+       <https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-enumclipboardformats>`_
+    """
+    with _backend.open():
+        return _backend.formats()
+
+
+def get_clipboard_data(format: ClipboardFormat = "text") -> Optional[memoryview]:
+    """Get the raw data of the *format* from the clipboard.
+
+    The *format* argument is either a format ID, a name of the registered
+    format, or one of the following shortcuts: ``"text"`` (UTF-16-LE text
+    terminated by a null character), ``"dib"`` (a device-independent bitmap),
+    ``"files"`` (a ``DROPFILES`` structure), ``"html"``, ``"rtf"``, and
+    ``"png"``.
+
+    Returns a read-only :class:`memoryview` of the data, or ``None`` if the
+    clipboard doesn't contain the *format*. The data is copied from the
+    clipboard only once.
+
+    :command: `GetClipboardData
+       <https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-getclipboarddata>`_
+    """
+    format_id = _format_id(format)
+    with _backend.open():
+        return _backend.get(format_id)
+
+
+def set_clipboard_data(data: Dict[ClipboardFormat, bytes]):
+    """Replace the clipboard contents with the *data*.
+
+    The *data* argument is a dictionary that maps the formats to the
+    :term:`bytes-like objects <bytes-like object>`, such as :class:`bytes`,
+    :class:`bytearray`, or :class:`memoryview`. The bytes are copied directly
+    from the objects into the clipboard. For the format keys refer to
+    :func:`get_clipboard_data`::
+
+        html = "<b>Hello</b>"
+        ahkpy.set_clipboard_data({
+            "text": "Hello\0".encode("utf-16-le"),
+            "html": make_cf_html(html),
+        })
+
+    :command: `SetClipboardData
+       <https://docs.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-setclipboarddata>`_
+    """
+    items = [(_format_id(fmt), memoryview(value).cast("B")) for fmt, value in data.items()]
+    with _backend.open():
+        _backend.clear()
+        for format_id, view in items:
+            _backend.set(format_id, view)
+
+
+def clipboard_snapshot() -> 'ClipboardSnapshot':
+    """clipboard_snapshot() -> ahkpy.ClipboardSnapshot
+
+    Save the data of all the formats in the clipboard.
+
+    Call the :meth:`~ClipboardSnapshot.restore` method of the returned
+    :class:`ClipboardSnapshot` to put the data back into the clipboard. This
+    helps to preserve the user's clipboard when sending the text with a
+    paste::
+
+        snapshot = ahkpy.clipboard_snapshot()
+        ahkpy.set_clipboard("Long text")
+        ahkpy.send("^v")
+        ahkpy.sleep(0.1)
+        snapshot.restore()
+
+    :command: `ClipboardAll
+       <https://www.autohotkey.com/docs/misc/Clipboard.htm#ClipboardAll>`_
+    """
+    data = {}
+    with _backend.open():
+        for format_id in _backend.formats():
+            if format_id in GDI_CLIPBOARD_FORMATS:
+                continue
+            value = _backend.get(format_id)
+            if value is not None:
+                data[format_id] = value
+    return ClipboardSnapshot(data)
+
+
+@dc.dataclass(frozen=True)
+class ClipboardSnapshot:
+    """This immutable object holds the data of all the formats saved from the
+    clipboard.
+
+    Creating an instance of :class:`!ClipboardSnapshot` doesn't save the
+    clipboard. Use the :func:`clipboard_snapshot` function instead.
+
+    .. attribute:: data
+
+       The dictionary that maps the format IDs to the read-only
+       :class:`memoryview` objects of their data.
+    """
+
+    data: Dict[int, memoryview]
+    __slots__ = ("data",)
+
+    @property
+    def size(self) -> int:
+        """The total size of the saved data in bytes.
+
+        :type: int
+        """
+        return sum(value.nbytes for value in self.data.values())
+
+    def restore(self):
+        """Replace the clipboard contents with the saved data."""
+        set_clipboard_data(self.data)
+
+
+def _format_id(format):
+    if isinstance(format, int):
+        if format <= 0:
+            raise ValueError(f"{format!r} is not a valid clipboard format")
+        return format
+    if not isinstance(format, str):
+        raise TypeError("clipboard format must be an int or a str")
+    format = CLIPBOARD_FORMATS.get(format, format)
+    if isinstance(format, int):
+        return format
+    return _backend.register_format(format)
+
+
+class _Win32Clipboard:
+    # The clipboard backend that calls the Windows API directly.
+
+    GMEM_MOVEABLE = 0x0002
+
+    def __init__(self):
+        self._api = None
+
+    def _load(self):
+        if self._api is not None:
+            return self._api
+
+        from ctypes import wintypes
+
+        user32 = ctypes.WinDLL("user32", use_last_error=True)
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        user32.OpenClipboard.argtypes = [wintypes.HWND]
+        user32.OpenClipboard.restype = wintypes.BOOL
+        user32.CloseClipboard.restype = wintypes.BOOL
+        user32.EmptyClipboard.restype = wintypes.BOOL
+        user32.EnumClipboardFormats.argtypes = [wintypes.UINT]
+        user32.EnumClipboardFormats.restype = wintypes.UINT
+        user32.GetClipboardData.argtypes = [wintypes.UINT]
+        user32.GetClipboardData.restype = wintypes.HANDLE
+        user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+        user32.SetClipboardData.restype = wintypes.HANDLE
+        user32.RegisterClipboardFormatW.argtypes = [wintypes.LPCWSTR]
+        user32.RegisterClipboardFormatW.restype = wintypes.UINT
+        kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
+        kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+        kernel32.GlobalFree.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalFree.restype = wintypes.HGLOBAL
+        kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalLock.restype = wintypes.LPVOID
+        kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalUnlock.restype = wintypes.BOOL
+        kernel32.GlobalSize.argtypes = [wintypes.HGLOBAL]
+        kernel32.GlobalSize.restype = ctypes.c_size_t
+        self._api = user32, kernel32
+        return self._api
+
+    @contextlib.contextmanager
+    def open(self, timeout=1):
+        user32, _ = self._load()
+        hwnd = int(str(ahk_call("GetVar", "A_ScriptHwnd")), base=0)
+        # Another program may hold the clipboard open for a short time.
+        stop = time.perf_counter() + timeout
+        while not user32.OpenClipboard(hwnd):
+            if time.perf_counter() > stop:
+                raise Error("cannot open the clipboard")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            user32.CloseClipboard()
+
+    def formats(self):
+        user32, _ = self._load()
+        result = []
+        format_id = user32.EnumClipboardFormats(0)
+        while format_id:
+            result.append(format_id)
+            format_id = user32.EnumClipboardFormats(format_id)
+        return result
+
+    def get(self, format_id):
+        user32, kernel32 = self._load()
+        handle = user32.GetClipboardData(format_id)
+        if not handle:
+            return None
+        size = kernel32.GlobalSize(handle)
+        ptr = kernel32.GlobalLock(handle)
+        if not ptr:
+            return None
+        try:
+            buffer = bytearray(size)
+            ctypes.memmove((ctypes.c_char * size).from_buffer(buffer), ptr, size)
+        finally:
+            kernel32.GlobalUnlock(handle)
+        return memoryview(buffer).toreadonly()
+
+    def set(self, format_id, view):
+        user32, kernel32 = self._load()
+        size = view.nbytes
+        handle = kernel32.GlobalAlloc(self.GMEM_MOVEABLE, max(size, 1))
+        if not handle:
+            raise MemoryError("cannot allocate the clipboard memory")
+        ptr = kernel32.GlobalLock(handle)
+        try:
+            if size:
+                ctypes.memmove(ptr, _source_pointer(view), size)
+        finally:
+            kernel32.GlobalUnlock(handle)
+        if not user32.SetClipboardData(format_id, handle):
+            kernel32.GlobalFree(handle)
+            raise Error(f"cannot set the clipboard data of format {format_id}")
+
+    def clear(self):
+        user32, _ = self._load()
+        user32.EmptyClipboard()
+
+    def register_format(self, name):
+        user32, _ = self._load()
+        format_id = user32.RegisterClipboardFormatW(name)
+        if not format_id:
+            raise Error(f"cannot register the clipboard format {name!r}")
+        return format_id
+
+
+def _source_pointer(view):
+    # Return the object that ctypes can read the bytes of the view from
+    # without copying them, if possible.
+    obj = view.obj
+    if view.c_contiguous and memoryview(obj).nbytes == view.nbytes:
+        if isinstance(obj, bytes):
+            return obj
+        if not memoryview(obj).readonly:
+            return (ctypes.c_char * view.nbytes).from_buffer(obj)
+    return view.tobytes()
+
+
+_backend = _Win32Clipboard()
+
+
 def wait_clipboard(timeout: float = None) -> str:
     """Wait until the clipboard contains text and return it.
 
@@ -45,7 +345,7 @@ def wait_clipboard(timeout: float = None) -> str:
     return _wait_for(timeout, get_clipboard) or ""
 
 
-def on_clipboard_change(func: Callable = None, *args, prepend_handler=False):
+def on_clipboard_change(func: Callable = None, *args, prepend_handler=False, debounce: float = None, coalesce=True):
     """Register *func* to be called on clipboard change.
 
     On clipboard change, *func* will be called with the clipboard text as the
@@ -61,6 +361,19 @@ def on_clipboard_change(func: Callable = None, *args, prepend_handler=False):
 
     If *func* returns true, then the other clipboard handlers won't be called.
 
+    Some programs change the clipboard several times per copy. If the optional
+    *debounce* argument is given, the changes that are less than *debounce*
+    seconds apart are treated as one burst. If *coalesce* is true (default),
+    *func* is called once *debounce* seconds after the last change in the
+    burst, with the final clipboard contents. If *coalesce* is false, *func*
+    is called on the first change in the burst, and the rest of the burst is
+    ignored. The :attr:`ClipboardHandler.suppressed` counter shows how many
+    changes were skipped. The return value of the debounced *func* is ignored::
+
+        @ahkpy.on_clipboard_change(debounce=0.05)
+        def handler(clipboard):
+            print("copied", clipboard)
+
     If *func* is given, returns an instance of :class:`ClipboardHandler`.
     Otherwise, the function works as a decorator::
 
@@ -74,6 +387,8 @@ def on_clipboard_change(func: Callable = None, *args, prepend_handler=False):
        <https://www.autohotkey.com/docs/commands/OnClipboardChange.htm>`_
     """
     option = 1 if not prepend_handler else -1
+    if debounce is not None and debounce < 0:
+        raise ValueError("debounce must be positive")
 
     def on_clipboard_change_decorator(func):
         func = _wrap_callback(
@@ -82,6 +397,8 @@ def on_clipboard_change(func: Callable = None, *args, prepend_handler=False):
             _bare_clipboard_handler,
             _clipboard_handler,
         )
+        if debounce is not None:
+            func = _DebouncedClipboardHandler(func, debounce, coalesce)
         ahk_call("OnClipboardChange", func, option)
         return ClipboardHandler(func)
 
@@ -100,10 +417,52 @@ def _clipboard_handler(func, typ):
     elif typ == 1:
         return bool(func(clipboard=get_clipboard()))
     elif typ == 2:
-        # TODO: Return ClipboardAll.
+        # The clipboard holds non-text data. The handlers expect a string, so
+        # they get the text if there is any. They can save the other formats
+        # with clipboard_snapshot().
         return bool(func(clipboard=get_clipboard()))
 
 
+class _DebouncedClipboardHandler:
+    # Collapses the bursts of the clipboard changes. The clipboard is read
+    # only when the wrapped handler is actually called.
+
+    def __init__(self, func, debounce, coalesce):
+        self.func = func
+        self.debounce = debounce
+        self.coalesce = coalesce
+        self.received = 0
+        self.suppressed = 0
+        self._timer = None
+        self._in_burst = False
+        self._last_type = None
+
+    def __call__(self, typ):
+        self.received += 1
+        self._last_type = typ
+        if self._in_burst:
+            self.suppressed += 1
+        elif not self.coalesce:
+            self.func(typ)
+        self._in_burst = True
+        if self._timer is None:
+            self._timer = set_countdown(self.debounce, self._end_burst)
+        else:
+            self._timer.start()
+        # Let the other handlers run.
+        return False
+
+    def _end_burst(self):
+        self._in_burst = False
+        if self.coalesce:
+            self.func(self._last_type)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.stop()
+        self._in_burst = False
+
+
 @dc.dataclass(frozen=True)
 class ClipboardHandler:
     """This immutable object holds a function registered to be called on
@@ -116,11 +475,261 @@ class ClipboardHandler:
     func: Callable
     __slots__ = ("func",)
 
+    @property
+    def suppressed(self) -> int:
+        """The number of clipboard changes that didn't call the function
+        because of the *debounce* argument of :func:`on_clipboard_change`.
+
+        :type: int
+        """
+        return getattr(self.func, "suppressed", 0)
+
     def unregister(self):
         """Unregister the clipboard handler and stop calling the function on
         clipboard change.
         """
         ahk_call("OnClipboardChange", self.func, 0)
+        if isinstance(self.func, _DebouncedClipboardHandler):
+            self.func.stop()
+
+
+class ClipboardHistory:
+    """The bounded store of the clipboard texts.
+
+    The texts are deduplicated by their hashes: copying the same text again
+    moves it to the top of the history instead of adding a copy. The texts
+    longer than *compress_threshold* bytes are compressed with :mod:`zlib`.
 
+    When the history holds more than *max_items* texts or more than
+    *max_bytes* bytes, the least recently copied texts are evicted. The texts
+    that take more than *max_bytes* alone are not stored.
 
-# TODO: Implement ClipboardAll.
+    If the optional *path* argument is given, the history is loaded from the
+    file and every change is appended to it. The file is rewritten when it
+    grows much larger than the history.
+
+    Creating an instance of :class:`!ClipboardHistory` doesn't start recording
+    the clipboard. Call the :meth:`start` method or add the texts manually
+    with the :meth:`add` method::
+
+        history = ahkpy.ClipboardHistory(max_items=50).start()
+        ...
+        for text in history.search("http"):
+            print(text)
+    """
+
+    def __init__(self, max_bytes=4 * 1024 * 1024, max_items=1000, *, compress_threshold=1024, path=None):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        if max_items <= 0:
+            raise ValueError("max_items must be positive")
+
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.compress_threshold = compress_threshold
+        self.path = path
+
+        # Maps the digests to the (data, is_compressed) tuples, from the
+        # least to the most recently copied.
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._handler = None
+        self._file = None
+        self._file_records = 0
+
+        #: The number of texts added to the history.
+        self.added = 0
+        #: The number of texts that were already in the history.
+        self.deduplicated = 0
+        #: The number of texts evicted from the history.
+        self.evicted = 0
+
+        if path is not None:
+            self._load()
+            self.evicted = 0
+
+    @property
+    def size(self) -> int:
+        """The number of bytes the stored texts take.
+
+        :type: int
+        """
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the texts from the most to the least recently
+        copied.
+        """
+        for data, is_compressed in reversed(self._entries.values()):
+            yield _decode_history_entry(data, is_compressed)
+
+    def __contains__(self, text):
+        return _history_digest(text) in self._entries
+
+    def add(self, text: str) -> bool:
+        """Add the *text* to the top of the history.
+
+        Returns ``True`` if the text is stored.
+        """
+        if not text:
+            return False
+        digest = _history_digest(text)
+        if digest in self._entries:
+            self._entries.move_to_end(digest)
+            self.deduplicated += 1
+            self._append_record(HISTORY_TOUCH, digest)
+            return True
+
+        data = text.encode("utf-8")
+        is_compressed = len(data) > self.compress_threshold
+        if is_compressed:
+            data = zlib.compress(data)
+        if len(data) > self.max_bytes:
+            return False
+        self._store(digest, data, is_compressed)
+        self.added += 1
+        self._append_record(HISTORY_ADD, digest, data, is_compressed)
+        return True
+
+    def _store(self, digest, data, is_compressed):
+        if digest in self._entries:
+            self._entries.move_to_end(digest)
+            return
+        self._entries[digest] = (data, is_compressed)
+        self._bytes += len(data)
+        while len(self._entries) > self.max_items or self._bytes > self.max_bytes:
+            _, (old_data, _) = self._entries.popitem(last=False)
+            self._bytes -= len(old_data)
+            self.evicted += 1
+
+    def search(self, substring: str, *, case_sensitive=False) -> List[str]:
+        """Find the texts that contain the *substring*.
+
+        Returns the list of the texts from the most to the least recently
+        copied.
+
+        The texts are decompressed one at a time while searching, so the
+        search doesn't take more memory than the largest text.
+        """
+        # The case-sensitive search looks for the UTF-8 bytes of the
+        # substring and decodes only the matching texts.
+        needle = substring.encode("utf-8") if case_sensitive else substring.casefold()
+        result = []
+        for data, is_compressed in reversed(self._entries.values()):
+            if is_compressed:
+                data = zlib.decompress(data)
+            if case_sensitive:
+                if needle in data:
+                    result.append(data.decode("utf-8"))
+                continue
+            text = data.decode("utf-8")
+            if needle in text.casefold():
+                result.append(text)
+        return result
+
+    def clear(self):
+        """Remove all the texts from the history."""
+        self._entries.clear()
+        self._bytes = 0
+        if self.path is not None:
+            self._rewrite()
+
+    def start(self) -> 'ClipboardHistory':
+        """Start adding the clipboard texts to the history on clipboard
+        change.
+
+        Returns the history itself.
+        """
+        if self._handler is None:
+            self._handler = on_clipboard_change(self._on_clipboard_change)
+        return self
+
+    def stop(self):
+        """Stop adding the clipboard texts and close the history file."""
+        if self._handler is not None:
+            self._handler.unregister()
+            self._handler = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _on_clipboard_change(self, clipboard):
+        self.add(clipboard)
+
+    def _load(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            self._rewrite()
+            return
+
+        with f:
+            if f.read(len(HISTORY_MAGIC)) != HISTORY_MAGIC:
+                raise ValueError(f"{self.path!r} is not a clipboard history file")
+            while True:
+                header = f.read(HISTORY_RECORD.size)
+                if len(header) < HISTORY_RECORD.size:
+                    # The file may end with a partially written record.
+                    break
+                op, flags, digest, length = HISTORY_RECORD.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    break
+                if op == HISTORY_ADD:
+                    self._store(digest, data, bool(flags))
+                elif op == HISTORY_TOUCH and digest in self._entries:
+                    self._entries.move_to_end(digest)
+        # Drop the evicted and repeated records.
+        self._rewrite()
+
+    def _append_record(self, op, digest, data=b"", is_compressed=False):
+        if self.path is None:
+            return
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(HISTORY_RECORD.pack(op, is_compressed, digest, len(data)))
+        self._file.write(data)
+        self._file.flush()
+        self._file_records += 1
+        if self._file_records > 2 * len(self._entries) + 16:
+            self._rewrite()
+
+    def _rewrite(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HISTORY_MAGIC)
+            for digest, (data, is_compressed) in self._entries.items():
+                f.write(HISTORY_RECORD.pack(HISTORY_ADD, is_compressed, digest, len(data)))
+                f.write(data)
+        os.replace(tmp_path, self.path)
+        self._file_records = len(self._entries)
+
+
+HISTORY_MAGIC = b"AHKCLIP1"
+# The operation, the flags, the text digest, and the length of the data that
+# follows.
+HISTORY_RECORD = struct.Struct("<BB16sI")
+HISTORY_ADD = 1
+HISTORY_TOUCH = 2
+
+
+def _history_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _decode_history_entry(data, is_compressed):
+    if is_compressed:
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
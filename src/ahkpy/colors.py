@@ -1,7 +1,7 @@
 def to_hex(r, g, b):
     if not isinstance(r, int) or not isinstance(g, int) or not isinstance(b, int):
         raise TypeError("color values must be integers")
-    return f"{r:x}{g:x}{b:x}"
+    return f"{r:02x}{g:02x}{b:02x}"
 
 
 def to_tuple(string):
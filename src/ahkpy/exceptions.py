@@ -1,3 +1,8 @@
+__all__ = [
+    "Error",
+]
+
+
 class Error(Exception):
     """The runtime error that was raised in the AutoHotkey.
 
@@ -0,0 +1,310 @@
+import asyncio
+import dataclasses as dc
+import threading
+import uuid
+from array import array
+from time import perf_counter
+from typing import Callable, Optional
+
+from .flow import ahk_call, _wait_for
+
+__all__ = [
+    "InputHook",
+    "KeyEvent",
+]
+
+
+OVERFLOW_POLICIES = {"drop_oldest", "block", "coalesce"}
+
+
+@dc.dataclass(frozen=True)
+class KeyEvent:
+    """This immutable object represents a key press or release captured by
+    :class:`InputHook`.
+
+    .. attribute:: vk
+
+       The virtual key code of the key.
+
+    .. attribute:: sc
+
+       The scan code of the key.
+
+    .. attribute:: is_down
+
+       ``True`` if the key was pressed, ``False`` if it was released.
+
+    .. attribute:: time
+
+       The :func:`time.perf_counter` value at the moment the event was
+       received.
+
+    .. attribute:: repeat
+
+       The number of events merged into this one. It's greater than 1 only if
+       the ``"coalesce"`` overflow policy is used.
+    """
+
+    vk: int
+    sc: int
+    is_down: bool
+    time: float
+    repeat: int
+    __slots__ = ("vk", "sc", "is_down", "time", "repeat")
+
+
+class InputHook:
+    """The object that captures key presses and releases into a fixed-size ring
+    buffer.
+
+    The optional *capacity* argument sets the maximum number of events held in
+    the buffer. Defaults to 1024.
+
+    The *overflow* argument sets what happens to a new event when the buffer is
+    full:
+
+    - ``"drop_oldest"`` – the oldest event is discarded. This is the default.
+    - ``"block"`` – wait up to *block_timeout* seconds for the consumer to take
+      an event, then drop the oldest event. Use this policy only when the
+      events are consumed in another thread, e.g. with :func:`coop`, because
+      the main thread is the one that receives the events.
+    - ``"coalesce"`` – an event identical to the newest buffered one, for
+      example, a key auto-repeat, increments the :attr:`KeyEvent.repeat`
+      counter of the newest event instead of taking a new slot. Other events
+      drop the oldest event.
+
+    If the optional *callback* argument is given, it's called with a
+    :class:`KeyEvent` instance on every key event, and the buffer is not
+    used.
+
+    If the optional *visible* argument is false, the captured keys are not
+    passed to the active window. Defaults to ``True``.
+
+    The events can be consumed by iterating the hook either synchronously or
+    asynchronously. The iteration stops after the hook is stopped and the
+    buffer is empty::
+
+        with ahkpy.InputHook() as hook:
+            for event in hook:
+                print(event)
+                if event.vk == ahkpy.get_key_vk("Esc"):
+                    break
+
+    The :attr:`dropped`, :attr:`coalesced`, and :attr:`blocked` counters show
+    how well the consumer keeps up with the events.
+
+    :command: `InputHook
+       <https://www.autohotkey.com/docs/commands/InputHook.htm>`_
+    """
+
+    def __init__(self, capacity=1024, *, overflow="drop_oldest", callback: Callable = None, visible=True,
+                 block_timeout=1):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"{overflow!r} is not a valid overflow policy")
+        if block_timeout < 0:
+            raise ValueError("block_timeout must be positive")
+        if callback is not None and not callable(callback):
+            raise TypeError("callback must be callable")
+
+        self.capacity = capacity
+        self.overflow = overflow
+        self.callback = callback
+        self.visible = visible
+        self.block_timeout = block_timeout
+
+        self._vks = array("B", bytes(capacity))
+        self._scs = array("H", bytes(2 * capacity))
+        self._downs = array("B", bytes(capacity))
+        self._repeats = array("L", [0]) * capacity
+        self._times = array("d", [0.0]) * capacity
+        self._head = 0
+        self._len = 0
+
+        self._cond = threading.Condition()
+        self._async_waiters = []
+        self._id = None
+        self._closed = False
+
+        #: The total number of events received by the hook.
+        self.received = 0
+        #: The number of events discarded because the buffer was full.
+        self.dropped = 0
+        #: The number of events merged into the previous ones.
+        self.coalesced = 0
+        #: The number of times the hook had to wait for the consumer.
+        self.blocked = 0
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the hook is capturing the keys.
+
+        :type: bool
+        """
+        return self._id is not None
+
+    def start(self):
+        """Start capturing the keys.
+
+        :command: `InputHook.Start()
+           <https://www.autohotkey.com/docs/objects/InputHook.htm#Start>`_
+        """
+        if self._id is not None:
+            return
+        self._closed = False
+        self._id = str(uuid.uuid4())
+        # L0 disables collecting the text, V passes the keys to the active
+        # window.
+        options = "L0 V" if self.visible else "L0"
+        ahk_call("InputHookStart", self._id, self._on_key_event, options)
+
+    def stop(self):
+        """Stop capturing the keys.
+
+        The events that are already in the buffer can still be consumed.
+
+        :command: `InputHook.Stop()
+           <https://www.autohotkey.com/docs/objects/InputHook.htm#Stop>`_
+        """
+        if self._id is not None:
+            ahk_call("InputHookStop", self._id)
+            self._id = None
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            self._wake_async_waiters()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __len__(self):
+        return self._len
+
+    def feed(self, vk: int, sc: int, is_down: bool, time: float = None):
+        """Put the key event into the hook as if it was captured by AHK.
+
+        This is the method that receives the AHK events. It can also be used to
+        test the consumers of the hook without pressing the keys.
+        """
+        if time is None:
+            time = perf_counter()
+        self.received += 1
+        if self.callback is not None:
+            self.callback(KeyEvent(vk, sc, bool(is_down), time, 1))
+            return
+
+        with self._cond:
+            if self._len == self.capacity:
+                if self.overflow == "coalesce" and self._coalesce(vk, sc, is_down, time):
+                    return
+                if self.overflow == "block":
+                    self.blocked += 1
+                    self._cond.wait_for(lambda: self._len < self.capacity, timeout=self.block_timeout)
+                if self._len == self.capacity:
+                    self._head = (self._head + 1) % self.capacity
+                    self._len -= 1
+                    self.dropped += 1
+
+            tail = (self._head + self._len) % self.capacity
+            self._vks[tail] = vk
+            self._scs[tail] = sc
+            self._downs[tail] = bool(is_down)
+            self._repeats[tail] = 1
+            self._times[tail] = time
+            self._len += 1
+            self._cond.notify()
+            self._wake_async_waiters()
+
+    def _coalesce(self, vk, sc, is_down, time):
+        last = (self._head + self._len - 1) % self.capacity
+        if self._vks[last] == vk and self._scs[last] == sc and self._downs[last] == bool(is_down):
+            self._repeats[last] += 1
+            self._times[last] = time
+            self.coalesced += 1
+            return True
+        return False
+
+    def _on_key_event(self, vk, sc, is_down):
+        self.feed(vk, sc, is_down)
+
+    def get_nowait(self) -> Optional[KeyEvent]:
+        """Remove and return the oldest event from the buffer.
+
+        Returns ``None`` if the buffer is empty.
+        """
+        with self._cond:
+            if not self._len:
+                return None
+            head = self._head
+            event = KeyEvent(
+                self._vks[head],
+                self._scs[head],
+                bool(self._downs[head]),
+                self._times[head],
+                self._repeats[head],
+            )
+            self._head = (head + 1) % self.capacity
+            self._len -= 1
+            self._cond.notify()
+            return event
+
+    def get(self, timeout: float = None) -> Optional[KeyEvent]:
+        """Remove and return the oldest event from the buffer, waiting for the
+        event if the buffer is empty.
+
+        If there is no event after *timeout* seconds, or the hook was stopped,
+        then ``None`` will be returned. If *timeout* is not specified or
+        ``None``, there is no limit to the wait time.
+        """
+        event = self.get_nowait()
+        if event is not None or self._closed or timeout == 0:
+            return event
+
+        if threading.current_thread() is threading.main_thread():
+            # The events are delivered by AHK in the main thread, so let AHK
+            # process its message queue while waiting.
+            _wait_for(timeout, lambda: self._len or self._closed)
+        else:
+            with self._cond:
+                self._cond.wait_for(lambda: self._len or self._closed, timeout=timeout)
+        return self.get_nowait()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> KeyEvent:
+        event = self.get()
+        if event is None:
+            raise StopIteration
+        return event
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> KeyEvent:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                event = self.get_nowait()
+                if event is not None:
+                    return event
+                if self._closed:
+                    raise StopAsyncIteration
+                fut = loop.create_future()
+                self._async_waiters.append((loop, fut))
+            await fut
+
+    def _wake_async_waiters(self):
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_set_future_result, fut)
+
+
+def _set_future_result(fut):
+    if not fut.done():
+        fut.set_result(None)
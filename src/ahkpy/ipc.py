@@ -0,0 +1,506 @@
+"""The message channels between the AutoHotkey.py processes.
+
+The channels exchange the messages with the ``WM_COPYDATA`` window messages
+sent to the hidden main windows of the AHK processes::
+
+    # In one script:
+    channel = ahkpy.ipc.Channel("build", handler=lambda data: data["n"] * 2)
+
+    # In another one:
+    channel = ahkpy.ipc.Channel("build")
+    assert channel.request({"n": 21}) == 42
+"""
+
+import collections
+import ctypes
+import dataclasses as dc
+import itertools
+import json
+import pickle
+import struct
+import time
+import zlib
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .exceptions import Error
+from .flow import ahk_call, _wait_for
+from .window import Window, all_windows
+from .window_message import MessageHandler, on_message
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+__all__ = [
+    "Channel",
+    "ChannelStats",
+    "MemoryTransport",
+    "Message",
+]
+
+
+WM_COPYDATA = 0x004A
+
+# The frame kinds.
+MESSAGE = 0
+REQUEST = 1
+RESPONSE = 2
+ERROR = 3
+
+# version, kind, sender address, correlation id, message id, chunk index,
+# chunk count.
+FRAME = struct.Struct("<BBQIIII")
+FRAME_VERSION = 1
+
+
+class _PickleSerializer:
+    dumps = staticmethod(pickle.dumps)
+    loads = staticmethod(pickle.loads)
+
+
+class _JSONSerializer:
+    @staticmethod
+    def dumps(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data.decode("utf-8"))
+
+
+class _BytesSerializer:
+    @staticmethod
+    def dumps(obj):
+        return bytes(obj)
+
+    @staticmethod
+    def loads(data):
+        return data
+
+
+class _MsgpackSerializer:
+    @staticmethod
+    def dumps(obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    @staticmethod
+    def loads(data):
+        return msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {
+    "bytes": _BytesSerializer,
+    "json": _JSONSerializer,
+    "msgpack": _MsgpackSerializer,
+    "pickle": _PickleSerializer,
+}
+
+
+def _get_serializer(serializer):
+    if isinstance(serializer, str):
+        try:
+            result = SERIALIZERS[serializer]
+        except KeyError:
+            raise ValueError(f"{serializer!r} is not a valid serializer") from None
+        if result is _MsgpackSerializer and msgpack is None:
+            raise ImportError("the msgpack serializer requires the msgpack package")
+        return result
+    if not callable(getattr(serializer, "dumps", None)) or not callable(getattr(serializer, "loads", None)):
+        raise TypeError("serializer must have the dumps and loads methods")
+    return serializer
+
+
+@dc.dataclass
+class ChannelStats:
+    """The counters of the :class:`Channel` traffic."""
+
+    #: The number of messages sent, including the requests and the responses.
+    sent: int = 0
+    #: The number of messages received.
+    received: int = 0
+    #: The number of bytes sent, including the frame headers.
+    bytes_sent: int = 0
+    #: The number of bytes received, including the frame headers.
+    bytes_received: int = 0
+    #: The number of frames sent.
+    frames_sent: int = 0
+    #: The number of malformed or unexpected frames that were ignored.
+    dropped: int = 0
+    #: The total time in seconds spent sending the frames.
+    send_time: float = 0.0
+    #: The number of answered requests.
+    requests: int = 0
+    #: The total time in seconds between sending the requests and receiving
+    #: the responses.
+    request_time: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """The number of bytes sent per second of the send time.
+
+        :type: float
+        """
+        if not self.send_time:
+            return 0.0
+        return self.bytes_sent / self.send_time
+
+    @property
+    def latency(self) -> float:
+        """The mean request round trip time in seconds.
+
+        :type: float
+        """
+        if not self.requests:
+            return 0.0
+        return self.request_time / self.requests
+
+
+@dc.dataclass
+class Message:
+    """The message received by a :class:`Channel`."""
+
+    #: The deserialized message data.
+    data: Any
+    #: The address of the sender.
+    sender: int
+    #: The correlation id of the request, or 0 if the sender doesn't expect a
+    #: response.
+    correlation_id: int = 0
+    channel: Optional['Channel'] = dc.field(default=None, repr=False, compare=False)
+
+    @property
+    def is_request(self) -> bool:
+        """Whether the sender waits for a :meth:`reply`.
+
+        :type: bool
+        """
+        return self.correlation_id != 0
+
+    def reply(self, data):
+        """Send the response *data* to the sender of the request."""
+        if not self.is_request:
+            raise ValueError("the message is not a request")
+        self.channel._send_frames(self.sender, RESPONSE, self.correlation_id, self.channel._dumps(data))
+
+
+class Channel:
+    """The named message channel between the AutoHotkey.py processes.
+
+    All the processes that opened a channel with the same *name* are its
+    peers. The peers are addressed by their integer addresses returned by
+    :meth:`peers`; the address of the channel itself is :attr:`address`.
+
+    The messages are serialized with the *serializer*: ``"json"`` (default),
+    ``"pickle"``, ``"msgpack"``, ``"bytes"`` for the raw bytes, or an object
+    with the ``dumps`` and ``loads`` methods. Use ``"pickle"`` only if all the
+    processes that can send window messages to the script are trusted.
+
+    The messages larger than *chunk_size* bytes are split into several frames
+    and reassembled by the receiver.
+
+    If the optional *handler* argument is given, it's called with the data of
+    every request, and its return value is sent back as the response.
+    Otherwise, the requests are put into the receive queue along with the
+    other messages, and can be answered with :meth:`Message.reply`.
+
+    The received messages are read with :meth:`receive` and
+    :meth:`receive_nowait`. The :attr:`stats` attribute shows the measured
+    throughput and latency.
+
+    The optional *transport* argument is used for testing. See
+    :class:`MemoryTransport`.
+    """
+
+    def __init__(self, name: str, *, serializer="json", handler: Optional[Callable] = None,
+                 chunk_size=64 * 1024, timeout=5, transport=None):
+        if not name:
+            raise ValueError("name must not be empty")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+        self.name = name
+        self.handler = handler
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        #: The traffic counters.
+        self.stats = ChannelStats()
+
+        self._serializer = _get_serializer(serializer)
+        self._transport = transport if transport is not None else _WindowTransport()
+        self._inbox: Deque[Message] = collections.deque()
+        self._responses: Dict[int, Tuple[int, bytes]] = {}
+        self._waiting = set()
+        # The chunks of the incomplete messages by the (sender, message id)
+        # tuples.
+        self._partial: Dict[Tuple[int, int], List[Optional[bytes]]] = {}
+        self._message_ids = itertools.count(1)
+        self._correlation_ids = itertools.count(1)
+        self.address = self._transport.open(name, self._receive_frame)
+
+    def close(self):
+        """Stop receiving the messages."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the channel is open.
+
+        :type: bool
+        """
+        return self._transport is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def peers(self) -> List[int]:
+        """Get the addresses of the other processes that opened the channel."""
+        return self._get_transport().peers(self.name)
+
+    def send(self, data, peer: Optional[int] = None):
+        """Send the *data* to the *peer*, or to all peers if *peer* is
+        ``None``.
+
+        Returns the number of peers the message was delivered to.
+        """
+        payload = self._dumps(data)
+        peers = [peer] if peer is not None else self.peers()
+        for address in peers:
+            self._send_frames(address, MESSAGE, 0, payload)
+        return len(peers)
+
+    def request(self, data, peer: Optional[int] = None, *, timeout=None):
+        """Send the request *data* to the *peer* and wait for the response.
+
+        If *peer* is ``None``, the channel must have exactly one peer.
+
+        Raises :exc:`~ahkpy.Error` if there's no response in *timeout* seconds,
+        or if the peer's handler raised an exception. The default *timeout* is
+        the value passed to the constructor.
+        """
+        if peer is None:
+            peers = self.peers()
+            if len(peers) != 1:
+                raise Error(f"request needs a single peer, but the channel has {len(peers)}")
+            peer, = peers
+        if timeout is None:
+            timeout = self.timeout
+
+        # The correlation ids of the requests are never 0.
+        correlation_id = next(self._correlation_ids) % 0xFFFFFFFF + 1
+        start = time.perf_counter()
+        self._waiting.add(correlation_id)
+        try:
+            self._send_frames(peer, REQUEST, correlation_id, self._dumps(data))
+            if correlation_id not in self._responses:
+                _wait_for(timeout, lambda: correlation_id in self._responses)
+            try:
+                kind, payload = self._responses.pop(correlation_id)
+            except KeyError:
+                raise Error("request timed out") from None
+        finally:
+            self._waiting.discard(correlation_id)
+
+        self.stats.requests += 1
+        self.stats.request_time += time.perf_counter() - start
+        if kind == ERROR:
+            raise Error(f"remote handler failed: {payload.decode('utf-8', 'replace')}")
+        return self._serializer.loads(payload)
+
+    def receive(self, timeout=None) -> Optional[Message]:
+        """Wait for a message for *timeout* seconds and return it.
+
+        Returns ``None`` if there's no message. If *timeout* is not specified
+        or ``None``, there is no limit to the wait time.
+        """
+        if not self._inbox:
+            _wait_for(timeout, lambda: bool(self._inbox))
+        return self.receive_nowait()
+
+    def receive_nowait(self) -> Optional[Message]:
+        """Return the received message, or ``None`` if there's none."""
+        if self._inbox:
+            return self._inbox.popleft()
+        return None
+
+    def __len__(self):
+        return len(self._inbox)
+
+    def _dumps(self, data):
+        return self._serializer.dumps(data)
+
+    def _get_transport(self):
+        if self._transport is None:
+            raise ValueError("the channel is closed")
+        return self._transport
+
+    def _send_frames(self, peer, kind, correlation_id, payload):
+        transport = self._get_transport()
+        message_id = next(self._message_ids) & 0xFFFFFFFF
+        count = max(1, -(-len(payload) // self.chunk_size))
+        start = time.perf_counter()
+        for index in range(count):
+            chunk = payload[index*self.chunk_size:(index+1)*self.chunk_size]
+            frame = FRAME.pack(FRAME_VERSION, kind, self.address, correlation_id, message_id, index, count) + chunk
+            if not transport.send(peer, frame):
+                raise Error(f"peer {peer} did not accept the message")
+            self.stats.frames_sent += 1
+            self.stats.bytes_sent += len(frame)
+        self.stats.send_time += time.perf_counter() - start
+        self.stats.sent += 1
+
+    def _receive_frame(self, frame: bytes) -> bool:
+        # Called by the transport. Return True if the frame is accepted.
+        try:
+            version, kind, sender, correlation_id, message_id, index, count = FRAME.unpack_from(frame)
+        except struct.error:
+            self.stats.dropped += 1
+            return False
+        if version != FRAME_VERSION or kind > ERROR or index >= count:
+            self.stats.dropped += 1
+            return False
+        self.stats.bytes_received += len(frame)
+
+        chunk = frame[FRAME.size:]
+        if count == 1:
+            payload = chunk
+        else:
+            key = (sender, message_id)
+            chunks = self._partial.get(key)
+            if chunks is None or len(chunks) != count:
+                chunks = self._partial[key] = [None] * count
+            chunks[index] = chunk
+            if any(c is None for c in chunks):
+                return True
+            del self._partial[key]
+            payload = b"".join(chunks)
+
+        self.stats.received += 1
+        if kind in (RESPONSE, ERROR):
+            if correlation_id not in self._waiting:
+                self.stats.dropped += 1
+                return True
+            self._responses[correlation_id] = (kind, payload)
+        elif kind == REQUEST and self.handler is not None:
+            self._handle_request(sender, correlation_id, payload)
+        else:
+            data = self._serializer.loads(payload)
+            message = Message(data, sender, correlation_id if kind == REQUEST else 0, self)
+            self._inbox.append(message)
+        return True
+
+    def _handle_request(self, sender, correlation_id, payload):
+        try:
+            result = self._dumps(self.handler(self._serializer.loads(payload)))
+        except Exception as err:
+            self._send_frames(sender, ERROR, correlation_id, repr(err).encode("utf-8"))
+        else:
+            self._send_frames(sender, RESPONSE, correlation_id, result)
+
+
+class MemoryTransport:
+    """The in-process transport of the :class:`Channel` frames for testing.
+
+    The channels that use the transports created with the same *hub* dict can
+    talk to each other::
+
+        hub = {}
+        a = ahkpy.ipc.Channel("test", transport=ahkpy.ipc.MemoryTransport(hub))
+        b = ahkpy.ipc.Channel("test", transport=ahkpy.ipc.MemoryTransport(hub))
+        a.send("hello")
+        assert b.receive_nowait().data == "hello"
+
+    The frames are delivered synchronously.
+    """
+
+    def __init__(self, hub: dict):
+        self.hub = hub
+        self._name = None
+        self._address = None
+
+    def open(self, name, receive):
+        receivers = self.hub.setdefault(name, {})
+        self._address = max(receivers, default=0) + 1
+        self._name = name
+        receivers[self._address] = receive
+        return self._address
+
+    def close(self):
+        self.hub.get(self._name, {}).pop(self._address, None)
+
+    def peers(self, name):
+        return sorted(address for address in self.hub.get(name, {}) if address != self._address)
+
+    def send(self, address, frame):
+        receive = self.hub.get(self._name, {}).get(address)
+        if receive is None:
+            return False
+        return receive(bytes(frame))
+
+
+class _COPYDATASTRUCT(ctypes.Structure):
+    _fields_ = [
+        ("dwData", ctypes.c_size_t),
+        ("cbData", ctypes.c_uint32),
+        ("lpData", ctypes.c_void_p),
+    ]
+
+
+class _WindowTransport:
+    # Sends the frames to the hidden main windows of the AHK processes. The
+    # windows that opened the channel are marked with a window property. The
+    # CRC32 of the channel name is passed in dwData so that several channels
+    # can share the process window.
+
+    def __init__(self):
+        self._hwnd = None
+        self._prop = None
+        self._key = None
+        self._handler: Optional[MessageHandler] = None
+
+    def open(self, name, receive):
+        self._hwnd = int(str(ahk_call("GetVar", "A_ScriptHwnd")), base=0)
+        self._prop = _channel_prop(name)
+        self._key = zlib.crc32(name.encode("utf-8"))
+
+        def on_copy_data(w_param, l_param, msg, hwnd):
+            cds = _COPYDATASTRUCT.from_address(l_param)
+            if cds.dwData != self._key:
+                return None
+            return 1 if receive(ctypes.string_at(cds.lpData, cds.cbData)) else 0
+
+        # Allow the messages that arrive while the previous one is handled.
+        self._handler = on_message(WM_COPYDATA, on_copy_data, max_threads=16)
+        ctypes.windll.user32.SetPropW(self._hwnd, self._prop, 1)
+        return self._hwnd
+
+    def close(self):
+        if self._handler is None:
+            return
+        ctypes.windll.user32.RemovePropW(self._hwnd, self._prop)
+        self._handler.unregister()
+        self._handler = None
+
+    def peers(self, name):
+        prop = _channel_prop(name)
+        get_prop = ctypes.windll.user32.GetPropW
+        return [
+            win.id
+            for win in all_windows.filter(class_name="AutoHotkey")
+            if win.id != self._hwnd and get_prop(win.id, prop)
+        ]
+
+    def send(self, address, frame):
+        buffer = ctypes.create_string_buffer(frame, len(frame))
+        cds = _COPYDATASTRUCT(self._key, len(frame), ctypes.cast(buffer, ctypes.c_void_p))
+        result = Window(address).send_message(WM_COPYDATA, self._hwnd, ctypes.addressof(cds))
+        return result == 1
+
+
+def _channel_prop(name):
+    return f"ahkpy.ipc:{name}"
@@ -1,10 +1,16 @@
+import ctypes
+import dataclasses as dc
 import functools
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
 from .flow import ahk_call, _wait_for
 
 __all__ = [
+    "KeyboardSnapshot",
     "get_caps_lock_state",
     "get_insert_state",
+    "get_key_states",
+    "get_keyboard_snapshot",
     "get_key_name_from_sc",
     "get_key_name_from_vk",
     "get_key_name",
@@ -14,6 +20,7 @@ __all__ = [
     "get_scroll_lock_state",
     "is_key_pressed_logical",
     "is_key_pressed",
+    "key_table",
     "set_caps_lock_state",
     "set_num_lock_state",
     "set_scroll_lock_state",
@@ -69,6 +76,197 @@ def _get_key_state(key_name, mode=None):
     return bool(result)
 
 
+KEY_STATE_MODES = {
+    "physical": "P",
+    "logical": "",
+    "toggle": "T",
+}
+
+
+def _key_state_mode(mode):
+    try:
+        return KEY_STATE_MODES[mode]
+    except KeyError:
+        raise ValueError(f"{mode!r} is not a valid key state mode") from None
+
+
+def get_key_states(keys: Iterable[str], mode="physical") -> Dict[str, bool]:
+    """Return the states of multiple keys at once.
+
+    Returns a dict that maps each key name from *keys* to its state. All the
+    states are retrieved in one call to AHK, which is considerably faster than
+    calling :func:`is_key_pressed` for each key::
+
+        >>> ahkpy.get_key_states(["LButton", "Shift", "Ctrl"])
+        {'LButton': False, 'Shift': True, 'Ctrl': False}
+
+    The *mode* argument takes one of the following values:
+
+    - ``"physical"`` – whether the key is pressed down physically. Same as
+      :func:`is_key_pressed`. This is the default.
+    - ``"logical"`` – the logical state of the key. Same as
+      :func:`is_key_pressed_logical`.
+    - ``"toggle"`` – the toggle state of keys such as :kbd:`CapsLock`.
+
+    :command: `GetKeyState
+       <https://www.autohotkey.com/docs/commands/GetKeyState.htm>`_
+    """
+    mode = _key_state_mode(mode)
+    keys = [str(key) for key in keys]
+    if not keys:
+        return {}
+    for key in keys:
+        if not key or "\n" in key:
+            raise ValueError(f"{key!r} is not a valid key")
+    result = ahk_call("GetKeyStates", "\n".join(keys), mode)
+    states = {}
+    for i, key in enumerate(keys, start=1):
+        state = result[i]
+        if state == "":
+            raise ValueError(f"{key!r} is not a valid key or the state of the key could not be determined")
+        states[key] = bool(state)
+    return states
+
+
+def get_keyboard_snapshot(mode="physical") -> 'KeyboardSnapshot':
+    """get_keyboard_snapshot(mode="physical") -> ahkpy.KeyboardSnapshot
+
+    Capture the states of all keys and mouse buttons in one call to AHK.
+
+    For valid *mode* values refer to :func:`get_key_states`.
+
+    Returns a :class:`KeyboardSnapshot` instance.
+
+    :command: `GetKeyState
+       <https://www.autohotkey.com/docs/commands/GetKeyState.htm>`_
+    """
+    mode = _key_state_mode(mode)
+    words = ahk_call("GetKeyboardState", mode)
+    bits = 0
+    for i in range(8):
+        bits |= words[i+1] << (32 * i)
+    return KeyboardSnapshot(bits)
+
+
+@dc.dataclass(frozen=True)
+class KeyboardSnapshot:
+    """This immutable object holds the states of all virtual keys at a moment
+    in time.
+
+    The states are stored as a 256-bit integer where bit N is set if the key
+    with the virtual key code N is down. The snapshot behaves like a set of
+    virtual key codes and supports set operations with other snapshots::
+
+        snapshot = ahkpy.get_keyboard_snapshot()
+        if snapshot.modifiers:
+            print("modifiers down:", list(snapshot.modifiers))
+        if 0x01 in snapshot:
+            print("LButton is down")
+
+    Key names are also accepted by the ``in`` operator, though resolving the
+    name to a virtual key code takes a call to AHK::
+
+        if "LButton" in snapshot:
+            ...
+
+    Creating an instance of :class:`!KeyboardSnapshot` doesn't capture the
+    keyboard state. Use the :func:`get_keyboard_snapshot` function instead.
+    """
+
+    bits: int
+    __slots__ = ("bits",)
+
+    def __init__(self, bits=0):
+        if not 0 <= bits < 1 << 256:
+            raise ValueError("bits must be a 256-bit unsigned integer")
+        object.__setattr__(self, "bits", bits)
+
+    @classmethod
+    def from_vks(cls, vks: Iterable[int]) -> 'KeyboardSnapshot':
+        """Create a snapshot where only the given virtual keys are down."""
+        bits = 0
+        for vk in vks:
+            bits |= 1 << _check_vk(vk)
+        return cls(bits)
+
+    @property
+    def modifiers(self) -> 'KeyboardSnapshot':
+        """The subset of the snapshot with only the modifier keys:
+        :kbd:`Shift`, :kbd:`Ctrl`, :kbd:`Alt`, and :kbd:`Win`.
+
+        :type: KeyboardSnapshot
+        """
+        return self & MODIFIER_KEYS
+
+    def is_pressed(self, vk: int) -> bool:
+        """Return whether the key with the virtual key code *vk* was down."""
+        return bool(self.bits >> _check_vk(vk) & 1)
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            key = get_key_vk(key)
+        return self.is_pressed(key)
+
+    def __iter__(self) -> Iterator[int]:
+        bits = self.bits
+        vk = 0
+        while bits:
+            if bits & 1:
+                yield vk
+            bits >>= 1
+            vk += 1
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __bytes__(self):
+        return self.bits.to_bytes(32, "little")
+
+    def __and__(self, other):
+        if not isinstance(other, KeyboardSnapshot):
+            return NotImplemented
+        return KeyboardSnapshot(self.bits & other.bits)
+
+    def __or__(self, other):
+        if not isinstance(other, KeyboardSnapshot):
+            return NotImplemented
+        return KeyboardSnapshot(self.bits | other.bits)
+
+    def __xor__(self, other):
+        if not isinstance(other, KeyboardSnapshot):
+            return NotImplemented
+        return KeyboardSnapshot(self.bits ^ other.bits)
+
+    def __sub__(self, other):
+        if not isinstance(other, KeyboardSnapshot):
+            return NotImplemented
+        return KeyboardSnapshot(self.bits & ~other.bits)
+
+    def __repr__(self):
+        vks = ", ".join(f"0x{vk:02x}" for vk in self)
+        return f"{self.__class__.__name__}({{{vks}}})"
+
+
+def _check_vk(vk):
+    if not isinstance(vk, int):
+        raise TypeError(f"virtual key code must be an integer, not {vk.__class__.__name__}")
+    if not 0 <= vk <= 255:
+        raise ValueError("virtual key code must be between 0 and 255")
+    return vk
+
+
+MODIFIER_KEYS = KeyboardSnapshot.from_vks([
+    0x10, 0x11, 0x12,  # Shift, Ctrl, Alt
+    0x5b, 0x5c,  # LWin, RWin
+    0xa0, 0xa1,  # LShift, RShift
+    0xa2, 0xa3,  # LCtrl, RCtrl
+    0xa4, 0xa5,  # LAlt, RAlt
+])
+
+
 def set_caps_lock_state(state: bool, always=False):
     _set_key_state("SetCapsLockState", state, always)
 
@@ -129,7 +327,10 @@ def get_key_name(key_name: str) -> str:
     :command: `GetKeyName
        <https://www.autohotkey.com/docs/commands/GetKey.htm>`_
     """
-    return str(_get_key("GetKeyName", key_name))
+    name, _, _ = _lookup_key(key_name)
+    if not name:
+        raise ValueError(f"{key_name!r} is not a valid key")
+    return name
 
 
 def get_key_name_from_vk(vk: int) -> str:
@@ -141,7 +342,10 @@ def get_key_name_from_vk(vk: int) -> str:
     :command: `GetKeyName
        <https://www.autohotkey.com/docs/commands/GetKey.htm>`_
     """
-    return get_key_name(f"vk{vk}")
+    name = _get_key_table().names_by_vk.get(vk)
+    if name is None:
+        raise ValueError(f"{vk!r} is not a valid virtual key code")
+    return name
 
 
 def get_key_name_from_sc(sc: int) -> str:
@@ -153,7 +357,10 @@ def get_key_name_from_sc(sc: int) -> str:
     :command: `GetKeyName
        <https://www.autohotkey.com/docs/commands/GetKey.htm>`_
     """
-    return get_key_name(f"sc{sc}")
+    name = _get_key_table().names_by_sc.get(sc)
+    if name is None:
+        raise ValueError(f"{sc!r} is not a valid scan code")
+    return name
 
 
 def get_key_vk(key_name: str) -> int:
@@ -164,7 +371,10 @@ def get_key_vk(key_name: str) -> int:
 
     :command: `GetKeyVK <https://www.autohotkey.com/docs/commands/GetKey.htm>`_
     """
-    return _get_key("GetKeyVK", key_name)
+    _, vk, _ = _lookup_key(key_name)
+    if not vk:
+        raise ValueError(f"{key_name!r} is not a valid key")
+    return vk
 
 
 def get_key_sc(key_name: str) -> int:
@@ -175,11 +385,89 @@ def get_key_sc(key_name: str) -> int:
 
     :command: `GetKeySC <https://www.autohotkey.com/docs/commands/GetKey.htm>`_
     """
-    return _get_key("GetKeySC", key_name)
+    _, _, sc = _lookup_key(key_name)
+    if not sc:
+        raise ValueError(f"{key_name!r} is not a valid key")
+    return sc
 
 
-def _get_key(cmd, key):
-    result = ahk_call(cmd, str(key))
-    if not result:
-        raise ValueError(f"{key!r} is not a valid key")
-    return result
+def key_table() -> Dict[str, Tuple[int, int]]:
+    """Return the names of all keys known to the current keyboard layout.
+
+    Returns a dict that maps each key name to a ``(vk, sc)`` tuple of its
+    virtual key code and scan code::
+
+        >>> ahkpy.key_table()["F1"]
+        (112, 59)
+
+    The table is retrieved from AHK once per keyboard layout of the active
+    window and is shared with :func:`get_key_name`, :func:`get_key_vk`,
+    :func:`get_key_sc`, :func:`get_key_name_from_vk`, and
+    :func:`get_key_name_from_sc`, so these functions don't call AHK for the
+    keys in the table.
+    """
+    return {name: (vk, sc) for name, vk, sc in _get_key_table().keys_by_name.values()}
+
+
+@dc.dataclass
+class _KeyTable:
+    # The keyboard layout of the table.
+    layout: int = 0
+    # Maps lowercase key names and other strings that were looked up to the
+    # (name, vk, sc) tuples.
+    keys_by_name: Dict[str, Tuple[str, int, int]] = dc.field(default_factory=dict)
+    names_by_vk: Dict[int, str] = dc.field(default_factory=dict)
+    names_by_sc: Dict[int, str] = dc.field(default_factory=dict)
+    # Strings that are not in the table, e.g. "vk5b", "sc15b", or invalid key
+    # names.
+    extra_keys: Dict[str, Tuple[str, int, int]] = dc.field(default_factory=dict)
+
+
+_key_table: Optional[_KeyTable] = None
+
+
+def _get_keyboard_layout():
+    # Key names depend on the keyboard layout of the foreground window. The
+    # layout is switched per thread, and WM_INPUTLANGCHANGE is not sent to
+    # the AHK window when the layout is switched in another program, so the
+    # layout is checked on every lookup.
+    user32 = ctypes.windll.user32
+    thread_id = user32.GetWindowThreadProcessId(user32.GetForegroundWindow(), None)
+    return user32.GetKeyboardLayout(thread_id)
+
+
+def _get_key_table():
+    global _key_table
+    layout = _get_keyboard_layout()
+    table = _key_table
+    if table is not None and table.layout == layout:
+        return table
+
+    table = _KeyTable(layout)
+    for line in ahk_call("GetKeyTable").splitlines():
+        prefix, code, name, vk, sc = line.split("\t")
+        table.keys_by_name.setdefault(name.lower(), (name, int(vk), int(sc)))
+        # The names of the codes come from GetKeyName("vkNN") and
+        # GetKeyName("scNNN"). For example, sc52 is NumpadIns, while the VK of
+        # NumpadIns is vk2D of Insert.
+        if prefix == "vk":
+            table.names_by_vk[int(code)] = name
+        else:
+            table.names_by_sc[int(code)] = name
+    _key_table = table
+    return table
+
+
+def _lookup_key(key):
+    key = str(key)
+    table = _get_key_table()
+    info = table.keys_by_name.get(key.lower())
+    if info is not None:
+        return info
+    info = table.extra_keys.get(key)
+    if info is not None:
+        return info
+    result = ahk_call("GetKeyInfo", key)
+    info = (str(result["Name"]), result["VK"], result["SC"])
+    table.extra_keys[key] = info
+    return info
@@ -0,0 +1,355 @@
+import struct
+import sys
+from array import array
+from time import perf_counter
+from typing import Iterator, List, Optional, Set, Tuple
+
+from .flow import global_ahk_lock, sleep
+from .hotkey_context import HotkeyContext
+from .input_hook import InputHook
+from .mouse import get_mouse_pos
+from .sending import send
+from .settings import _set_coord_mode
+from .timer import set_timer
+
+__all__ = [
+    "Macro",
+    "MacroRecorder",
+    "record",
+    "replay",
+]
+
+
+KEY_DOWN = 0
+KEY_UP = 1
+MOUSE_MOVE = 2
+MOUSE_DOWN = 3
+MOUSE_UP = 4
+MOUSE_WHEEL = 5
+
+# (AHK key name, Click argument) pairs. The index of the pair is stored in the
+# macro.
+MOUSE_BUTTONS = [
+    ("LButton", "Left"),
+    ("RButton", "Right"),
+    ("MButton", "Middle"),
+    ("XButton1", "X1"),
+    ("XButton2", "X2"),
+]
+WHEEL_DIRECTIONS = ["WheelUp", "WheelDown", "WheelLeft", "WheelRight"]
+
+# The hotkeys that record the mouse events and their (event kind, argument)
+# pairs.
+MOUSE_HOTKEYS = {
+    **{f"*{key_name}": (MOUSE_DOWN, i) for i, (key_name, _) in enumerate(MOUSE_BUTTONS)},
+    **{f"*{key_name} Up": (MOUSE_UP, i) for i, (key_name, _) in enumerate(MOUSE_BUTTONS)},
+    **{f"*{key_name}": (MOUSE_WHEEL, i) for i, key_name in enumerate(WHEEL_DIRECTIONS)},
+}
+
+HEADER = struct.Struct("<4sBI")
+MAGIC = b"AHKM"
+VERSION = 1
+
+
+class Macro:
+    """The recorded sequence of keyboard and mouse events.
+
+    The events are stored in a compact form: the event kinds, the delays
+    between the events in milliseconds, and two integer arguments per event
+    (VK and SC for the keys, X and Y screen coordinates for the mouse
+    movements) are held in separate :class:`array.array` objects.
+
+    Use the :func:`record` function to create a macro and :func:`replay` to
+    play it back. The macro can be saved to and loaded from bytes::
+
+        data = macro.to_bytes()
+        macro = ahkpy.Macro.from_bytes(data)
+    """
+
+    def __init__(self):
+        self._kinds = array("B")
+        self._delays = array("I")
+        self._args1 = array("i")
+        self._args2 = array("i")
+
+    def append(self, kind: int, delay: int, arg1=0, arg2=0):
+        """Append an event of *kind* that happened *delay* milliseconds after
+        the previous one.
+        """
+        if not KEY_DOWN <= kind <= MOUSE_WHEEL:
+            raise ValueError(f"{kind!r} is not a valid event kind")
+        self._kinds.append(kind)
+        self._delays.append(max(0, int(delay)))
+        self._args1.append(arg1)
+        self._args2.append(arg2)
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int, int]]:
+        """Iterate over the ``(kind, delay, arg1, arg2)`` tuples."""
+        return zip(self._kinds, self._delays, self._args1, self._args2)
+
+    @property
+    def duration(self) -> float:
+        """The duration of the macro in seconds.
+
+        :type: float
+        """
+        return sum(self._delays) / 1000
+
+    def to_bytes(self) -> bytes:
+        """Pack the macro into bytes."""
+        header = HEADER.pack(MAGIC, VERSION, len(self))
+        return b"".join([
+            header,
+            self._kinds.tobytes(),
+            _to_little_endian(self._delays),
+            _to_little_endian(self._args1),
+            _to_little_endian(self._args2),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Macro':
+        """Unpack the macro from the bytes returned by :meth:`to_bytes`."""
+        try:
+            magic, version, count = HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError("data is not a macro") from None
+        if magic != MAGIC:
+            raise ValueError("data is not a macro")
+        if version != VERSION:
+            raise ValueError(f"unsupported macro version {version}")
+        if len(data) != HEADER.size + count * 13:
+            raise ValueError("macro data is truncated")
+
+        macro = cls()
+        offset = HEADER.size
+        macro._kinds.frombytes(data[offset:offset+count])
+        offset += count
+        for arr in [macro._delays, macro._args1, macro._args2]:
+            arr.frombytes(data[offset:offset+count*4])
+            if sys.byteorder == "big":
+                arr.byteswap()
+            offset += count * 4
+        return macro
+
+    def _compile(self, speed: Optional[float] = 1.0, resolution=0.01) -> List[Tuple[float, str]]:
+        # Compile the macro into a list of (time, keys) tuples, where time is
+        # the number of seconds since the start of the playback, and keys is
+        # the string to be sent at that time.
+        #
+        # The events that are less than *resolution* seconds apart are sent as
+        # one string. Only the last mouse movement of consecutive movements is
+        # sent.
+        chunks = []
+        keys = []
+        chunk_time = 0.0
+        t = 0.0
+        pending_move = None
+        for kind, delay, arg1, arg2 in self:
+            if speed:
+                t += delay / 1000 / speed
+            if t - chunk_time >= resolution:
+                if pending_move is not None:
+                    keys.append(pending_move)
+                    pending_move = None
+                if keys:
+                    chunks.append((chunk_time, "".join(keys)))
+                    keys = []
+                chunk_time = t
+
+            if kind == MOUSE_MOVE:
+                pending_move = "{Click %d %d 0}" % (arg1, arg2)
+                continue
+            if pending_move is not None:
+                keys.append(pending_move)
+                pending_move = None
+
+            if kind == KEY_DOWN:
+                keys.append("{vk%02Xsc%03X down}" % (arg1, arg2))
+            elif kind == KEY_UP:
+                keys.append("{vk%02Xsc%03X up}" % (arg1, arg2))
+            elif kind == MOUSE_DOWN:
+                keys.append("{Click %s down}" % MOUSE_BUTTONS[arg1][1])
+            elif kind == MOUSE_UP:
+                keys.append("{Click %s up}" % MOUSE_BUTTONS[arg1][1])
+            elif kind == MOUSE_WHEEL:
+                keys.append("{Click %s}" % WHEEL_DIRECTIONS[arg1])
+
+        if pending_move is not None:
+            keys.append(pending_move)
+        if keys:
+            chunks.append((chunk_time, "".join(keys)))
+        return [(chunk_time, "{Blind}" + keys) for chunk_time, keys in chunks]
+
+
+def _to_little_endian(arr):
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def record(*, keyboard=True, mouse=True, mouse_interval=0.01) -> 'MacroRecorder':
+    """record(*, keyboard=True, mouse=True, mouse_interval=0.01) -> ahkpy.MacroRecorder
+
+    Start recording the keyboard and mouse events.
+
+    If *keyboard* is true, the key presses and releases are recorded. If
+    *mouse* is true, the mouse button presses, releases, and wheel turns are
+    recorded, and the mouse position is checked every *mouse_interval*
+    seconds.
+
+    Returns an instance of :class:`MacroRecorder`. Call its
+    :meth:`~MacroRecorder.stop` method to get the recorded :class:`Macro`::
+
+        recorder = ahkpy.record()
+        ahkpy.wait_key_pressed("F12")
+        macro = recorder.stop()
+        ahkpy.replay(macro)
+
+    The function can also be used as a context manager::
+
+        with ahkpy.record() as recorder:
+            ahkpy.wait_key_pressed("F12")
+        ahkpy.replay(recorder.macro)
+    """
+    recorder = MacroRecorder(keyboard=keyboard, mouse=mouse, mouse_interval=mouse_interval)
+    recorder.start()
+    return recorder
+
+
+class MacroRecorder:
+    """The object that records the keyboard and mouse events into a
+    :class:`Macro`.
+
+    Creating an instance of :class:`!MacroRecorder` doesn't start the recording.
+    Use the :func:`record` function instead.
+    """
+
+    def __init__(self, *, keyboard=True, mouse=True, mouse_interval=0.01):
+        self.keyboard = keyboard
+        self.mouse = mouse
+        self.mouse_interval = mouse_interval
+        #: The recorded macro.
+        self.macro = Macro()
+
+        self._last_time = None
+        self._last_pos = None
+        self._input_hook = None
+        self._timer = None
+
+    def start(self):
+        """Start or resume recording."""
+        if self.keyboard and self._input_hook is None:
+            self._input_hook = InputHook(callback=self._on_key_event)
+            self._input_hook.start()
+        if self.mouse and self._timer is None:
+            _add_mouse_recorder(self)
+            self._timer = set_timer(self.mouse_interval, self._sample_mouse)
+            self._sample_mouse()
+
+    def stop(self) -> Macro:
+        """Stop recording and return the recorded :class:`Macro`."""
+        if self._input_hook is not None:
+            self._input_hook.stop()
+            self._input_hook = None
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        _remove_mouse_recorder(self)
+        return self.macro
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _on_key_event(self, event):
+        self._append(KEY_DOWN if event.is_down else KEY_UP, event.vk, event.sc, event.time)
+
+    def _sample_mouse(self):
+        pos = get_mouse_pos(relative_to="screen")
+        if pos != self._last_pos:
+            self._last_pos = pos
+            self._append(MOUSE_MOVE, *pos)
+
+    def _append(self, kind, arg1=0, arg2=0, time=None):
+        if time is None:
+            time = perf_counter()
+        if self._last_time is None:
+            delay = 0
+        else:
+            delay = round((time - self._last_time) * 1000)
+        self._last_time = time
+        self.macro.append(kind, delay, arg1, arg2)
+
+
+# The recorders that record the mouse events.
+_mouse_recorders: Set[MacroRecorder] = set()
+# The mouse hotkeys are created once and are shared by the recorders, because
+# AHK can't delete the hotkey criteria.
+_mouse_hotkeys = []
+
+
+def _add_mouse_recorder(recorder):
+    _mouse_recorders.add(recorder)
+    if len(_mouse_recorders) > 1:
+        return
+    if _mouse_hotkeys:
+        for hk in _mouse_hotkeys:
+            hk.enable()
+        return
+    # The mouse events are recorded by the predicates of separate hotkey
+    # contexts. The predicates always return False, so these hotkeys never
+    # fire, and the events reach the user hotkeys for the same buttons or pass
+    # through to the system.
+    for key_name, (kind, arg) in MOUSE_HOTKEYS.items():
+        context = HotkeyContext(_record_mouse_event, kind, arg)
+        _mouse_hotkeys.append(context.hotkey(key_name, _noop))
+
+
+def _remove_mouse_recorder(recorder):
+    if recorder not in _mouse_recorders:
+        return
+    _mouse_recorders.remove(recorder)
+    if not _mouse_recorders:
+        for hk in _mouse_hotkeys:
+            hk.disable()
+
+
+def _record_mouse_event(kind, arg):
+    for recorder in list(_mouse_recorders):
+        recorder._append(kind, arg)
+    return False
+
+
+def _noop():
+    pass
+
+
+def replay(macro: Macro, *, speed: Optional[float] = 1.0, mode="input", level=None):
+    """Play back the *macro*.
+
+    The consecutive events are merged into as few :func:`send` calls as
+    possible, and the consecutive mouse movements are collapsed into one.
+
+    The optional *speed* argument scales the timing of the events. For example,
+    ``2`` plays the macro twice as fast as it was recorded. If *speed* is
+    ``None``, the macro is played as fast as possible. Defaults to 1.
+
+    For the *mode* and *level* arguments refer to :func:`send`.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed must be positive")
+
+    start = perf_counter()
+    for chunk_time, keys in macro._compile(speed):
+        remaining = start + chunk_time - perf_counter()
+        if remaining > 0:
+            sleep(remaining)
+        with global_ahk_lock:
+            _set_coord_mode("mouse", "screen")
+            send(keys, mode=mode, level=level)
@@ -1,9 +1,13 @@
 import argparse
+import atexit
+import ctypes
 import functools
+import json
 import os
 import runpy
 import sys
 import subprocess
+import threading
 import time
 import traceback
 
@@ -15,6 +19,10 @@ STATUS_CONTROL_C_EXIT = 0xC000013A
 
 quiet = False
 
+# The default output files of the options with optional values.
+PROFILE_OUTPUT = "ahkpy.pstats"
+TRACE_BRIDGE_OUTPUT = "ahkpy-bridge.jsonl"
+
 
 def main():
     sys.excepthook = sys.__excepthook__ = excepthook
@@ -66,19 +74,24 @@ def handle_system_exit(value):
 
 
 def prepare_tray_menu():
-    ahk_win = ahk.all_windows.first(pid=os.getpid())
+    # Post the messages with ctypes to not import the window module on
+    # startup.
+    script_hwnd = int(str(ahk.flow.ahk_call("GetVar", "A_ScriptHwnd")), base=0)
     WM_COMMAND = 0x0111
     ID_TRAY_OPEN = 65300
     ID_TRAY_WINDOWSPY = 65302
 
+    def post_command(command_id):
+        ctypes.windll.user32.PostMessageW(script_hwnd, WM_COMMAND, command_id, 0)
+
     def open_docs():
         subprocess.Popen(["explorer.exe", "https://ahkpy.readthedocs.io/"])
 
     ahk.tray_menu._remove_standard()
-    ahk.tray_menu.add("&Open", ahk_win.post_message, WM_COMMAND, ID_TRAY_OPEN, default=True)
+    ahk.tray_menu.add("&Open", post_command, ID_TRAY_OPEN, default=True)
     ahk.tray_menu.add("&Help", open_docs)
     ahk.tray_menu.add_separator()
-    ahk.tray_menu.add("&Window Spy", ahk_win.post_message, WM_COMMAND, ID_TRAY_WINDOWSPY)
+    ahk.tray_menu.add("&Window Spy", post_command, ID_TRAY_WINDOWSPY)
     ahk.tray_menu.add("&Restart This Script", ahk.restart)
     ahk.tray_menu.add_separator()
     ahk.tray_menu.add("&Suspend Hotkeys", ahk.toggle_suspend)
@@ -86,7 +99,10 @@ def prepare_tray_menu():
 
 
 def run_from_args():
-    usage = "py -m ahkpy [-h] [-V] [-q] [--no-tray] [-c CMD | -m MOD | FILE | -] [ARGS] ..."
+    usage = (
+        "py -m ahkpy [-h] [-V] [-q] [--no-tray] [--profile[=FILE]] [--trace-bridge[=FILE]] "
+        "[-c CMD | -m MOD | serve | FILE | -] [ARGS] ..."
+    )
     parser = GUIArgumentParser(usage=usage, prog="ahkpy")
     parser.add_argument(
         "-V", "--version", action="version", version=version(),
@@ -99,6 +115,14 @@ def run_from_args():
         "--no-tray", dest="tray", action="store_false", default=True,
         help="hide the tray icon",
     )
+    parser.add_argument(
+        "--profile", metavar="FILE",
+        help=f"profile the program and the callbacks, and write the stats to FILE ({PROFILE_OUTPUT})",
+    )
+    parser.add_argument(
+        "--trace-bridge", metavar="FILE",
+        help=f"log the calls to AHK with their timings to FILE ({TRACE_BRIDGE_OUTPUT})",
+    )
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
         "-c", dest="cmd", action="store_true",
@@ -113,12 +137,17 @@ def run_from_args():
         help="arguments passed to program in sys.argv[1:]",
     )
 
-    options = parser.parse_args()
+    options = parser.parse_args(expand_optional_values(sys.argv[1:]))
     args = options.ARGS
 
     global quiet
     quiet = options.quiet
 
+    if options.trace_bridge:
+        start_bridge_trace(options.trace_bridge)
+    if options.profile:
+        start_profile(options.profile)
+
     if options.tray:
         ahk.flow.ahk_call("Menu", "Tray", "Icon")
 
@@ -132,6 +161,11 @@ def run_from_args():
         if cwd not in sys.path:
             sys.path.insert(0, cwd)
         run_module(args[0])
+    elif args and args[0] == "serve":
+        # Run a script named "serve" as "./serve".
+        from . import server
+        sys.argv[:] = args
+        server.main(args[1:])
     elif sys.stdin and (not args or args[0] == "-"):
         if args:
             sys.argv[:] = args
@@ -154,6 +188,115 @@ def run_from_args():
         sys.exit(2)
 
 
+def expand_optional_values(argv):
+    # Make "--profile" mean "--profile=ahkpy.pstats". Otherwise, argparse would
+    # take the script name for the option value.
+    defaults = {"--profile": PROFILE_OUTPUT, "--trace-bridge": TRACE_BRIDGE_OUTPUT}
+    result = list(argv)
+    for i, arg in enumerate(result):
+        if not arg.startswith("-") or arg in {"-", "--"}:
+            # The rest are the program arguments.
+            break
+        if arg in defaults:
+            result[i] = f"{arg}={defaults[arg]}"
+    return result
+
+
+def start_profile(filename):
+    """Profile the main thread until the exit and dump the stats into
+    *filename*.
+
+    The AHK callbacks run on the main thread, so they are profiled too. The
+    callbacks are summarized on stderr.
+    """
+    import cProfile
+
+    profiler = cProfile.Profile()
+
+    def write_profile():
+        profiler.disable()
+        profiler.dump_stats(filename)
+        if sys.stderr is not None:
+            print_callback_summary(profiler, file=sys.stderr)
+
+    # The atexit functions are called when AHK finalizes Python in HandleExit.
+    atexit.register(write_profile)
+    profiler.enable()
+
+
+def print_callback_summary(profiler, file, limit=20):
+    """Print the functions that were called by AHK, either directly or through
+    the ahkpy wrappers, sorted by the cumulative time.
+    """
+    import pstats
+
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def is_internal(func):
+        filename, _, _ = func
+        return filename.startswith(package_dir) or filename == "~"
+
+    stats = pstats.Stats(profiler).stats
+    callbacks = []
+    for func, (_, calls, _, cumulative, callers) in stats.items():
+        if is_internal(func):
+            continue
+        if all(is_internal(caller) for caller in callers):
+            callbacks.append((cumulative, calls, func))
+    callbacks.sort(reverse=True)
+
+    print("   calls  cumtime  callback", file=file)
+    for cumulative, calls, (filename, line, name) in callbacks[:limit]:
+        print(f"{calls:8} {cumulative:8.3f}  {name} ({filename}:{line})", file=file)
+
+
+def start_bridge_trace(filename):
+    """Log every call to AHK as a JSON line into *filename*."""
+    from . import flow
+
+    trace = open(filename, "w", encoding="utf-8")
+    flow._ahk = BridgeTracer(flow._ahk, trace)
+    atexit.register(trace.close)
+
+
+class BridgeTracer:
+    """The proxy of the _ahk module that logs the calls.
+
+    The log lines hold the start time relative to the start of the trace, the
+    AHK function name, the number of arguments, the duration in seconds, the
+    thread name, and the exception type name if the call failed.
+    """
+
+    def __init__(self, ahk_module, file):
+        self._ahk = ahk_module
+        self._file = file
+        self._start = time.perf_counter()
+
+    def __getattr__(self, name):
+        return getattr(self._ahk, name)
+
+    def call(self, cmd, *args):
+        start = time.perf_counter()
+        error = None
+        try:
+            return self._ahk.call(cmd, *args)
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            record = {
+                "t": round(start - self._start, 6),
+                "cmd": cmd,
+                "args": len(args),
+                "duration": round(duration, 6),
+                "thread": threading.current_thread().name,
+                "error": error,
+            }
+            if not self._file.closed:
+                self._file.write(json.dumps(record) + "\n")
+
+
 class GUIArgumentParser(argparse.ArgumentParser):
     def _print_message(self, message, file=None):
         if message:
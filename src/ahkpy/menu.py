@@ -1,10 +1,15 @@
 import dataclasses as dc
+import difflib
 import functools
+import sys
+import time
 import uuid
+from typing import Dict, List, Optional, Set
 
 from .flow import ahk_call, global_ahk_lock, _wrap_callback
 from .settings import COORD_MODES, _set_coord_mode
 from .unset import UNSET
+from .window_message import on_message
 
 
 __all__ = [
@@ -176,6 +181,115 @@ class Menu:
             icon=icon, icon_number=icon_number, icon_width=icon_width,
         )
 
+    def build(self, spec):
+        """Append the items described by *spec* in a single call to AHK.
+
+        Adding items one by one with :meth:`add` takes several calls to AHK
+        per item. Use :meth:`!build` to create large generated menus, like the
+        lists of recent files or windows.
+
+        The *spec* argument is a list of items. Each item is one of:
+
+        - ``None`` – a separator.
+        - ``(item_name, callback)`` – a menu item. The *callback* is called as
+          in :meth:`add`.
+        - ``(item_name, submenu)`` – a submenu, where *submenu* is either a
+          :class:`Menu` or a nested list of items. For a nested list a new
+          :class:`Menu` is created.
+
+        An optional dictionary of the :meth:`add` keyword arguments can be
+        passed as the third element of the tuple::
+
+            menu = ahkpy.Menu().build([
+                ("&Open", open_file, {"default": True}),
+                ("Recent", [
+                    (path, functools.partial(open_file, path))
+                    for path in recent_files
+                ]),
+                None,
+                ("E&xit", sys.exit, {"icon": "shell32.dll", "icon_number": 27}),
+            ])
+
+        The items share a single Python callable registered in AHK, and the
+        signature of a callback used by several items is analyzed only once.
+
+        :command: `Menu, $, Insert
+           <https://www.autohotkey.com/docs/commands/Menu.htm#Insert>`_
+        """
+        ops = []
+        _append_menu_items(self, spec, ops, {})
+        _apply_menu_ops(ops)
+        return self
+
+    def add_dynamic_submenu(self, item_name, provider, *, max_age=1.0, placeholder="(empty)", **options):
+        """add_dynamic_submenu(item_name, provider, *, max_age=1.0, placeholder="(empty)", **options)
+
+        Append a submenu named *item_name* which items are created by the
+        *provider* function when the submenu is about to be opened.
+
+        The *provider* is called without arguments and must return a list of
+        items in the format accepted by :meth:`build`::
+
+            def window_items():
+                return [
+                    (win.title, win.activate)
+                    for win in ahkpy.windows.filter(title=".+", match="regex")
+                ]
+
+            menu.add_dynamic_submenu("Windows", window_items)
+
+        The result of the *provider* is cached for *max_age* seconds, so the
+        submenu that is opened repeatedly doesn't call the *provider* every
+        time. Only the items that differ from the previous result are changed
+        in the submenu. If the *provider* returns an empty list, the submenu
+        shows a disabled *placeholder* item.
+
+        For *options* refer to :meth:`add`.
+        """
+        if not callable(provider):
+            raise TypeError("provider must be callable")
+        if max_age < 0:
+            raise ValueError("max_age must be positive")
+        submenu = Menu()
+        dynamic = _DynamicSubmenu(submenu, provider, max_age, placeholder, parent=self)
+        ops = []
+        _sync_menu_items(submenu, dynamic.placeholder_spec(), ops, {})
+        _apply_menu_ops(ops)
+        self.add_submenu(item_name, submenu, **options)
+        _dynamic_submenus[submenu.get_handle()] = dynamic
+        _watch_menu_popups()
+        return self
+
+    def sync(self, spec):
+        """Change the menu items to match *spec* with as few calls to AHK as
+        possible.
+
+        The *spec* argument is a list of items in the format accepted by
+        :meth:`build`. The item names must be unique.
+
+        The menu remembers the items that were created by :meth:`build` and
+        :meth:`!sync`. The new *spec* is compared to them: the items are
+        matched by their names, and only the differences are applied in a
+        single call to AHK. The items are inserted, deleted, moved, renamed,
+        or get their options updated. The callbacks of the existing items are
+        replaced without calling AHK, and the nested lists update the
+        submenus they created earlier::
+
+            def update_menu():
+                menu.sync([
+                    (f"{name} ({size} bytes)", functools.partial(open_file, name))
+                    for name, size in list_files()
+                ])
+
+        If the menu was changed by other methods, like :meth:`add` or
+        :meth:`delete_item`, all of its items are recreated. This includes the
+        items added before the first call to :meth:`build` or :meth:`!sync`.
+        """
+        ops = []
+        _sync_menu_items(self, spec, ops, {})
+        _apply_menu_ops(ops)
+        return self
+
     def insert(
         self, insert_before, item_name=None, callback=None, *args,
         priority=0, default=False, enabled=True, checked=False,
@@ -317,16 +431,7 @@ class Menu:
         else:
             thing = None
 
-        option_list = []
-        if priority is not None:
-            option_list.append(f"P{priority}")
-        if radio is not None:
-            option_list.append(f"{'+' if radio else '-'}Radio")
-        if new_column is not None:
-            option_list.append(f"{'+' if new_column else '-'}Break")
-        if bar_column is not None:
-            option_list.append(f"{'+' if bar_column else '-'}BarBreak")
-        option_str = " ".join(option_list)
+        option_str = _menu_item_options(priority, radio, new_column, bar_column)
 
         if update:
             # Update separately. If the menu item doesn't exist, setting the
@@ -600,7 +705,451 @@ class Menu:
         return name
 
     def _call(self, *args):
-        return ahk_call("Menu", self.name, *args)
+        result = ahk_call("Menu", self.name, *args)
+        cmd = args[0]
+        if cmd == "DeleteAll" or cmd == "Delete" and len(args) == 1:
+            # AHK has released the item callbacks. Delete the submenus that
+            # were created from the nested lists.
+            ops = []
+            _forget_menu_model(self.name, ops)
+            _changed_menus.discard(self.name)
+            _forget_dynamic_submenus(self.name, ops)
+            if cmd == "Delete":
+                for handle, dynamic in list(_dynamic_submenus.items()):
+                    if dynamic.menu == self:
+                        del _dynamic_submenus[handle]
+            _apply_menu_ops(ops)
+        elif cmd not in MENU_READ_ONLY_COMMANDS:
+            model = _menu_models.get(self.name)
+            if model is not None:
+                model.stale = True
+            else:
+                _changed_menus.add(self.name)
+        return result
+
+
+# The separators of the records and fields of the menu operations passed to
+# AHK.
+MENU_RECORD_SEP = "\x1e"
+MENU_FIELD_SEP = "\x1f"
+
+MENU_ITEM_OPTIONS = {
+    "priority", "default", "enabled", "checked", "radio", "new_column", "bar_column",
+    "icon", "icon_number", "icon_width",
+}
+
+# The menu commands that don't change the menu items.
+MENU_READ_ONLY_COMMANDS = {"Show", "Color", "Tip", "Click"}
+
+
+class _MenuDispatch:
+    # The single callable that AHK calls for all menu items created by
+    # Menu.build() and the dynamic submenus. AHK binds the slot of the item
+    # callback as the first argument, so replacing the callback of an
+    # existing item doesn't need a call to AHK.
+
+    def __init__(self):
+        self.callbacks = {}
+        self._free = []
+        self._next = 0
+
+    def __call__(self, slot, item_name, item_pos, menu_name):
+        self.callbacks[int(slot)](item_name, item_pos, menu_name)
+
+    def add(self, callback):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = self._next
+            self._next += 1
+        self.callbacks[slot] = callback
+        return slot
+
+    def release(self, slot):
+        del self.callbacks[slot]
+        self._free.append(slot)
+
+
+_menu_dispatch = _MenuDispatch()
+
+
+@dc.dataclass
+class _MenuItem:
+    # The Python-side model of a menu item. The name is empty for separators.
+    # The kind is empty for separators, "*" for the items that call the
+    # dispatcher, and ":submenu" for the submenus.
+    name: str
+    kind: str
+    options: tuple = ()
+    slot: Optional[int] = None
+    # Whether the submenu was created from a nested list and is deleted with
+    # the item.
+    owned: bool = False
+
+
+class _MenuModel:
+    # The items of a menu created by Menu.build(). The model becomes stale
+    # when the menu is changed by the other methods.
+
+    def __init__(self, stale=False):
+        self.items: List[_MenuItem] = []
+        self.stale = stale
+
+
+_menu_models: Dict[str, _MenuModel] = {}
+# The names of the menus that were changed by the other methods before they
+# got a model. Their item positions don't match the model.
+_changed_menus: Set[str] = set()
+
+
+def _get_menu_model(menu) -> _MenuModel:
+    model = _menu_models.get(menu.name)
+    if model is None:
+        stale = menu.name in _changed_menus
+        _changed_menus.discard(menu.name)
+        model = _menu_models[menu.name] = _MenuModel(stale)
+    return model
+
+
+def _forget_menu_model(menu_name, ops=None):
+    # Release the callbacks of the deleted items. The owned submenus are
+    # deleted with the menu.
+    model = _menu_models.pop(menu_name, None)
+    if model is None:
+        return
+    for item in model.items:
+        _release_menu_item(item, ops)
+
+
+def _release_menu_item(item, ops):
+    if item.slot is not None:
+        _menu_dispatch.release(item.slot)
+    if item.owned:
+        submenu_name = item.kind[1:]
+        _forget_menu_model(submenu_name, ops)
+        if ops is not None:
+            ops.append(("Z", submenu_name))
+
+
+def _parse_menu_entry(entry, wrappers):
+    # Convert the spec entry into the (item, target) pair, where target is the
+    # wrapped callback, the nested spec list, or None.
+    if entry is None:
+        return _MenuItem("", ""), None
+
+    if not isinstance(entry, (tuple, list)) or not 2 <= len(entry) <= 3:
+        raise TypeError(f"menu item must be None or a tuple of 2 or 3 elements, not {entry!r}")
+    item_name, target, *rest = entry
+    options = rest[0] if rest else {}
+    unknown = set(options) - MENU_ITEM_OPTIONS
+    if unknown:
+        raise TypeError(f"unknown menu item options: {', '.join(sorted(unknown))}")
+    if not isinstance(item_name, str) or not item_name:
+        raise TypeError("item_name must be a non-empty string")
+
+    if isinstance(target, list):
+        if not target:
+            raise ValueError(f"submenu {item_name!r} must not be empty")
+        kind = ":"
+        priority = None
+    elif isinstance(target, Menu):
+        kind = f":{target.name}"
+        target = None
+        priority = None
+    elif callable(target):
+        kind = "*"
+        wrapper = wrappers.get(id(target))
+        if wrapper is None:
+            wrapper = _wrap_callback(
+                target,
+                ("item_name", "item_pos", "menu"),
+                _bare_menu_item_handler,
+                _menu_item_handler,
+            )
+            # Keep the target alive so that its id is not reused.
+            wrappers[id(target)] = wrapper, target
+        else:
+            wrapper = wrapper[0]
+        target = wrapper
+        priority = options.get("priority", 0)
+    else:
+        raise TypeError(f"menu item target must be a callable, a Menu, or a list, not {target!r}")
+
+    flags = "".join([
+        "D" if options.get("default") else "",
+        "X" if not options.get("enabled", True) else "",
+        "C" if options.get("checked") else "",
+    ])
+    icon = options.get("icon")
+    icon_number = options.get("icon_number") or 0
+    icon_width = options.get("icon_width")
+    item_options = (
+        _menu_item_options(
+            priority,
+            options.get("radio", False),
+            options.get("new_column", False),
+            options.get("bar_column", False),
+        ),
+        flags,
+        icon or "",
+        str(icon_number + 1) if icon else "",
+        str(icon_width) if icon and icon_width is not None else "",
+    )
+    for field in (item_name, *item_options):
+        if MENU_RECORD_SEP in field or MENU_FIELD_SEP in field:
+            raise ValueError(f"menu item {item_name!r} contains a control character")
+    return _MenuItem(item_name, kind, item_options), target
+
+
+def _insert_menu_item(menu, model, index, item, target, ops, wrappers):
+    # Insert the item before the item at index in the model.
+    if item.kind == ":":
+        submenu = Menu()
+        _append_menu_items(submenu, target, ops, wrappers)
+        item.kind = f":{submenu.name}"
+        item.owned = True
+    elif item.kind == "*":
+        item.slot = _menu_dispatch.add(target)
+    position = f"{index + 1}&" if index < len(model.items) else ""
+    ops.append(("I", menu.name, position, item.name, item.kind, item.slot, *item.options))
+    model.items.insert(index, item)
+
+
+def _append_menu_items(menu, spec, ops, wrappers):
+    model = _get_menu_model(menu)
+    for entry in spec:
+        item, target = _parse_menu_entry(entry, wrappers)
+        _insert_menu_item(menu, model, len(model.items), item, target, ops, wrappers)
+
+
+def _sync_menu_items(menu, spec, ops, wrappers):
+    # Change the menu items to match the spec with as few operations as
+    # possible. The items are matched by their names and the separators by
+    # their order. The matched items keep their dispatcher slots, so their
+    # callbacks are replaced without calling AHK.
+    model = _get_menu_model(menu)
+    if model.stale:
+        _forget_menu_model(menu.name, ops)
+        ops.append(("X", menu.name))
+        _forget_dynamic_submenus(menu.name, ops)
+        model = _get_menu_model(menu)
+
+    desired = [_parse_menu_entry(entry, wrappers) for entry in spec]
+    old = model.items
+    old_keys = _menu_item_keys(old)
+    new_keys = _menu_item_keys([item for item, _ in desired])
+    if len(set(new_keys)) != len(new_keys):
+        seen = set()
+        for (item, _), key in zip(desired, new_keys):
+            if key in seen:
+                raise ValueError(f"duplicate menu item name {item.name!r}")
+            seen.add(key)
+    old_default = next((item.name for item in old if _is_default_menu_item(item)), None)
+
+    # The items that stay in place are found by the longest matching
+    # subsequence of the names. The rest of the items are either renamed in
+    # place, moved, deleted, or inserted.
+    old_key_set = set(old_keys)
+    new_key_set = set(new_keys)
+    kept = {}
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for k in range(i2 - i1):
+                kept[j1 + k] = old[i1 + k]
+        elif tag == "replace":
+            # An item that is replaced by an item with a new name is renamed.
+            for k in range(min(i2 - i1, j2 - j1)):
+                if (
+                    old_keys[i1 + k] not in new_key_set and
+                    new_keys[j1 + k] not in old_key_set and
+                    old[i1 + k].name and
+                    desired[j1 + k][0].name
+                ):
+                    kept[j1 + k] = old[i1 + k]
+    old_by_key = dict(zip(old_keys, old))
+    moved = {}
+    for j, key in enumerate(new_keys):
+        if j not in kept and key in old_by_key:
+            moved[j] = old_by_key[key]
+    for mapping in (kept, moved):
+        for j, item in list(mapping.items()):
+            if not _can_reuse_menu_item(item, desired[j][0]):
+                del mapping[j]
+    new_index = {id(item): j for j, item in kept.items()}
+    moving = {id(item) for item in moved.values()}
+
+    for index in reversed(range(len(old))):
+        item = old[index]
+        if id(item) in new_index:
+            continue
+        old.pop(index)
+        ops.append(("D", menu.name, f"{index + 1}&"))
+        if id(item) not in moving:
+            _release_menu_item(item, ops)
+
+    for position, item in enumerate(model.items):
+        new_item, target = desired[new_index[id(item)]]
+        if item.name != new_item.name:
+            ops.append(("R", menu.name, f"{position + 1}&", new_item.name))
+            item.name = new_item.name
+        _update_menu_item(menu, position, item, new_item, ops)
+        _reuse_menu_item(item, target, ops, wrappers)
+
+    for j, (new_item, target) in enumerate(desired):
+        if j in kept:
+            continue
+        item = moved.get(j)
+        if item is None:
+            _insert_menu_item(menu, model, j, new_item, target, ops, wrappers)
+            continue
+        item.name = new_item.name
+        item.options = new_item.options
+        position = f"{j + 1}&" if j < len(model.items) else ""
+        ops.append(("I", menu.name, position, item.name, item.kind, item.slot, *item.options))
+        model.items.insert(j, item)
+        _reuse_menu_item(item, target, ops, wrappers)
+
+    # The default item is set by the insert operation. The kept items need a
+    # separate operation, because there is only one default item in a menu.
+    new_default = next((j for j, (item, _) in enumerate(desired) if _is_default_menu_item(item)), None)
+    if new_default is None:
+        if old_default is not None:
+            ops.append(("U", menu.name, "", "", "-D"))
+    elif new_default in kept and desired[new_default][0].name != old_default:
+        ops.append(("U", menu.name, f"{new_default + 1}&", "", "+D"))
+
+
+def _menu_item_keys(items):
+    keys = []
+    separators = 0
+    for item in items:
+        if item.name:
+            keys.append((item.name.lower(), 0))
+        else:
+            separators += 1
+            keys.append(("", separators))
+    return keys
+
+
+def _is_default_menu_item(item):
+    return bool(item.name) and "D" in item.options[1]
+
+
+def _can_reuse_menu_item(old, new):
+    if new.kind == ":":
+        return old.owned
+    return old.kind == new.kind and not old.owned
+
+
+def _update_menu_item(menu, position, item, new_item, ops):
+    old_options, new_options = item.options, new_item.options
+    item.options = new_options
+    if old_options == new_options or not item.name:
+        return
+    option_str = new_options[0] if new_options[0] != old_options[0] else ""
+    flags = ""
+    for flag in "XC":
+        if (flag in old_options[1]) != (flag in new_options[1]):
+            flags += ("+" if flag in new_options[1] else "-") + flag
+    icon_op = ""
+    if old_options[2:] != new_options[2:]:
+        icon_op = "+" if new_options[2] else "-"
+    if option_str or flags or icon_op:
+        ops.append(("U", menu.name, f"{position + 1}&", option_str, flags, icon_op, *new_options[2:]))
+
+
+def _reuse_menu_item(item, target, ops, wrappers):
+    if item.slot is not None:
+        _menu_dispatch.callbacks[item.slot] = target
+    elif item.owned:
+        _sync_menu_items(Menu(item.kind[1:]), target, ops, wrappers)
+
+
+def _apply_menu_ops(ops):
+    if not ops:
+        return
+    records = []
+    for op in ops:
+        records.append(MENU_FIELD_SEP.join("" if field is None else str(field) for field in op))
+    ahk_call("MenuApply", MENU_RECORD_SEP.join(records), _menu_dispatch)
+
+
+def _menu_item_options(priority, radio, new_column, bar_column):
+    option_list = []
+    if priority is not None:
+        option_list.append(f"P{priority}")
+    if radio is not None:
+        option_list.append(f"{'+' if radio else '-'}Radio")
+    if new_column is not None:
+        option_list.append(f"{'+' if new_column else '-'}Break")
+    if bar_column is not None:
+        option_list.append(f"{'+' if bar_column else '-'}BarBreak")
+    return " ".join(option_list)
+
+
+WM_INITMENUPOPUP = 0x0117
+
+
+class _DynamicSubmenu:
+    def __init__(self, menu, provider, max_age, placeholder, parent=None):
+        self.menu = menu
+        self.provider = provider
+        self.max_age = max_age
+        self.placeholder = placeholder
+        # The menu that has the item of the submenu.
+        self.parent = parent
+        self.updated = None
+
+    def placeholder_spec(self):
+        return [(self.placeholder, _noop, {"enabled": False})]
+
+    def refresh(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        if self.updated is not None and now - self.updated < self.max_age:
+            return
+        try:
+            spec = self.provider()
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+            return
+        self.updated = now
+        ops = []
+        _sync_menu_items(self.menu, spec or self.placeholder_spec(), ops, {})
+        _apply_menu_ops(ops)
+
+
+# The dynamic submenus by their HMENU.
+_dynamic_submenus: Dict[int, _DynamicSubmenu] = {}
+_menu_popup_handler = None
+
+
+def _forget_dynamic_submenus(parent_name, ops):
+    # The items of the dynamic submenus were deleted with the items of the
+    # parent menu. Delete the submenus too.
+    for handle, dynamic in list(_dynamic_submenus.items()):
+        if dynamic.parent is not None and dynamic.parent.name == parent_name:
+            del _dynamic_submenus[handle]
+            _forget_menu_model(dynamic.menu.name, ops)
+            ops.append(("Z", dynamic.menu.name))
+
+
+def _watch_menu_popups():
+    global _menu_popup_handler
+    if _menu_popup_handler is None:
+        _menu_popup_handler = on_message(WM_INITMENUPOPUP, _on_init_menu_popup)
+
+
+def _on_init_menu_popup(w_param, l_param, msg, hwnd):
+    # wParam is the handle of the menu that is about to be opened.
+    dynamic = _dynamic_submenus.get(w_param)
+    if dynamic is not None:
+        dynamic.refresh()
+
+
+def _noop():
+    pass
 
 
 def _bare_menu_item_handler(callback, *_):
@@ -1,25 +1,35 @@
-from typing import Tuple
+import bisect
+import math
+import uuid
+from array import array
+from time import perf_counter
+from typing import Callable, Iterable, List, Optional, Tuple, Union
 
 from .flow import ahk_call, global_ahk_lock
+from .optional import numpy as _numpy
 from .sending import send
-from .settings import _set_coord_mode, get_settings
+from .settings import COORD_MODES, _set_coord_mode, get_settings
 from .unset import UNSET
 from .window import Control, Window
 
 __all__ = [
+    "MouseSampler",
     "click",
     "double_click",
+    "drag_path",
     "get_control_under_mouse",
     "get_cursor_type",
     "get_mouse_pos",
     "get_window_under_mouse",
     "mouse_move",
+    "mouse_path",
     "mouse_press",
     "mouse_release",
     "mouse_scroll",
     "right_click",
 ]
 
+
 # Not implementing MouseClickDrag and passing coordinates in Click because it
 # complicates the signature. Use separate commands instead.
 #
@@ -237,6 +247,189 @@ def mouse_move(x, y, *, relative_to="window", mode=None, speed=None, delay=None)
         _send_click(str(int(x)), str(int(y)), no_click, offset, mode=mode, delay=delay)
 
 
+def mouse_path(
+    points: Iterable[Tuple[int, int]], *,
+    duration=0.5, easing: Union[str, Callable] = "ease_in_out", curve="polyline",
+    rate=120, relative_to="window",
+):
+    """Move the mouse cursor smoothly along the path defined by *points*.
+
+    The *points* argument is a sequence of ``(x, y)`` tuples. If *curve* is
+    ``"polyline"`` (default), the cursor passes through every point. If
+    *curve* is ``"bezier"``, the points are the control points of a Bézier
+    curve, which starts at the first point and ends at the last one.
+
+    The *duration* argument sets the time in seconds the movement takes.
+
+    The *easing* argument sets how the speed changes along the path. Takes one
+    of the following values: ``"linear"``, ``"ease_in"``, ``"ease_out"``,
+    ``"ease_in_out"``, or a function that maps the elapsed time fraction from 0
+    to 1 to the travelled distance fraction.
+
+    The path is sampled *rate* times per second. All the movements are
+    executed in one call to AHK, which keeps the intervals between them
+    precise. Since AHK doesn't process its message queue during the movement,
+    hotkeys and timers are delayed until it's done.
+
+    For the *relative_to* argument refer to :func:`mouse_move`, with the
+    exception that ``"cursor"`` is not supported.
+
+    The path points are computed with NumPy if it's installed::
+
+        # Move in an arc from (100, 100) to (500, 100) in half a second.
+        ahkpy.mouse_path([(100, 100), (300, -100), (500, 100)], curve="bezier", relative_to="screen")
+
+    :command: `MouseMove
+       <https://www.autohotkey.com/docs/commands/MouseMove.htm>`_
+    """
+    if duration < 0:
+        raise ValueError("duration must be positive")
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if relative_to == "cursor":
+        raise ValueError("'cursor' coord mode is not supported")
+
+    path = _compute_mouse_path(points, duration, easing, curve, rate)
+    packed_points = " ".join(f"{x},{y}" for x, y in path)
+    interval = duration * 1000 / (len(path) - 1) if len(path) > 1 else 0
+    with global_ahk_lock:
+        _set_coord_mode("mouse", relative_to)
+        ahk_call("MousePath", packed_points, float(interval))
+
+
+def drag_path(
+    points: Iterable[Tuple[int, int]], button="left", *,
+    duration=0.5, easing: Union[str, Callable] = "ease_in_out", curve="polyline",
+    rate=120, relative_to="window", modifier: str = None, blind=True,
+):
+    """Drag the mouse along the path defined by *points* while holding down
+    the *button*.
+
+    The cursor is moved to the first point, then the button is pressed, the
+    cursor follows the path, and the button is released.
+
+    For the *button*, *modifier*, and *blind* arguments refer to :func:`click`.
+    For the rest of the arguments refer to :func:`mouse_path`.
+
+    :command: `MouseClickDrag
+       <https://www.autohotkey.com/docs/commands/MouseClickDrag.htm>`_
+    """
+    points = list(points)
+    if not points:
+        raise ValueError("points must not be empty")
+    if button not in BUTTONS:
+        raise ValueError(f"{button!r} is not a valid mouse button")
+
+    with global_ahk_lock:
+        x, y = points[0]
+        mouse_move(x, y, relative_to=relative_to, speed=0)
+        mouse_press(button, modifier=modifier, blind=blind)
+        try:
+            mouse_path(
+                points, duration=duration, easing=easing, curve=curve,
+                rate=rate, relative_to=relative_to,
+            )
+        finally:
+            mouse_release(button, modifier=modifier, blind=blind)
+
+
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t * t,
+    "ease_out": lambda t: 1 - (1 - t) ** 3,
+    "ease_in_out": lambda t: t * t * (3 - 2 * t),
+}
+CURVES = {"polyline", "bezier"}
+
+
+def _compute_mouse_path(points, duration, easing, curve, rate) -> List[Tuple[int, int]]:
+    points = [(float(x), float(y)) for x, y in points]
+    if not points:
+        raise ValueError("points must not be empty")
+    if curve not in CURVES:
+        raise ValueError(f"{curve!r} is not a valid curve")
+
+    if isinstance(easing, str):
+        try:
+            easing_func = EASINGS[easing]
+        except KeyError:
+            raise ValueError(f"{easing!r} is not a valid easing") from None
+        vectorized = True
+    elif callable(easing):
+        easing_func = easing
+        vectorized = False
+    else:
+        raise TypeError("easing must be a string or a callable")
+
+    count = max(2, math.ceil(duration * rate) + 1)
+    if _numpy() is not None:
+        return _compute_mouse_path_numpy(points, count, easing_func, vectorized, curve)
+
+    ts = [i / (count - 1) for i in range(count)]
+    progress = [min(1.0, max(0.0, easing_func(t))) for t in ts]
+    if curve == "bezier":
+        n = len(points) - 1
+        coeffs = [math.comb(n, i) for i in range(n + 1)]
+        path = []
+        for s in progress:
+            x = y = 0.0
+            for i, (px, py) in enumerate(points):
+                b = coeffs[i] * s**i * (1 - s)**(n - i)
+                x += b * px
+                y += b * py
+            path.append((x, y))
+    else:
+        cumulative = [0.0]
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            cumulative.append(cumulative[-1] + math.hypot(x2 - x1, y2 - y1))
+        total = cumulative[-1]
+        path = []
+        for s in progress:
+            if total == 0:
+                path.append(points[-1])
+                continue
+            dist = s * total
+            i = min(max(bisect.bisect_right(cumulative, dist) - 1, 0), len(points) - 2)
+            seg = cumulative[i+1] - cumulative[i]
+            frac = (dist - cumulative[i]) / seg if seg else 0.0
+            (x1, y1), (x2, y2) = points[i], points[i+1]
+            path.append((x1 + (x2 - x1) * frac, y1 + (y2 - y1) * frac))
+    return [(round(x), round(y)) for x, y in path]
+
+
+def _compute_mouse_path_numpy(points, count, easing_func, vectorized, curve):
+    np = _numpy()
+    pts = np.array(points, dtype=float)
+    ts = np.linspace(0.0, 1.0, count)
+    if vectorized:
+        progress = easing_func(ts)
+    else:
+        progress = np.array([easing_func(t) for t in ts], dtype=float)
+    progress = np.clip(progress, 0.0, 1.0)
+
+    if curve == "bezier":
+        n = len(pts) - 1
+        i = np.arange(n + 1)
+        coeffs = np.array([math.comb(n, k) for k in i], dtype=float)
+        basis = coeffs * progress[:, None] ** i * (1 - progress[:, None]) ** (n - i)
+        path = basis @ pts
+    elif len(pts) == 1:
+        path = np.repeat(pts, count, axis=0)
+    else:
+        seg_lengths = np.hypot(*np.diff(pts, axis=0).T)
+        cumulative = np.concatenate([[0.0], np.cumsum(seg_lengths)])
+        total = cumulative[-1]
+        if total == 0:
+            path = np.repeat(pts[-1:], count, axis=0)
+        else:
+            dist = progress * total
+            path = np.column_stack([
+                np.interp(dist, cumulative, pts[:, 0]),
+                np.interp(dist, cumulative, pts[:, 1]),
+            ])
+    return [(int(x), int(y)) for x, y in np.rint(path)]
+
+
 def _send_click(*args, modifier: str = None, blind=True, mode=None, level=None, delay=None):
     if modifier is not None:
         unknown_modifiers = set(modifier) - MODIFIERS
@@ -282,6 +475,284 @@ def get_mouse_pos(relative_to="window") -> Tuple[int, int]:
     return (result["X"], result["Y"])
 
 
+class MouseSampler:
+    """The object that samples the mouse position *hz* times per second into a
+    fixed-size ring buffer.
+
+    The sampling is done by an AHK timer that writes the samples directly into
+    the preallocated :class:`array.array` buffers, so it doesn't call Python
+    code on every tick. The AHK timers can't fire more often than the system
+    timer resolution allows, which is usually 64 times per second.
+
+    The optional *capacity* argument sets the maximum number of samples held in
+    the buffer. Defaults to 1024.
+
+    For the *relative_to* argument refer to :func:`get_mouse_pos`. Defaults to
+    ``"screen"``.
+
+    If the optional *with_window* argument is true, the ID of the window under
+    the mouse cursor is sampled too.
+
+    The samples are read by copying them into the caller's buffers with
+    :meth:`read_into`, or as new arrays with :meth:`snapshot`,
+    :meth:`velocity`, and :meth:`acceleration`. The arrays are
+    :class:`numpy.ndarray` if NumPy is installed::
+
+        with ahkpy.MouseSampler(hz=60) as sampler:
+            ahkpy.sleep(1)
+            vx, vy = sampler.velocity()
+
+    The :attr:`dropped` counter and :attr:`jitter` show how precisely the
+    samples are taken.
+    """
+
+    def __init__(self, hz=60, capacity=1024, *, relative_to="screen", with_window=False):
+        if hz <= 0:
+            raise ValueError("hz must be positive")
+        if capacity <= 1:
+            raise ValueError("capacity must be greater than 1")
+        if relative_to not in COORD_MODES:
+            raise ValueError(f"{relative_to!r} is not a valid coord mode")
+
+        self.hz = hz
+        self.capacity = capacity
+        self.relative_to = relative_to
+        self.with_window = with_window
+
+        # The samples count and the number of missed ticks.
+        self._state = array("q", [0, 0])
+        self._times = array("d", [0.0]) * capacity
+        self._xs = array("i", [0]) * capacity
+        self._ys = array("i", [0]) * capacity
+        self._hwnds = array("q", [0]) * capacity
+        self._last_time = None
+        self._id = None
+
+    @property
+    def interval(self) -> float:
+        """The expected interval between the samples in seconds.
+
+        :type: float
+        """
+        return self._period / 1000
+
+    @property
+    def _period(self):
+        return max(1, round(1000 / self.hz))
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the sampler is taking the samples.
+
+        :type: bool
+        """
+        return self._id is not None
+
+    def start(self):
+        """Start sampling the mouse position."""
+        if self._id is not None:
+            return
+        self._id = str(uuid.uuid4())
+        # Keep the sampler alive while AHK writes into its buffers.
+        _running_samplers[self._id] = self
+        addresses = " ".join(
+            str(arr.buffer_info()[0])
+            for arr in [self._state, self._times, self._xs, self._ys, self._hwnds]
+        )
+        ahk_call(
+            "MouseSamplerStart", self._id, addresses, self.capacity, self._period, self.relative_to,
+            int(bool(self.with_window)),
+        )
+
+    def stop(self):
+        """Stop sampling the mouse position.
+
+        The samples that are already in the buffer can still be read.
+        """
+        if self._id is None:
+            return
+        ahk_call("MouseSamplerStop", self._id)
+        del _running_samplers[self._id]
+        self._id = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def feed(self, x: int, y: int, hwnd=0, time: float = None):
+        """Put the sample into the buffer as if it was taken by AHK.
+
+        It can be used to test the consumers of the sampler without moving the
+        mouse.
+        """
+        if time is None:
+            time = perf_counter()
+        count = self._state[0]
+        if self._last_time is not None:
+            missed = round((time - self._last_time) * 1000 / self._period) - 1
+            if missed > 0:
+                self._state[1] += missed
+        self._last_time = time
+        i = count % self.capacity
+        self._times[i] = time
+        self._xs[i] = x
+        self._ys[i] = y
+        self._hwnds[i] = hwnd
+        self._state[0] = count + 1
+
+    @property
+    def count(self) -> int:
+        """The total number of samples taken.
+
+        :type: int
+        """
+        return self._state[0]
+
+    @property
+    def dropped(self) -> int:
+        """The number of samples that were not taken because AHK was busy.
+
+        :type: int
+        """
+        return self._state[1]
+
+    def __len__(self):
+        return min(self._state[0], self.capacity)
+
+    def last(self) -> Optional[Tuple[int, int]]:
+        """Return the latest ``(x, y)`` sample, or ``None`` if there are no
+        samples.
+        """
+        count = self._state[0]
+        if not count:
+            return None
+        i = (count - 1) % self.capacity
+        return (self._xs[i], self._ys[i])
+
+    def last_window(self) -> Optional[Window]:
+        """last_window() -> Optional[ahkpy.Window]
+
+        Return the window under the mouse cursor in the latest sample, or
+        ``None`` if there are no samples or *with_window* is false.
+        """
+        count = self._state[0]
+        if not count or not self.with_window:
+            return None
+        hwnd = self._hwnds[(count - 1) % self.capacity]
+        return Window(hwnd or None)
+
+    def read_into(self, times, xs, ys, hwnds=None) -> int:
+        """Copy the buffered samples into *times*, *xs*, *ys*, and optionally
+        *hwnds* in chronological order.
+
+        The arguments are writable buffers, such as :class:`array.array` or
+        :class:`numpy.ndarray`, of the ``"d"``, ``"i"``, ``"i"``, and ``"q"``
+        types. Only the latest samples that fit into the shortest buffer are
+        copied. Copying allocates no memory proportional to the number of
+        samples.
+
+        Returns the number of samples copied.
+        """
+        targets = [times, xs, ys]
+        sources = [self._times, self._xs, self._ys]
+        if hwnds is not None:
+            targets.append(hwnds)
+            sources.append(self._hwnds)
+        views = [memoryview(t).cast("B").cast(s.typecode) for t, s in zip(targets, sources)]
+        limit = min(len(v) for v in views)
+
+        count = self._state[0]
+        n = min(count, self.capacity, limit)
+        start = (count - n) % self.capacity
+        first = min(n, self.capacity - start)
+        for view, source in zip(views, sources):
+            src = memoryview(source)
+            view[:first] = src[start:start+first]
+            view[first:n] = src[:n-first]
+        return n
+
+    def snapshot(self):
+        """Return the ``(times, xs, ys)`` arrays of the buffered samples in
+        chronological order.
+        """
+        n = len(self)
+        times = array("d", [0.0]) * n
+        xs = array("i", [0]) * n
+        ys = array("i", [0]) * n
+        n = self.read_into(times, xs, ys)
+        np = _numpy()
+        if np is not None:
+            return (
+                np.frombuffer(times, dtype=np.float64)[:n],
+                np.frombuffer(xs, dtype=np.intc)[:n],
+                np.frombuffer(ys, dtype=np.intc)[:n],
+            )
+        return times[:n], xs[:n], ys[:n]
+
+    def velocity(self):
+        """Return the ``(vx, vy)`` arrays of the mouse velocity between the
+        consecutive samples in pixels per second.
+        """
+        times, xs, ys = self.snapshot()
+        return _derivative(times, xs, ys)[1:]
+
+    def acceleration(self):
+        """Return the ``(ax, ay)`` arrays of the mouse acceleration between the
+        consecutive velocity values in pixels per second squared.
+        """
+        times, xs, ys = self.snapshot()
+        mid_times, vx, vy = _derivative(times, xs, ys)
+        return _derivative(mid_times, vx, vy)[1:]
+
+    @property
+    def jitter(self) -> float:
+        """The mean absolute deviation of the intervals between the buffered
+        samples from the expected :attr:`interval`, in seconds. The intervals
+        that include the dropped samples are not counted.
+
+        :type: float
+        """
+        times, _, _ = self.snapshot()
+        interval = self.interval
+        deviations = [
+            abs(b - a - interval)
+            for a, b in zip(times, times[1:])
+            if b - a < interval * 1.5
+        ]
+        if not deviations:
+            return 0.0
+        return sum(deviations) / len(deviations)
+
+
+_running_samplers = {}
+
+
+def _derivative(times, xs, ys):
+    # Return the midpoint times and the rates of change of xs and ys.
+    np = _numpy()
+    if np is not None:
+        times = np.asarray(times, dtype=np.float64)
+        dt = np.diff(times)
+        dt[dt == 0] = np.nan
+        return (
+            (times[1:] + times[:-1]) / 2,
+            np.nan_to_num(np.diff(np.asarray(xs, dtype=np.float64)) / dt),
+            np.nan_to_num(np.diff(np.asarray(ys, dtype=np.float64)) / dt),
+        )
+    mid_times = array("d")
+    dxs = array("d")
+    dys = array("d")
+    for i in range(1, len(times)):
+        dt = times[i] - times[i-1]
+        mid_times.append((times[i] + times[i-1]) / 2)
+        dxs.append((xs[i] - xs[i-1]) / dt if dt else 0.0)
+        dys.append((ys[i] - ys[i-1]) / dt if dt else 0.0)
+    return mid_times, dxs, dys
+
+
 def get_window_under_mouse() -> Window:
     """get_window_under_mouse() -> ahkpy.Window
 
@@ -0,0 +1,14 @@
+"""The optional dependencies that are imported on first use."""
+
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def numpy():
+    # NumPy is imported by the first function that needs it, because the
+    # import is slow. Return None if NumPy is not installed.
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -0,0 +1,443 @@
+import datetime as dt
+import functools
+import heapq
+import itertools
+import sys
+import time
+from typing import Callable, List, Optional, Union
+
+from .timer import set_countdown
+
+__all__ = [
+    "CronSpec",
+    "Job",
+    "Scheduler",
+    "schedule",
+]
+
+
+CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+WEEKDAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+# The longest time the AHK countdown is armed for. The deadlines are in the
+# wall-clock time, while the AHK timers count the time since boot, so the
+# scheduler wakes up at least this often to notice the system clock changes.
+MAX_SLEEP = 60
+
+# Give up looking for the next run of a cron expression that can never match,
+# like "0 0 31 2 *".
+MAX_CRON_YEARS = 8
+
+
+class CronSpec:
+    """The parsed cron expression.
+
+    The expression consists of five fields separated by spaces: minute, hour,
+    day of month, month, and day of week. Each field is either ``*``, a
+    number, a range like ``1-5``, or a list of those separated by commas. A
+    step can be appended to ``*`` and ranges, e.g. ``*/15``. Months and days
+    of week can be given as three-letter English names. Sunday is either 0 or
+    7.
+
+    As in cron, if both the day of month and the day of week are restricted,
+    the expression matches the days that satisfy either of them.
+
+    The ``@yearly``, ``@monthly``, ``@weekly``, ``@daily``, and ``@hourly``
+    aliases are also supported::
+
+        spec = ahkpy.CronSpec("0 9 * * mon-fri")
+        spec.next_after(datetime.datetime(2023, 3, 11, 12, 0))
+        # datetime.datetime(2023, 3, 13, 9, 0)
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        fields = CRON_ALIASES.get(expr.strip().lower(), expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"{expr!r} is not a valid cron expression: expected 5 fields")
+        minute, hour, day, month, weekday = fields
+        self.minutes = _parse_cron_field(expr, minute, 0, 59)
+        self.hours = _parse_cron_field(expr, hour, 0, 23)
+        self.days = _parse_cron_field(expr, day, 1, 31)
+        self.months = _parse_cron_field(expr, month, 1, 12, MONTH_NAMES)
+        weekdays = _parse_cron_field(expr, weekday, 0, 7, WEEKDAY_NAMES)
+        self.weekdays = sorted({d % 7 for d in weekdays})
+        self._any_day = day == "*"
+        self._any_weekday = weekday == "*"
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.expr!r})"
+
+    def matches_day(self, date: dt.date) -> bool:
+        """Check if the expression matches the *date*."""
+        day_ok = date.day in self.days
+        # Python weekdays start on Monday, cron ones start on Sunday.
+        weekday_ok = (date.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, when: dt.datetime) -> dt.datetime:
+        """Return the first naive datetime after *when* that matches the
+        expression.
+        """
+        when = when.replace(second=0, microsecond=0) + dt.timedelta(minutes=1)
+        date = when.date()
+        hour, minute = when.hour, when.minute
+        last_date = date.replace(year=date.year + MAX_CRON_YEARS)
+        while date < last_date:
+            if date.month not in self.months:
+                # Jump to the first day of the next month.
+                date = (date.replace(day=1) + dt.timedelta(days=32)).replace(day=1)
+                hour = minute = 0
+                continue
+            if not self.matches_day(date):
+                date += dt.timedelta(days=1)
+                hour = minute = 0
+                continue
+            next_minute = _first_at_least(self.minutes, minute)
+            if hour in self.hours and next_minute is not None:
+                return dt.datetime.combine(date, dt.time(hour, next_minute))
+            next_hour = _first_at_least(self.hours, hour + 1)
+            if next_hour is not None:
+                return dt.datetime.combine(date, dt.time(next_hour, self.minutes[0]))
+            date += dt.timedelta(days=1)
+            hour = minute = 0
+        raise ValueError(f"cron expression {self.expr!r} never matches")
+
+
+def _parse_cron_field(expr, field, low, high, names=None):
+    values = set()
+    for part in field.split(","):
+        rng, _, step = part.partition("/")
+        try:
+            step = int(step) if step else 1
+            if rng == "*":
+                start, end = low, high
+            else:
+                start, sep, end = rng.partition("-")
+                start = _parse_cron_value(start, low, names)
+                if sep:
+                    end = _parse_cron_value(end, low, names)
+                elif step != 1:
+                    # "5/15" means "5-59/15".
+                    end = high
+                else:
+                    end = start
+        except ValueError:
+            raise ValueError(f"{expr!r} is not a valid cron expression: invalid field {field!r}") from None
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"{expr!r} is not a valid cron expression: {field!r} is out of range")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def _parse_cron_value(value, low, names):
+    if names is not None and value.lower() in names:
+        return names.index(value.lower()) + low
+    return int(value)
+
+
+def _first_at_least(values, value):
+    for v in values:
+        if v >= value:
+            return v
+    return None
+
+
+class Job:
+    """This object represents a function that is run by a :class:`Scheduler`
+    at the given wall-clock times.
+
+    Creating an instance of :class:`!Job` doesn't add it to the scheduler. Use
+    the :func:`schedule` function or the :meth:`Scheduler.schedule` method
+    instead.
+
+    .. attribute:: func
+
+       The function that is run by the job.
+
+    .. attribute:: spec
+
+       The schedule of the job as it was passed to :func:`schedule`.
+    """
+
+    def __init__(self, scheduler: 'Scheduler', spec, func=None):
+        self.scheduler = scheduler
+        self.spec = spec
+        self.func = func
+        self._next = _make_trigger(spec)
+        self._entry = None
+        #: The number of times the job was run.
+        self.runs = 0
+        #: The number of runs merged into one because the scheduler couldn't
+        #: run the job in time, e.g. when the computer was asleep.
+        self.missed = 0
+        #: The wall-clock timestamp of the last run or ``None``.
+        self.last_run: Optional[float] = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.spec!r}, {self.func!r})"
+
+    @property
+    def next_run(self) -> Optional[dt.datetime]:
+        """The local time of the next run, or ``None`` if the job is stopped.
+
+        :type: datetime.datetime
+        """
+        if self._entry is None:
+            return None
+        return dt.datetime.fromtimestamp(self._entry[0])
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the job is scheduled to run.
+
+        :type: bool
+        """
+        return self._entry is not None
+
+    def start(self):
+        """Schedule the job to run at the next matching time."""
+        if self.func is None:
+            raise TypeError("func must not be None")
+        if not callable(self.func):
+            raise TypeError("job function must be callable")
+        self.scheduler._remove(self)
+        self._reschedule(self.scheduler.now())
+
+    def stop(self):
+        """Remove the job from the scheduler."""
+        self.scheduler._remove(self)
+
+    def _reschedule(self, now):
+        deadline = self._next(now)
+        if deadline is not None:
+            self.scheduler._push(self, deadline)
+
+    def _run(self, deadline, now):
+        # Run the job once even if several of its deadlines have passed.
+        missed = 0
+        deadline = self._next(deadline)
+        while deadline is not None and deadline <= now:
+            missed += 1
+            deadline = self._next(deadline)
+        self.missed += missed
+        self.runs += 1
+        self.last_run = now
+        self._entry = None
+        if deadline is not None:
+            self.scheduler._push(self, deadline)
+        try:
+            self.func()
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+
+
+def _make_trigger(spec):
+    # Return a function that takes the wall-clock timestamp and returns the
+    # timestamp of the next run after it, or None if there are no more runs.
+    if isinstance(spec, str):
+        cron = CronSpec(spec)
+        return lambda now: cron.next_after(dt.datetime.fromtimestamp(now)).timestamp()
+
+    if isinstance(spec, dt.datetime):
+        at = spec.timestamp()
+        return lambda now: at if at > now else None
+
+    if isinstance(spec, dt.timedelta):
+        spec = spec.total_seconds()
+    if isinstance(spec, (int, float)) and not isinstance(spec, bool):
+        interval = float(spec)
+        if not 0 < interval <= 86400:
+            raise ValueError("interval must be positive and not longer than a day")
+
+        def next_aligned(now):
+            # The runs are aligned to the local midnight, so that a job that
+            # runs every 15 minutes runs at :00, :15, :30, and :45.
+            local = dt.datetime.fromtimestamp(now)
+            midnight = dt.datetime.combine(local.date(), dt.time())
+            since_midnight = (local - midnight).total_seconds()
+            next_time = midnight + dt.timedelta(seconds=(since_midnight // interval + 1) * interval)
+            next_midnight = midnight + dt.timedelta(days=1)
+            return min(next_time, next_midnight).timestamp()
+
+        return next_aligned
+
+    raise TypeError(f"schedule must be a cron expression, an interval, or a datetime, not {type(spec).__name__}")
+
+
+class Scheduler:
+    """The object that runs the jobs at the wall-clock times.
+
+    The scheduler keeps the jobs in a heap ordered by the time of their next
+    run and arms a single AHK countdown for the earliest one. The countdown is
+    rearmed after every run. To notice the system clock changes, like the
+    computer waking up from sleep or the clock being set back, the countdown
+    is never armed for longer than a minute. Jobs that missed several runs
+    while the computer was asleep are run once. When the clock goes back, the
+    next runs of all jobs are recalculated from the new time.
+
+    Use the :func:`schedule` function to add jobs to the default scheduler.
+
+    The optional *clock* argument is a function that returns the current
+    wall-clock time as a :func:`time.time` timestamp. If it's given, the
+    scheduler is not driven by AHK and the :meth:`run_pending` method must be
+    called to run the due jobs. It's intended for testing with a virtual
+    clock.
+    """
+
+    def __init__(self, *, clock: Callable[[], float] = None):
+        self._clock = clock if clock is not None else time.time
+        self._driven_by_ahk = clock is None
+        self._heap = []
+        self._seq = itertools.count()
+        self._last_now = self._clock()
+        self._countdown = None
+        self._running = False
+
+    def __len__(self):
+        return sum(1 for entry in self._heap if entry[2]._entry is entry)
+
+    @property
+    def jobs(self) -> List[Job]:
+        """The scheduled jobs in the order of their next runs.
+
+        :type: List[Job]
+        """
+        return [entry[2] for entry in sorted(self._heap) if entry[2]._entry is entry]
+
+    def now(self) -> float:
+        """The current time of the scheduler clock."""
+        return self._clock()
+
+    def schedule(self, spec: Union[str, float, dt.timedelta, dt.datetime], func=None, *args) -> Job:
+        """Run *func* with arguments *args* at the times given by *spec*.
+
+        For the arguments refer to :func:`ahkpy.schedule`.
+
+        If *func* is given, returns an instance of :class:`Job`. Otherwise,
+        the function works as a decorator.
+        """
+        job = Job(self, spec)
+
+        def schedule_decorator(func):
+            if args:
+                func = functools.partial(func, *args)
+            job.func = func
+            job.start()
+            return job
+
+        if func is None:
+            return schedule_decorator
+        return schedule_decorator(func)
+
+    def run_pending(self):
+        """Run the jobs that are due by the current time and rearm the AHK
+        countdown.
+        """
+        now = self._clock()
+        if now < self._last_now:
+            self._recalculate(now)
+        self._last_now = now
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if entry[2]._entry is entry:
+                due.append(entry)
+        self._running = True
+        try:
+            for entry in due:
+                deadline, _, job = entry
+                if job._entry is entry:
+                    # The job was not stopped or restarted by the previous one.
+                    job._run(deadline, now)
+        finally:
+            self._running = False
+            self._arm()
+
+    def _recalculate(self, now):
+        jobs = self.jobs
+        self._heap.clear()
+        for job in jobs:
+            job._entry = None
+            job._reschedule(now)
+
+    def _push(self, job, deadline):
+        entry = [deadline, next(self._seq), job]
+        job._entry = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._arm()
+
+    def _remove(self, job):
+        # The heap entries are discarded lazily when they reach the top.
+        if job._entry is None:
+            return
+        was_first = self._heap[0] is job._entry
+        job._entry = None
+        while self._heap and self._heap[0][2]._entry is not self._heap[0]:
+            heapq.heappop(self._heap)
+        if was_first:
+            self._arm()
+
+    def _arm(self):
+        if not self._driven_by_ahk or self._running:
+            return
+        if not self._heap:
+            if self._countdown is not None:
+                self._countdown.stop()
+                self._countdown = None
+            return
+        delay = min(max(self._heap[0][0] - self._clock(), 0), MAX_SLEEP)
+        if self._countdown is None:
+            self._countdown = set_countdown(delay, self.run_pending)
+        else:
+            self._countdown.start(interval=delay)
+
+
+default_scheduler = Scheduler()
+
+
+def schedule(spec: Union[str, float, dt.timedelta, dt.datetime], func=None, *args) -> Job:
+    """Run *func* with arguments *args* at the wall-clock times given by
+    *spec*.
+
+    The *spec* argument can be:
+
+    - a cron expression, see :class:`CronSpec`. For example, ``"* * * * *"``
+      runs the job every minute on the minute, and ``"0 9 * * mon-fri"`` runs
+      it at 09:00 on weekdays.
+    - a number of seconds or a :class:`datetime.timedelta` no longer than a
+      day. The job runs at the times that are multiples of the interval since
+      the local midnight. For example, ``900`` runs the job at :00, :15, :30,
+      and :45 every hour.
+    - a :class:`datetime.datetime`. The job runs once at that time. Naive
+      datetimes are in the local time.
+
+    If you want the *func* to be called with keyword arguments use
+    :func:`functools.partial`.
+
+    If *func* is given, returns an instance of :class:`Job`. Otherwise, the
+    function works as a decorator::
+
+        @ahkpy.schedule("0 9 * * mon-fri")
+        def standup():
+            ahkpy.message_box("Standup time!")
+
+        assert isinstance(standup, ahkpy.Job)
+
+    The jobs are run by the default :class:`Scheduler`.
+    """
+    return default_scheduler.schedule(spec, func, *args)
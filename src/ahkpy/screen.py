@@ -0,0 +1,556 @@
+import ctypes
+import zlib
+from time import perf_counter
+from typing import Callable, List, Optional, Tuple, Union
+
+from . import colors
+from .flow import ahk_call, _wait_for
+from .optional import numpy as _numpy
+
+__all__ = [
+    "RegionWatcher",
+    "Screenshot",
+]
+
+
+Rect = Tuple[int, int, int, int]
+Color = Union[Tuple[int, int, int], str]
+
+
+def capture(rect: Rect = None) -> 'Screenshot':
+    """capture(rect=None) -> ahkpy.screen.Screenshot
+
+    Capture the screen area.
+
+    The *rect* argument is an ``(x, y, width, height)`` tuple in screen
+    coordinates. If *rect* is ``None``, the primary screen is captured.
+
+    Returns a new :class:`Screenshot` instance.
+    """
+    if rect is None:
+        rect = (0, 0, ahk_call("GetVar", "A_ScreenWidth"), ahk_call("GetVar", "A_ScreenHeight"))
+    shot = Screenshot(rect)
+    shot.refresh()
+    return shot
+
+
+def wait_change(rect: Rect, timeout: float = None, threshold=1, *, variation=0, tile_size=32,
+                min_interval=0.01, max_interval=0.25) -> List[Rect]:
+    """Wait until the screen area changes.
+
+    The area is compared with its state at the moment of the call, so slow
+    gradual changes are detected too.
+
+    Returns the list of the changed tile rectangles. If the area doesn't
+    change after *timeout* seconds, then an empty list will be returned. If
+    *timeout* is not specified or ``None``, there is no limit to the wait time.
+
+    For the *rect* and other arguments refer to :class:`RegionWatcher`::
+
+        # Wait until the progress bar turns into the button.
+        ahkpy.screen.wait_change((100, 100, 300, 20), timeout=60)
+    """
+    watcher = RegionWatcher(
+        rect, threshold=threshold, variation=variation, tile_size=tile_size,
+        min_interval=min_interval, max_interval=max_interval,
+    )
+    return watcher.wait(timeout, update=False)
+
+
+def set_backend(backend: Optional[Callable] = None) -> Callable:
+    """Set the function that captures the screen.
+
+    The *backend* function is called with the ``x, y, width, height, buffer``
+    arguments, and must fill the writable *buffer* of ``width * height * 4``
+    bytes with the BGRA pixels of the screen area, row by row from the top.
+    Use it to feed synthetic frames to the code that works with the screen. If
+    *backend* is ``None``, the default AHK backend is restored.
+
+    Returns the previous backend.
+    """
+    global _backend
+    if backend is not None and not callable(backend):
+        raise TypeError("backend must be callable")
+    previous = _backend
+    _backend = backend if backend is not None else _ahk_backend
+    return previous
+
+
+def _ahk_backend(x, y, width, height, buffer):
+    # AHK writes the pixels directly into the buffer.
+    address = _buffer_address(buffer)
+    lines = ahk_call("ScreenCapture", x, y, width, height, address)
+    if lines != height:
+        raise RuntimeError("capturing the screen failed")
+
+
+def _buffer_address(buffer):
+    return ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+
+
+_backend = _ahk_backend
+
+
+class Screenshot:
+    """The captured pixels of a screen area.
+
+    The pixels are stored in a :class:`bytearray` in the BGRA order, row by
+    row from the top. Use the :attr:`buffer` and :attr:`array` properties to
+    access the pixels without copying them.
+
+    Creating an instance of :class:`!Screenshot` doesn't capture the screen.
+    Use the :func:`capture` function instead.
+
+    All the coordinates the methods take and return are screen coordinates.
+    The colors are either ``(r, g, b)`` tuples or ``"RRGGBB"`` strings.
+    """
+
+    def __init__(self, rect: Rect, data: bytearray = None):
+        x, y, width, height = rect
+        if width <= 0 or height <= 0:
+            raise ValueError("rect size must be positive")
+        size = width * height * 4
+        if data is None:
+            data = bytearray(size)
+        elif len(data) != size:
+            raise ValueError(f"data must be {size} bytes long")
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.data = data
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.rect!r})"
+
+    @property
+    def rect(self) -> Rect:
+        """The captured screen area as an ``(x, y, width, height)`` tuple.
+
+        :type: Tuple[int, int, int, int]
+        """
+        return (self.x, self.y, self.width, self.height)
+
+    @property
+    def buffer(self) -> memoryview:
+        """The :class:`memoryview` of the pixels with the ``(height, width,
+        4)`` shape.
+
+        :type: memoryview
+        """
+        return memoryview(self.data).cast("B", (self.height, self.width, 4))
+
+    @property
+    def array(self):
+        """The :class:`numpy.ndarray` view of the pixels with the ``(height,
+        width, 4)`` shape.
+
+        Raises :exc:`RuntimeError` if NumPy is not installed.
+
+        :type: numpy.ndarray
+        """
+        np = _numpy()
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        return np.frombuffer(self.data, dtype=np.uint8).reshape(self.height, self.width, 4)
+
+    def refresh(self):
+        """Capture the screen area again into the same buffer."""
+        _backend(self.x, self.y, self.width, self.height, self.data)
+
+    def get_pixel(self, x: int, y: int) -> Tuple[int, int, int]:
+        """Get the ``(r, g, b)`` color of the pixel at the given screen
+        coordinates.
+        """
+        offset = self._offset(x, y)
+        b, g, r = self.data[offset:offset+3]
+        return (r, g, b)
+
+    def get_pixel_hex(self, x: int, y: int) -> str:
+        """Get the ``"RRGGBB"`` color of the pixel at the given screen
+        coordinates.
+        """
+        return colors.to_hex(*self.get_pixel(x, y))
+
+    def _offset(self, x, y):
+        col = x - self.x
+        row = y - self.y
+        if not 0 <= col < self.width or not 0 <= row < self.height:
+            raise ValueError(f"point ({x}, {y}) is out of the captured area")
+        return (row * self.width + col) * 4
+
+    def pixel_search(self, color: Color, variation=0) -> Optional[Tuple[int, int]]:
+        """Find the first pixel of the *color*, searching row by row from the
+        top left.
+
+        The *variation* argument is the number of shades (0-255) each of the
+        red, green, and blue components may differ from the *color* in either
+        direction.
+
+        Returns the ``(x, y)`` tuple, or ``None`` if the color is not found.
+
+        :command: `PixelSearch
+           <https://www.autohotkey.com/docs/commands/PixelSearch.htm>`_
+        """
+        for point in self._iter_pixels(color, variation):
+            return point
+        return None
+
+    def pixel_search_all(self, color: Color, variation=0) -> List[Tuple[int, int]]:
+        """Find all the pixels of the *color*.
+
+        For the *variation* argument refer to :meth:`pixel_search`.
+
+        Returns the list of ``(x, y)`` tuples.
+        """
+        return list(self._iter_pixels(color, variation))
+
+    def _iter_pixels(self, color, variation):
+        bgr = _to_bgr(color)
+        variation = _check_variation(variation)
+        np = _numpy()
+        if np is not None:
+            mask = _match_mask(self.array, bgr, variation)
+            rows, cols = np.nonzero(mask)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                yield (self.x + col, self.y + row)
+            return
+
+        data = self.data
+        if variation == 0:
+            # Search for the exact bytes and skip the matches that are not
+            # aligned to the pixels.
+            needle = bytes(bgr)
+            offset = data.find(needle)
+            while offset != -1:
+                if offset % 4 == 0:
+                    yield self._point(offset)
+                    offset = data.find(needle, offset + 4)
+                else:
+                    offset = data.find(needle, offset - offset % 4 + 4)
+            return
+
+        lo = [max(0, c - variation) for c in bgr]
+        hi = [min(255, c + variation) for c in bgr]
+        for offset in range(0, len(data), 4):
+            if (
+                lo[0] <= data[offset] <= hi[0]
+                and lo[1] <= data[offset+1] <= hi[1]
+                and lo[2] <= data[offset+2] <= hi[2]
+            ):
+                yield self._point(offset)
+
+    def _point(self, offset):
+        row, col = divmod(offset // 4, self.width)
+        return (self.x + col, self.y + row)
+
+    def image_search(self, template: 'Screenshot', variation=0) -> Optional[Tuple[int, int]]:
+        """Find the first area that matches the *template* screenshot,
+        searching row by row from the top left.
+
+        For the *variation* argument refer to :meth:`pixel_search`.
+
+        Returns the ``(x, y)`` tuple of the top left corner of the area, or
+        ``None`` if the template is not found.
+
+        :command: `ImageSearch
+           <https://www.autohotkey.com/docs/commands/ImageSearch.htm>`_
+        """
+        variation = _check_variation(variation)
+        tw, th = template.width, template.height
+        if tw > self.width or th > self.height:
+            return None
+
+        np = _numpy()
+        if np is not None:
+            haystack = self.array[:, :, :3].astype(np.int16)
+            needle = template.array[:, :, :3].astype(np.int16)
+            # Check the template pixels one by one, narrowing the candidate
+            # positions, starting with the first pixel. Most of the candidates
+            # are rejected by the first few pixels.
+            candidates = np.ones((self.height - th + 1, self.width - tw + 1), dtype=bool)
+            for row in range(th):
+                for col in range(tw):
+                    window = haystack[row:row+candidates.shape[0], col:col+candidates.shape[1]]
+                    candidates &= np.abs(window - needle[row, col]).max(axis=2) <= variation
+                    rows, cols = np.nonzero(candidates)
+                    if len(rows) <= 16:
+                        # Few candidates are left, compare them entirely.
+                        for r, c in zip(rows.tolist(), cols.tolist()):
+                            area = haystack[r:r+th, c:c+tw]
+                            if np.abs(area - needle).max() <= variation:
+                                return (self.x + c, self.y + r)
+                        return None
+            rows, cols = np.nonzero(candidates)
+            return (self.x + int(cols[0]), self.y + int(rows[0]))
+
+        first = template.get_pixel(template.x, template.y)
+        for x, y in self._iter_pixels(first, variation):
+            col, row = x - self.x, y - self.y
+            if col + tw <= self.width and row + th <= self.height and self._matches(template, col, row, variation):
+                return (x, y)
+        return None
+
+    def _matches(self, template, col, row, variation):
+        data = self.data
+        tdata = template.data
+        tw = template.width
+        for trow in range(template.height):
+            start = ((row + trow) * self.width + col) * 4
+            line = data[start:start+tw*4]
+            tline = tdata[trow*tw*4:(trow+1)*tw*4]
+            if variation == 0:
+                if line[0::4] != tline[0::4] or line[1::4] != tline[1::4] or line[2::4] != tline[2::4]:
+                    return False
+            elif any(abs(a - b) > variation for i, (a, b) in enumerate(zip(line, tline)) if i % 4 != 3):
+                return False
+        return True
+
+    def diff(self, other: 'Screenshot', variation=0) -> Optional[Rect]:
+        """Compare the pixels with the *other* screenshot of the same size.
+
+        For the *variation* argument refer to :meth:`pixel_search`.
+
+        Returns the ``(x, y, width, height)`` bounding rectangle of the
+        different pixels, or ``None`` if the screenshots are the same.
+        """
+        variation = _check_variation(variation)
+        if (self.width, self.height) != (other.width, other.height):
+            raise ValueError("screenshots must be of the same size")
+
+        np = _numpy()
+        if np is not None:
+            a = self.array[:, :, :3].astype(np.int16)
+            b = other.array[:, :, :3].astype(np.int16)
+            changed = np.abs(a - b).max(axis=2) > variation
+            rows = np.flatnonzero(changed.any(axis=1))
+            if not rows.size:
+                return None
+            cols = np.flatnonzero(changed.any(axis=0))
+            top, bottom = int(rows[0]), int(rows[-1])
+            left, right = int(cols[0]), int(cols[-1])
+        else:
+            top = bottom = left = right = None
+            stride = self.width * 4
+            for row in range(self.height):
+                line = self.data[row*stride:(row+1)*stride]
+                other_line = other.data[row*stride:(row+1)*stride]
+                cols = [
+                    col for col in range(self.width)
+                    if any(abs(line[col*4+i] - other_line[col*4+i]) > variation for i in range(3))
+                ]
+                if not cols:
+                    continue
+                if top is None:
+                    top = row
+                    left, right = cols[0], cols[-1]
+                bottom = row
+                left = min(left, cols[0])
+                right = max(right, cols[-1])
+            if top is None:
+                return None
+        return (self.x + left, self.y + top, right - left + 1, bottom - top + 1)
+
+
+def _to_bgr(color):
+    if isinstance(color, str):
+        color = colors.to_tuple(color)
+    r, g, b = color
+    for c in (r, g, b):
+        if not isinstance(c, int):
+            raise TypeError("color values must be integers")
+        if not 0 <= c <= 255:
+            raise ValueError("color values must be between 0 and 255")
+    return (b, g, r)
+
+
+def _check_variation(variation):
+    if not 0 <= variation <= 255:
+        raise ValueError("variation must be between 0 and 255")
+    return int(variation)
+
+
+def _match_mask(pixels, bgr, variation):
+    np = _numpy()
+    diff = np.abs(pixels[:, :, :3].astype(np.int16) - np.array(bgr, dtype=np.int16))
+    return diff.max(axis=2) <= variation
+
+
+class RegionWatcher:
+    """The object that detects the changes of the screen area.
+
+    The *rect* argument is an ``(x, y, width, height)`` tuple in screen
+    coordinates. The area is split into square tiles of *tile_size* pixels.
+    Every captured frame, each tile is hashed and only the tiles with the
+    changed hashes are compared pixel by pixel.
+
+    The area is considered changed if at least *threshold* pixels change. For
+    the *variation* argument refer to :meth:`Screenshot.pixel_search`.
+
+    The frames are captured with an adaptive rate: the interval between the
+    frames starts at *min_interval* seconds, grows up to *max_interval* while
+    the area stays the same, and drops back after the change::
+
+        watcher = ahkpy.screen.RegionWatcher((0, 0, 400, 300))
+        while True:
+            for x, y, width, height in watcher.wait():
+                print("changed", x, y, width, height)
+    """
+
+    def __init__(self, rect: Rect, *, threshold=1, variation=0, tile_size=32, min_interval=0.01,
+                 max_interval=0.25):
+        if threshold < 1:
+            raise ValueError("threshold must be positive")
+        if tile_size < 1:
+            raise ValueError("tile_size must be positive")
+        if min_interval < 0 or max_interval < min_interval:
+            raise ValueError("intervals must satisfy 0 <= min_interval <= max_interval")
+
+        self.threshold = threshold
+        self.variation = _check_variation(variation)
+        self.tile_size = tile_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        #: The current interval between the frames in seconds.
+        self.interval = min_interval
+        #: The number of captured frames.
+        self.frames = 0
+        #: The number of tiles compared pixel by pixel.
+        self.tiles_compared = 0
+
+        self._current = Screenshot(rect)
+        self._previous = Screenshot(rect)
+        x, y, width, height = rect
+        self._tiles = [
+            (col, row, min(tile_size, width - col), min(tile_size, height - row))
+            for row in range(0, height, tile_size)
+            for col in range(0, width, tile_size)
+        ]
+        self._hashes = None
+        self._next_time = 0.0
+
+    @property
+    def rect(self) -> Rect:
+        """The watched screen area.
+
+        :type: Tuple[int, int, int, int]
+        """
+        return self._current.rect
+
+    @property
+    def frame(self) -> Screenshot:
+        """The reference frame the new frames are compared with.
+
+        :type: Screenshot
+        """
+        return self._previous
+
+    def reset(self):
+        """Capture the reference frame."""
+        self._previous.refresh()
+        self._hashes = self._hash_tiles(self._previous)
+        self.frames += 1
+
+    def check(self, *, update=True) -> List[Rect]:
+        """Capture a frame and compare it with the reference frame.
+
+        If *update* is true, the captured frame becomes the new reference
+        frame. Otherwise, the reference frame stays the same.
+
+        Returns the list of the changed tile rectangles.
+        """
+        if self._hashes is None:
+            self.reset()
+
+        self._current.refresh()
+        self.frames += 1
+        hashes = self._hash_tiles(self._current)
+        changed = []
+        changed_pixels = 0
+        for tile, old_hash, new_hash in zip(self._tiles, self._hashes, hashes):
+            if old_hash == new_hash:
+                continue
+            self.tiles_compared += 1
+            count = self._count_changed_pixels(tile)
+            if count:
+                changed.append(tile)
+                changed_pixels += count
+
+        if changed_pixels < self.threshold:
+            changed = []
+        if update:
+            self._current, self._previous = self._previous, self._current
+            self._hashes = hashes
+
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, max(self.interval * 1.5, 0.001))
+        x, y = self._current.x, self._current.y
+        return [(x + col, y + row, width, height) for col, row, width, height in changed]
+
+    def wait(self, timeout: float = None, *, update=True) -> List[Rect]:
+        """Wait until the area changes.
+
+        For the *update* argument refer to :meth:`check`.
+
+        Returns the list of the changed tile rectangles. If the area doesn't
+        change after *timeout* seconds, then an empty list will be returned.
+        If *timeout* is not specified or ``None``, there is no limit to the
+        wait time.
+        """
+        if self._hashes is None:
+            self.reset()
+            self._next_time = perf_counter() + self.interval
+
+        def check_when_due():
+            now = perf_counter()
+            if now < self._next_time:
+                return None
+            changed = self.check(update=update)
+            self._next_time = now + self.interval
+            return changed
+
+        return _wait_for(timeout, check_when_due) or []
+
+    def _hash_tiles(self, shot):
+        view = memoryview(shot.data)
+        stride = shot.width * 4
+        hashes = []
+        for col, row, width, height in self._tiles:
+            crc = 0
+            start = row * stride + col * 4
+            for _ in range(height):
+                crc = zlib.crc32(view[start:start+width*4], crc)
+                start += stride
+            hashes.append(crc)
+        return hashes
+
+    def _count_changed_pixels(self, tile):
+        col, row, width, height = tile
+        variation = self.variation
+        np = _numpy()
+        if np is not None:
+            new = self._current.array[row:row+height, col:col+width, :3].astype(np.int16)
+            old = self._previous.array[row:row+height, col:col+width, :3].astype(np.int16)
+            return int((np.abs(new - old).max(axis=2) > variation).sum())
+
+        new_data = self._current.data
+        old_data = self._previous.data
+        stride = self._current.width * 4
+        count = 0
+        start = row * stride + col * 4
+        for _ in range(height):
+            new_line = new_data[start:start+width*4]
+            old_line = old_data[start:start+width*4]
+            start += stride
+            if new_line == old_line:
+                continue
+            for i in range(0, width * 4, 4):
+                if (
+                    abs(new_line[i] - old_line[i]) > variation
+                    or abs(new_line[i+1] - old_line[i+1]) > variation
+                    or abs(new_line[i+2] - old_line[i+2]) > variation
+                ):
+                    count += 1
+        return count
@@ -0,0 +1,441 @@
+"""The local RPC server that exposes the AutoHotkey.py API to other programs.
+
+Start the server with ``py -m ahkpy serve``. The messages in both directions
+are UTF-8 JSON objects, each prefixed with its length as a 4-byte big-endian
+integer. A request is ``{"id": 1, "method": "send", "params": {"keys":
+"#r"}}``. The server answers with ``{"id": 1, "result": ...}`` or ``{"id": 1,
+"error": {"type": "ValueError", "message": "..."}}``. The triggered hotkeys
+are reported as ``{"event": "hotkey", "key": "F13"}``.
+
+The clients can send many requests without waiting for the responses. The
+requests of all connections are executed in batches on the AHK thread, and
+the responses of one connection come in the order of its requests.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import dataclasses as dc
+import json
+import socket
+import struct
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from .flow import global_ahk_lock, poll
+from .hotkey_context import HotkeyContext
+from .sending import send
+from .window import all_windows, windows
+
+__all__ = [
+    "AHKBackend",
+    "Client",
+    "MethodStats",
+    "RPCServer",
+    "main",
+]
+
+
+HEADER = struct.Struct(">I")
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+
+def _encode(obj) -> bytes:
+    data = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+class AHKBackend:
+    """The backend that executes the requests with the AutoHotkey.py API.
+
+    The hotkeys of the clients are created in a separate hotkey context, so
+    they don't replace the hotkeys of the script. While a client hotkey is
+    enabled, it takes precedence over the script hotkey for the same key.
+    """
+
+    def __init__(self):
+        self._context = HotkeyContext(lambda: True)
+
+    def batch(self):
+        # Hold the lock for the whole batch instead of every AHK call.
+        return global_ahk_lock
+
+    def poll(self):
+        poll()
+
+    def send(self, keys, **options):
+        send(keys, **options)
+
+    def windows(self, hidden=False, **criteria):
+        query = all_windows if hidden else windows
+        return [_window_info(win) for win in query.filter(**criteria)]
+
+    def active_window(self):
+        win = windows.get_active()
+        return _window_info(win) if win else None
+
+    def hotkey(self, key, callback):
+        return self._context.hotkey(key, callback)
+
+    def remove_hotkey(self, handle):
+        handle.disable()
+
+
+def _window_info(win):
+    return {
+        "id": win.id,
+        "title": win.title,
+        "class_name": win.class_name,
+        "pid": win.pid,
+        "rect": win.rect,
+    }
+
+
+@dc.dataclass
+class MethodStats:
+    """The counters of the calls of an RPC method."""
+
+    calls: int = 0
+    errors: int = 0
+    #: The total execution time in seconds.
+    total_time: float = 0.0
+    #: The longest execution time in seconds.
+    max_time: float = 0.0
+
+
+class _Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        # The subscribed key names by their lowercase names.
+        self.hotkeys: Dict[str, str] = {}
+
+    def write(self, obj):
+        if not self.writer.is_closing():
+            self.writer.write(_encode(obj))
+
+
+class _SharedHotkey:
+    # The AHK hotkey that sends the events to all subscribed connections.
+
+    def __init__(self):
+        self.handle = None
+        # The key names by the subscribed connections.
+        self.subscribers: Dict[_Connection, str] = {}
+
+    def notify(self):
+        for conn, key in list(self.subscribers.items()):
+            conn.write({"event": "hotkey", "key": key})
+
+
+class RPCServer:
+    """The server that executes the length-prefixed JSON requests.
+
+    The *backend* executes the methods. It defaults to :class:`AHKBackend`.
+    Up to *max_batch* queued requests are executed at once. The AHK message
+    queue is checked every *poll_interval* seconds so that the hotkeys and
+    timers work while the server is waiting for the requests.
+
+    The :attr:`stats` dict maps the method names to :class:`MethodStats`.
+    """
+
+    def __init__(self, backend=None, *, max_batch=256, poll_interval=0.01):
+        if max_batch <= 0:
+            raise ValueError("max_batch must be positive")
+        self.backend = backend if backend is not None else AHKBackend()
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        #: The :class:`MethodStats` by the method names.
+        self.stats: Dict[str, MethodStats] = {}
+        #: The number of executed batches.
+        self.batches = 0
+
+        self._methods: Dict[str, Callable] = {
+            "active_window": self._active_window,
+            "hotkey": self._hotkey,
+            "ping": self._ping,
+            "remove_hotkey": self._remove_hotkey,
+            "send": self._send,
+            "stats": self._stats,
+            "windows": self._windows,
+        }
+        self._queue: List[tuple] = []
+        # The hotkeys shared by the connections, by the lowercase key names.
+        self._hotkeys: Dict[str, _SharedHotkey] = {}
+        self._ready: Optional[asyncio.Event] = None
+        self._connections: List[_Connection] = []
+
+    async def serve(self, host="localhost", port=3033, *, pipe=None, ready=None):
+        """Listen on the TCP *host* and *port*, or on the named *pipe*, and
+        serve the requests until cancelled.
+
+        The optional *ready* callback is called with the listening address.
+        """
+        loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        if pipe is not None:
+            if not hasattr(loop, "start_serving_pipe"):
+                raise RuntimeError("named pipes are not supported by the event loop")
+            address = rf"\\.\pipe\{pipe}"
+            servers = await loop.start_serving_pipe(
+                lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader(), self._handle_connection),
+                address,
+            )
+            cleanup = [server.close for server in servers]
+        else:
+            server = await asyncio.start_server(self._handle_connection, host, port)
+            address = server.sockets[0].getsockname()[:2]
+            cleanup = [server.close]
+
+        poller = None
+        if self.poll_interval:
+            poller = loop.create_task(self._poll_forever())
+        try:
+            if ready is not None:
+                ready(address)
+            await self._execute_forever()
+        finally:
+            if poller is not None:
+                poller.cancel()
+            for close in cleanup:
+                close()
+
+    async def _poll_forever(self):
+        while True:
+            self.backend.poll()
+            await asyncio.sleep(self.poll_interval)
+
+    async def _handle_connection(self, reader, writer):
+        conn = _Connection(writer)
+        self._connections.append(conn)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                size, = HEADER.unpack(header)
+                if size > MAX_MESSAGE_SIZE:
+                    conn.write({"id": None, "error": {"type": "ValueError", "message": "message is too large"}})
+                    break
+                try:
+                    request = json.loads((await reader.readexactly(size)).decode("utf-8"))
+                except asyncio.IncompleteReadError:
+                    break
+                except ValueError as err:
+                    conn.write({"id": None, "error": {"type": "ValueError", "message": str(err)}})
+                    continue
+                self._queue.append((conn, request))
+                self._ready.set()
+        finally:
+            self._connections.remove(conn)
+            for key in list(conn.hotkeys):
+                self._unsubscribe(conn, key)
+            writer.close()
+
+    async def _execute_forever(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._queue:
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                writers = self.execute_batch(batch)
+                for writer in writers:
+                    with contextlib.suppress(ConnectionError):
+                        await writer.drain()
+
+    def execute_batch(self, batch):
+        """Execute the ``(connection, request)`` tuples and write the
+        responses. Return the writers to drain.
+        """
+        self.batches += 1
+        writers = {}
+        with self.backend.batch():
+            for conn, request in batch:
+                conn.write(self._execute(conn, request))
+                writers[id(conn.writer)] = conn.writer
+        return list(writers.values())
+
+    def _execute(self, conn, request):
+        request_id = request.get("id") if isinstance(request, dict) else None
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return {"id": request_id, "error": {"type": "ValueError", "message": "invalid request"}}
+
+        method_name = request["method"]
+        method = self._methods.get(method_name)
+        if method is None:
+            return {
+                "id": request_id,
+                "error": {"type": "LookupError", "message": f"unknown method {method_name!r}"},
+            }
+
+        stats = self.stats.get(method_name)
+        if stats is None:
+            stats = self.stats[method_name] = MethodStats()
+        params = request.get("params") or {}
+        start = time.perf_counter()
+        try:
+            if not isinstance(params, dict):
+                raise TypeError("params must be an object")
+            result = method(conn, **params)
+        except Exception as err:
+            stats.errors += 1
+            response = {"id": request_id, "error": {"type": type(err).__name__, "message": str(err)}}
+        else:
+            response = {"id": request_id, "result": result}
+        elapsed = time.perf_counter() - start
+        stats.calls += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        return response
+
+    def _ping(self, conn):
+        return "pong"
+
+    def _send(self, conn, keys, **options):
+        self.backend.send(str(keys), **options)
+
+    def _windows(self, conn, **criteria):
+        return self.backend.windows(**criteria)
+
+    def _active_window(self, conn):
+        return self.backend.active_window()
+
+    def _hotkey(self, conn, key):
+        lower_key = str(key).lower()
+        if lower_key in conn.hotkeys or conn.writer.is_closing():
+            return
+        shared = self._hotkeys.get(lower_key)
+        if shared is None:
+            shared = _SharedHotkey()
+            shared.handle = self.backend.hotkey(key, shared.notify)
+            self._hotkeys[lower_key] = shared
+        shared.subscribers[conn] = key
+        conn.hotkeys[lower_key] = key
+
+    def _remove_hotkey(self, conn, key):
+        lower_key = str(key).lower()
+        if lower_key not in conn.hotkeys:
+            raise LookupError(f"hotkey {key!r} is not registered")
+        self._unsubscribe(conn, lower_key)
+
+    def _unsubscribe(self, conn, lower_key):
+        # The AHK hotkey is removed when the last subscriber leaves.
+        del conn.hotkeys[lower_key]
+        shared = self._hotkeys[lower_key]
+        del shared.subscribers[conn]
+        if not shared.subscribers:
+            del self._hotkeys[lower_key]
+            self.backend.remove_hotkey(shared.handle)
+
+    def _stats(self, conn):
+        return {
+            "batches": self.batches,
+            "methods": {name: dc.asdict(stats) for name, stats in self.stats.items()},
+        }
+
+
+class Client:
+    """The blocking client of the :class:`RPCServer`.
+
+    The client doesn't need AHK, so it can be used from any Python program::
+
+        with ahkpy.server.Client("localhost", 3033) as client:
+            client.call("send", keys="#r")
+            results = client.pipeline([("ping", {}), ("windows", {"title": "Notepad"})])
+    """
+
+    def __init__(self, host="localhost", port=3033, *, timeout=10):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = b""
+        self._next_id = 1
+        #: The received events that weren't read yet.
+        self.events: List[dict] = []
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def call(self, method: str, **params):
+        """Call the *method* and return its result."""
+        result, = self.pipeline([(method, params)])
+        return result
+
+    def pipeline(self, calls):
+        """Send all the ``(method, params)`` *calls* at once and return the
+        list of their results.
+
+        Raises :exc:`RuntimeError` if any of the calls fails.
+        """
+        ids = []
+        data = []
+        for method, params in calls:
+            ids.append(self._next_id)
+            data.append(_encode({"id": self._next_id, "method": method, "params": params}))
+            self._next_id += 1
+        self._sock.sendall(b"".join(data))
+
+        results = {}
+        while len(results) < len(ids):
+            message = self._read_message()
+            if "event" in message:
+                self.events.append(message)
+                continue
+            results[message.get("id")] = message
+        output = []
+        for request_id in ids:
+            message = results[request_id]
+            if "error" in message:
+                error = message["error"]
+                raise RuntimeError(f"{error['type']}: {error['message']}")
+            output.append(message["result"])
+        return output
+
+    def wait_event(self) -> dict:
+        """Wait for the next event and return it."""
+        if self.events:
+            return self.events.pop(0)
+        while True:
+            message = self._read_message()
+            if "event" in message:
+                return message
+
+    def _read_message(self):
+        while True:
+            if len(self._buffer) >= HEADER.size:
+                size, = HEADER.unpack_from(self._buffer)
+                end = HEADER.size + size
+                if len(self._buffer) >= end:
+                    data, self._buffer = self._buffer[HEADER.size:end], self._buffer[end:]
+                    return json.loads(data.decode("utf-8"))
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("the server closed the connection")
+            self._buffer += chunk
+
+
+def main(argv=None):
+    """Run the server from the command line arguments."""
+    parser = argparse.ArgumentParser(prog="ahkpy serve", description="Serve the ahkpy API over RPC.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default=3033, type=int)
+    parser.add_argument("--pipe", help="listen on the named pipe instead of TCP")
+    parser.add_argument("--max-batch", default=256, type=int)
+    args = parser.parse_args(argv)
+
+    server = RPCServer(max_batch=args.max_batch)
+
+    def ready(address):
+        print("Listening on", address if args.pipe else " ".join(map(str, address)), flush=True)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port, pipe=args.pipe, ready=ready))
+    except KeyboardInterrupt:
+        sys.exit()
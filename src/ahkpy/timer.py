@@ -1,18 +1,30 @@
+import bisect
 import dataclasses as dc
 import functools
+import itertools
+import math
+import sys
+import time
 import weakref
-from typing import Callable, Optional
+from typing import Callable, List, Optional, Tuple
 
 from .flow import ahk_call, void
 
 __all__ = [
+    "FrameLoop",
+    "FrameTask",
     "Timer",
+    "TimerStats",
+    "TimerWheel",
+    "WheelTimer",
+    "get_timer_stats",
     "set_countdown",
     "set_timer",
+    "timer_report",
 ]
 
 
-def set_timer(interval=0.25, func=None, *args, priority=0):
+def set_timer(interval=0.25, func=None, *args, priority=0, catch_up=False):
     """Create a timer that will run *func* periodically with arguments *args*
     after *interval* seconds have passed.
 
@@ -24,6 +36,11 @@ def set_timer(interval=0.25, func=None, *args, priority=0):
     executed. It must be an :class:`int` between -2147483648 and
     2147483647. Defaults to 0.
 
+    AHK delays the timer if the main thread is busy. By default, the periods
+    that were missed because of the delay are skipped. If the optional
+    *catch_up* argument is true, *func* is called once for every missed
+    period.
+
     If *func* is given, returns an instance :class:`Timer`. Otherwise, the
     function works as a decorator::
 
@@ -36,7 +53,7 @@ def set_timer(interval=0.25, func=None, *args, priority=0):
     :command: `SetTimer
        <https://www.autohotkey.com/docs/commands/SetTimer.htm>`_
     """
-    t = Timer(interval, func, priority, periodic=True)
+    t = Timer(interval, func, priority, periodic=True, catch_up=catch_up)
 
     def set_timer_decorator(func):
         if args:
@@ -95,15 +112,22 @@ class Timer:
 
     Creating an instance of :class:`!Timer` doesn't register the function in
     AHK. Use the :func:`set_timer` or :func:`set_countdown` functions instead.
+
+    .. attribute:: stats
+
+       The :class:`TimerStats` of the timer.
     """
 
     interval: float = 0.25
     func: Optional[Callable] = None
     priority: int = 0
     periodic: bool = True
+    catch_up: bool = False
 
-    def __init__(self, interval=0.25, func=None, priority=0, periodic=True):
+    def __init__(self, interval=0.25, func=None, priority=0, periodic=True, catch_up=False):
         self.func = func
+        self.catch_up = catch_up
+        self.stats = TimerStats(func)
 
         if interval < 0:
             raise ValueError("interval must be positive")
@@ -161,7 +185,8 @@ class Timer:
             # AHK timer was deleted or never started.
             if not callable(self.func):
                 raise TypeError("timer callback must be callable")
-            func_wrapper = void(self.func)
+            self.stats.name = _callable_name(self.func)
+            func_wrapper = void(functools.partial(_run_timer, self.func, self.stats))
             self._ref = weakref.ref(func_wrapper)
             force_restart = True
 
@@ -175,6 +200,7 @@ class Timer:
 
             if periodic is not None:
                 self.periodic = bool(periodic)
+            self.stats._schedule(time.perf_counter() + self.interval, self.interval, self.periodic, self.catch_up)
             if not self.periodic:
                 interval *= -1
         else:
@@ -199,3 +225,734 @@ class Timer:
         func = self._ref()
         if func is not None:
             ahk_call("SetTimer", func, "Delete")
+
+
+def _run_timer(func, stats):
+    fired = time.perf_counter()
+    missed = stats._missed_periods(fired)
+    try:
+        if stats._catch_up:
+            _run_timed(func, stats, fired, 0)
+            # Each missed period is recorded as a separate run that was
+            # scheduled at the start of the period.
+            for _ in range(missed):
+                stats._scheduled += stats._interval
+                _run_timed(func, stats, time.perf_counter(), 0)
+        else:
+            _run_timed(func, stats, fired, missed)
+    finally:
+        if stats._periodic:
+            # AHK schedules the next run from the start of this one.
+            stats._scheduled = fired + stats._interval
+
+
+def _run_timed(func, stats, started, skipped):
+    try:
+        func()
+    finally:
+        stats._record(started, time.perf_counter() - started, skipped)
+
+
+# The upper bounds of the lateness histogram buckets in seconds.
+LATENESS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, float("inf"))
+
+
+class TimerStats:
+    """The metrics of the timer runs.
+
+    The *lateness* is the time between the moment the timer was scheduled to
+    run and the moment it actually ran. Timers run late when the main thread
+    is busy running other callbacks.
+
+    Use the :func:`get_timer_stats` or :func:`timer_report` functions to find
+    the timers that starve the others.
+    """
+
+    def __init__(self, func=None):
+        #: The name of the timer function.
+        self.name = _callable_name(func)
+        self._interval = 0
+        self._periodic = False
+        self._catch_up = False
+        self._scheduled = None
+        self.reset()
+        _all_timer_stats.add(self)
+
+    def reset(self):
+        """Reset the metrics to zero."""
+        #: The number of the timer runs.
+        self.calls = 0
+        #: The number of the periods that were missed because the timer ran
+        #: late.
+        self.skipped = 0
+        #: The number of runs that took longer than the timer interval.
+        self.overruns = 0
+        #: The total time spent in the timer function in seconds.
+        self.total_duration = 0.0
+        #: The longest run of the timer function in seconds.
+        self.max_duration = 0.0
+        #: The total lateness of the runs in seconds.
+        self.total_lateness = 0.0
+        #: The maximum lateness of the runs in seconds.
+        self.max_lateness = 0.0
+        #: The time the last run was scheduled at, in :func:`time.perf_counter`
+        #: seconds.
+        self.last_scheduled = None
+        #: The time the last run actually started.
+        self.last_fired = None
+        self._histogram = [0] * len(LATENESS_BUCKETS)
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__qualname__} {self.name} calls={self.calls} "
+            f"mean_duration={self.mean_duration:.6f} max_lateness={self.max_lateness:.6f} "
+            f"skipped={self.skipped} overruns={self.overruns}>"
+        )
+
+    @property
+    def mean_duration(self) -> float:
+        """The mean duration of the timer runs in seconds.
+
+        :type: float
+        """
+        return self.total_duration / self.calls if self.calls else 0.0
+
+    @property
+    def mean_lateness(self) -> float:
+        """The mean lateness of the timer runs in seconds.
+
+        :type: float
+        """
+        return self.total_lateness / self.calls if self.calls else 0.0
+
+    @property
+    def lateness_histogram(self) -> List[Tuple[float, int]]:
+        """The list of ``(upper_bound, count)`` tuples, where *count* is the
+        number of runs which lateness was at most *upper_bound* seconds and
+        more than the previous bound.
+
+        :type: List[Tuple[float, int]]
+        """
+        return list(zip(LATENESS_BUCKETS, self._histogram))
+
+    def _schedule(self, scheduled, interval, periodic, catch_up):
+        self._scheduled = scheduled
+        self._interval = interval
+        self._periodic = periodic
+        self._catch_up = catch_up
+
+    def _missed_periods(self, fired):
+        if not self._periodic or self._scheduled is None or self._interval <= 0:
+            return 0
+        return max(0, math.floor((fired - self._scheduled) / self._interval))
+
+    def _record(self, fired, duration, missed):
+        scheduled = self._scheduled if self._scheduled is not None else fired
+        lateness = max(0.0, fired - scheduled)
+        self.calls += 1
+        self.skipped += missed
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.last_scheduled = scheduled
+        self.last_fired = fired
+        if self._periodic and duration > self._interval:
+            self.overruns += 1
+        self._histogram[bisect.bisect_left(LATENESS_BUCKETS, lateness)] += 1
+
+
+_all_timer_stats = weakref.WeakSet()
+
+
+def get_timer_stats() -> List[TimerStats]:
+    """Get the :class:`TimerStats` of all the existing timers, sorted by the
+    total duration of their runs from the longest.
+    """
+    return sorted(_all_timer_stats, key=lambda stats: stats.total_duration, reverse=True)
+
+
+def timer_report() -> str:
+    """Format the metrics of all the existing timers as a table.
+
+    The timers that spend the most time in their functions go first::
+
+        print(ahkpy.timer_report())
+    """
+    lines = ["%-40s %8s %12s %12s %12s %8s %8s" % (
+        "timer", "calls", "total, ms", "mean, ms", "late max, ms", "skipped", "overruns",
+    )]
+    for stats in get_timer_stats():
+        if not stats.calls:
+            continue
+        lines.append("%-40s %8d %12.3f %12.3f %12.3f %8d %8d" % (
+            stats.name[:40],
+            stats.calls,
+            stats.total_duration * 1000,
+            stats.mean_duration * 1000,
+            stats.max_lateness * 1000,
+            stats.skipped,
+            stats.overruns,
+        ))
+    return "\n".join(lines)
+
+
+def _callable_name(func):
+    while isinstance(func, functools.partial):
+        func = func.func
+    if func is None:
+        return "<none>"
+    return getattr(func, "__qualname__", None) or repr(func)
+
+
+# The number of slots in the levels of the timer wheel as powers of 2. The
+# first level has a slot per tick, every next level has a slot per full
+# revolution of the previous level.
+WHEEL_LEVEL_BITS = (8, 6, 6, 6)
+
+
+class TimerWheel:
+    """The object that drives any number of timers from a single AHK timer.
+
+    Every AHK timer created with :func:`set_timer` has its own entry in the
+    AHK timer list and its own callback wrapper. When there are hundreds of
+    timers, use a :class:`!TimerWheel` instead. It ticks every *resolution*
+    seconds and fires the due timers, which are kept in a hierarchical timing
+    wheel, so starting and stopping a timer takes constant time::
+
+        wheel = ahkpy.TimerWheel()
+
+        @wheel.set_timer(1)
+        def handler():
+            print("tick")
+
+        assert isinstance(handler, ahkpy.WheelTimer)
+
+    The timers that are due in the same tick are fired in the order of their
+    deadlines, then their priorities from the highest, then their start
+    order.
+
+    The optional *clock* argument is a function that returns the current time
+    in seconds. If it's given, the wheel is not driven by AHK and the
+    :meth:`tick` method must be called to fire the timers. It's intended for
+    testing with a virtual clock.
+    """
+
+    def __init__(self, resolution=0.01, *, clock: Callable[[], float] = None):
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.resolution = resolution
+        self._clock = clock if clock is not None else time.perf_counter
+        self._driven_by_ahk = clock is None
+        self._origin = self._clock()
+        self._tick = 0
+        self._count = 0
+        self._seq = itertools.count()
+        self._levels = [[{} for _ in range(1 << bits)] for bits in WHEEL_LEVEL_BITS]
+        self._level_counts = [0] * len(WHEEL_LEVEL_BITS)
+        self._max_delta = 1 << sum(WHEEL_LEVEL_BITS)
+        self._driver = None
+
+    def __len__(self):
+        return self._count
+
+    def set_timer(self, interval=0.25, func=None, *args, priority=0, catch_up=False):
+        """Create a timer in the wheel that will run *func* periodically with
+        arguments *args* after *interval* seconds have passed.
+
+        For the arguments refer to :func:`ahkpy.set_timer`. If *catch_up* is
+        true, the missed periods are run on the next ticks of the wheel.
+
+        If *func* is given, returns an instance of :class:`WheelTimer`.
+        Otherwise, the function works as a decorator.
+        """
+        return self._create(interval, func, args, priority, periodic=True, catch_up=catch_up)
+
+    def set_countdown(self, interval=0.25, func=None, *args, priority=0):
+        """Create a timer in the wheel that will run *func* once with
+        arguments *args* after *interval* seconds have passed.
+
+        For the arguments refer to :func:`ahkpy.set_countdown`.
+
+        If *func* is given, returns an instance of :class:`WheelTimer`.
+        Otherwise, the function works as a decorator.
+        """
+        return self._create(interval, func, args, priority, periodic=False)
+
+    def _create(self, interval, func, args, priority, periodic, catch_up=False):
+        t = WheelTimer(self, interval, func, priority, periodic, catch_up)
+
+        def set_timer_decorator(func):
+            if args:
+                func = functools.partial(func, *args)
+            t.func = func
+            t.start()
+            return t
+
+        if func is None:
+            return set_timer_decorator
+        return set_timer_decorator(func)
+
+    def now(self) -> float:
+        """The current time of the wheel clock in seconds."""
+        return self._clock()
+
+    def tick(self):
+        """Fire the timers that are due by the current time."""
+        target = self._tick_at(self._clock())
+        due = []
+        while self._tick < target:
+            if not self._count:
+                self._tick = target
+                break
+            # Nothing can fire before the lowest non-empty level cascades, so
+            # skip the ticks up to that.
+            shift = 0
+            for level, bits in enumerate(WHEEL_LEVEL_BITS):
+                if self._level_counts[level]:
+                    break
+                shift += bits
+            if shift:
+                self._tick = min(target - 1, self._tick | ((1 << shift) - 1))
+            self._tick += 1
+            self._cascade()
+            slot = self._levels[0][self._tick & ((1 << WHEEL_LEVEL_BITS[0]) - 1)]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+
+        for t in due:
+            t._slot = None
+            self._count -= 1
+            self._level_counts[0] -= 1
+            if t._expires > self._tick:
+                # The timer was too far in the future for the wheel.
+                self._insert(t)
+            else:
+                t._due = True
+        due = [t for t in due if t._due]
+        due.sort(key=lambda t: (t._expires, -t.priority, t._seq))
+        for t in due:
+            if not t._due:
+                # The timer was stopped or restarted by the previous callback.
+                continue
+            t._due = False
+            t._fire()
+
+        if self._driver is not None and not self._count:
+            self._driver.stop()
+            self._driver = None
+
+    def _tick_at(self, when):
+        return math.floor((when - self._origin) / self.resolution + 1e-9)
+
+    def _cascade(self):
+        # Move the timers from the higher levels to the lower ones when the
+        # lower level completes a revolution.
+        shift = 0
+        for level in range(len(WHEEL_LEVEL_BITS) - 1):
+            shift += WHEEL_LEVEL_BITS[level]
+            if self._tick & ((1 << shift) - 1):
+                return
+            index = (self._tick >> shift) & ((1 << WHEEL_LEVEL_BITS[level + 1]) - 1)
+            slot = self._levels[level + 1][index]
+            timers = list(slot)
+            slot.clear()
+            for t in timers:
+                t._slot = None
+                self._count -= 1
+                self._level_counts[level + 1] -= 1
+                self._insert(t, self._tick)
+
+    def _insert(self, t, earliest=None):
+        if earliest is None:
+            earliest = self._tick + 1
+        expires = max(t._expires, earliest)
+        delta = min(expires - self._tick, self._max_delta - 1)
+        # Timers beyond the wheel range are placed at the farthest slot and
+        # are reinserted when they get there.
+        expires = self._tick + delta
+        shift = 0
+        for level, bits in enumerate(WHEEL_LEVEL_BITS):
+            if delta < 1 << (shift + bits):
+                break
+            shift += bits
+        slot = self._levels[level][(expires >> shift) & ((1 << bits) - 1)]
+        slot[t] = None
+        t._slot = slot
+        t._level = level
+        self._count += 1
+        self._level_counts[level] += 1
+        if self._driven_by_ahk and self._driver is None:
+            self._driver = set_timer(self.resolution, self.tick)
+
+    def _remove(self, t):
+        t._due = False
+        if t._slot is not None:
+            del t._slot[t]
+            t._slot = None
+            self._count -= 1
+            self._level_counts[t._level] -= 1
+
+
+class WheelTimer:
+    """This object represents an action that should be run by a
+    :class:`TimerWheel` after a certain amount of time has passed.
+
+    The object has the same interface as :class:`Timer`. The times in its
+    :attr:`stats` are measured with the wheel clock.
+
+    Creating an instance of :class:`!WheelTimer` doesn't add it to the wheel.
+    Use the :meth:`TimerWheel.set_timer` or :meth:`TimerWheel.set_countdown`
+    methods instead.
+    """
+
+    def __init__(self, wheel: TimerWheel, interval=0.25, func=None, priority=0, periodic=True, catch_up=False):
+        if interval < 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.func = func
+        self.priority = priority
+        self.periodic = periodic
+        self.catch_up = catch_up
+        #: The :class:`TimerStats` of the timer.
+        self.stats = TimerStats(func)
+
+        self._wheel = wheel
+        self._slot = None
+        self._level = 0
+        self._due = False
+        self._deadline = 0.0
+        self._expires = 0
+        self._seq = 0
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__qualname__}(interval={self.interval!r}, func={self.func!r}, "
+            f"priority={self.priority!r}, periodic={self.periodic!r})"
+        )
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the timer is waiting to be fired.
+
+        :type: bool
+        """
+        return self._slot is not None
+
+    def start(self, interval=None, priority=None, periodic=None):
+        """Start a stopped timer or restart a running timer.
+
+        If the *interval*, *priority*, or *periodic* arguments are given, the
+        timer will be updated with the new values.
+        """
+        self.update(interval=interval, priority=priority, periodic=periodic, force_restart=True)
+
+    def update(self, func=None, interval=None, priority=None, periodic=None, force_restart=False):
+        """Update the parameters of a timer.
+
+        Passing any of *func*, *interval*, or *periodic* arguments restarts the
+        timer. Passing only the *priority* argument updates the timer without
+        restarting.
+        """
+        if func is not None:
+            self.func = func
+        elif self.func is None:
+            raise TypeError("func must not be None")
+        if not callable(self.func):
+            raise TypeError("timer callback must be callable")
+
+        if priority is not None:
+            self.priority = priority
+
+        restart = force_restart or func is not None or interval is not None or periodic is not None
+        if not restart:
+            return
+        if interval is not None:
+            if interval < 0:
+                raise ValueError("interval must be positive")
+            self.interval = interval
+        if periodic is not None:
+            self.periodic = bool(periodic)
+
+        wheel = self._wheel
+        wheel._remove(self)
+        self._deadline = wheel._clock() + self.interval
+        self.stats.name = _callable_name(self.func)
+        self.stats._schedule(self._deadline, self.interval, self.periodic, self.catch_up)
+        self._schedule()
+
+    def _schedule(self):
+        wheel = self._wheel
+        self._expires = math.ceil((self._deadline - wheel._origin) / wheel.resolution - 1e-9)
+        self._seq = next(wheel._seq)
+        wheel._insert(self)
+
+    def stop(self):
+        """Stop the timer."""
+        self._wheel._remove(self)
+
+    def _fire(self):
+        clock = self._wheel._clock
+        fired = clock()
+        stats = self.stats
+        stats._scheduled = self._deadline
+        missed = 0
+        if self.periodic:
+            # Schedule the next run from the deadline rather than the actual
+            # time so that the timer doesn't drift.
+            period = max(self.interval, self._wheel.resolution)
+            self._deadline += period
+            if not self.catch_up and self._deadline <= fired:
+                missed = math.floor((fired - self._deadline) / period) + 1
+                self._deadline += missed * period
+            self._schedule()
+        try:
+            self.func()
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+        finally:
+            stats._record(fired, clock() - fired, missed)
+
+
+class FrameLoop:
+    """The object that runs many small periodic tasks in the ticks of a single
+    AHK timer.
+
+    Overlays, like the tooltips that follow the cursor, usually run several
+    short tasks at a fixed rate. When each task has its own :func:`set_timer`,
+    the timers preempt each other and the latency is unpredictable. A
+    :class:`!FrameLoop` runs *hz* frames per second instead and calls the due
+    tasks in every frame one after another::
+
+        loop = ahkpy.FrameLoop(hz=60)
+
+        @loop.add
+        def follow_cursor():
+            x, y = ahkpy.get_mouse_pos(relative_to="screen")
+            tooltip.show(x=x + 16, y=y + 16)
+
+        assert isinstance(follow_cursor, ahkpy.FrameTask)
+
+    The tasks are called in the order of their priorities from the highest,
+    then in the order they were added. When the tasks of a frame take longer
+    than the *budget* seconds, the rest of them are deferred to the next frame
+    and are run first there, so no task starves. At least one task runs in
+    every frame. Defaults to the frame period.
+
+    The loop timer runs while there are tasks in the loop.
+
+    The optional *clock* argument is a function that returns the current time
+    in seconds. If it's given, the loop is not driven by AHK and the
+    :meth:`tick` method must be called to run a frame. It's intended for
+    testing with a virtual clock.
+    """
+
+    def __init__(self, hz=60, *, budget: float = None, clock: Callable[[], float] = None):
+        if hz <= 0:
+            raise ValueError("hz must be positive")
+        self.hz = hz
+        if budget is None:
+            budget = 1 / hz
+        if budget <= 0:
+            raise ValueError("budget must be positive")
+        self.budget = budget
+        self._clock = clock if clock is not None else time.perf_counter
+        self._driven_by_ahk = clock is None
+        self._tasks: List['FrameTask'] = []
+        self._deferred: List['FrameTask'] = []
+        self._driver = None
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    @property
+    def period(self) -> float:
+        """The time between the frames in seconds.
+
+        :type: float
+        """
+        return 1 / self.hz
+
+    @property
+    def tasks(self) -> List['FrameTask']:
+        """The tasks in the order they are called in a frame.
+
+        :type: List[FrameTask]
+        """
+        return list(self._tasks)
+
+    def reset_stats(self):
+        """Reset the frame metrics to zero."""
+        #: The number of frames run.
+        self.frames = 0
+        #: The number of frames that took longer than the budget.
+        self.overruns = 0
+        #: The duration of the last frame in seconds.
+        self.frame_time = 0.0
+        #: The longest frame in seconds.
+        self.max_frame_time = 0.0
+        self._total_frame_time = 0.0
+
+    @property
+    def mean_frame_time(self) -> float:
+        """The mean duration of the frames in seconds.
+
+        :type: float
+        """
+        return self._total_frame_time / self.frames if self.frames else 0.0
+
+    def add(self, func=None, *args, every=1, priority=0) -> 'FrameTask':
+        """Add a task that will run *func* with arguments *args* every
+        *every* frames.
+
+        The optional *priority* argument sets the order of the tasks in a
+        frame. The tasks with the higher priority are called first.
+
+        If *func* is given, returns an instance of :class:`FrameTask`.
+        Otherwise, the function works as a decorator.
+        """
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        task = FrameTask(self, func, every, priority)
+
+        def add_decorator(func):
+            if args:
+                func = functools.partial(func, *args)
+            task.func = func
+            task.start()
+            return task
+
+        if func is None:
+            return add_decorator
+        return add_decorator(func)
+
+    def tick(self):
+        """Run one frame."""
+        clock = self._clock
+        start = clock()
+        self.frames += 1
+        # The tasks deferred from the previous frame go first.
+        due, self._deferred = self._deferred, []
+        due.extend(task for task in self._tasks if not task._is_deferred and task._is_due(self.frames))
+
+        for i, task in enumerate(due):
+            if task._loop is not self:
+                # The task was removed by the previous one.
+                continue
+            if i and clock() - start >= self.budget:
+                for rest in due[i:]:
+                    if rest._loop is self:
+                        rest._defer(start)
+                        self._deferred.append(rest)
+                break
+            task._run(start)
+
+        elapsed = clock() - start
+        self.frame_time = elapsed
+        self.max_frame_time = max(self.max_frame_time, elapsed)
+        self._total_frame_time += elapsed
+        if elapsed > self.budget:
+            self.overruns += 1
+
+    def _insert(self, task):
+        index = len(self._tasks)
+        for i, t in enumerate(self._tasks):
+            if t.priority < task.priority:
+                index = i
+                break
+        self._tasks.insert(index, task)
+        if self._driven_by_ahk and self._driver is None:
+            self._driver = set_timer(self.period, self.tick)
+
+    def _remove(self, task):
+        if task in self._tasks:
+            self._tasks.remove(task)
+        if task in self._deferred:
+            self._deferred.remove(task)
+        if self._driver is not None and not self._tasks:
+            self._driver.stop()
+            self._driver = None
+
+
+class FrameTask:
+    """This object represents a function that is called by a
+    :class:`FrameLoop` every *every* frames.
+
+    Creating an instance of :class:`!FrameTask` doesn't add it to the loop. Use
+    the :meth:`FrameLoop.add` method instead.
+    """
+
+    def __init__(self, loop: FrameLoop, func=None, every=1, priority=0):
+        self.func = func
+        self.every = every
+        self.priority = priority
+        #: The :class:`TimerStats` of the task. The lateness is measured from
+        #: the start of the frame the task was due in, so the deferred runs are
+        #: late by at least one frame.
+        self.stats = TimerStats(func)
+        #: The number of times the task was deferred to the next frame.
+        self.deferred = 0
+
+        self._owner = loop
+        self._loop = None
+        self._phase = 0
+        self._is_deferred = False
+        self._due_since = 0.0
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}(func={self.func!r}, every={self.every!r}, priority={self.priority!r})"
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the task is in the loop.
+
+        :type: bool
+        """
+        return self._loop is not None
+
+    def start(self):
+        """Add the task to the loop. The task is first called in the next
+        frame.
+        """
+        if self.func is None:
+            raise TypeError("func must not be None")
+        if not callable(self.func):
+            raise TypeError("task function must be callable")
+        self.stop()
+        self.stats.name = _callable_name(self.func)
+        self._phase = self._owner.frames + 1
+        self._loop = self._owner
+        self._owner._insert(self)
+
+    def stop(self):
+        """Remove the task from the loop."""
+        if self._loop is not None:
+            self._loop = None
+            self._is_deferred = False
+            self._owner._remove(self)
+
+    def _is_due(self, frame):
+        return (frame - self._phase) % self.every == 0
+
+    def _defer(self, frame_start):
+        self.deferred += 1
+        if not self._is_deferred:
+            self._is_deferred = True
+            self._due_since = frame_start
+
+    def _run(self, frame_start):
+        loop = self._owner
+        stats = self.stats
+        scheduled = self._due_since if self._is_deferred else frame_start
+        self._is_deferred = False
+        stats._schedule(scheduled, loop.period * self.every, True, False)
+        clock = loop._clock
+        fired = clock()
+        try:
+            self.func()
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+        finally:
+            stats._record(fired, clock() - fired, 0)
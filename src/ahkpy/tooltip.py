@@ -1,10 +1,13 @@
 import dataclasses as dc
+import itertools
 import queue
-from typing import Optional
+import time
+import weakref
+from typing import Dict, Optional
 
 from .flow import ahk_call, global_ahk_lock
 from .settings import COORD_MODES, _set_coord_mode
-from .timer import Timer, set_countdown
+from .timer import Timer, set_countdown, set_timer
 from .unset import UNSET
 
 __all__ = [
@@ -16,7 +19,8 @@ __all__ = [
 class ToolTip:
     """The tooltip object.
 
-    No more than 20 tooltips can be shown simultaneously.
+    No more than 20 tooltips can be shown simultaneously, unless the tooltips
+    are virtual.
 
     Example usage::
 
@@ -28,6 +32,41 @@ class ToolTip:
         tt.show(text="hello from keyword argument")
         # ^^ Hides the previous tooltip and shows a new one with the text "hello
         # from keyword argument" near the mouse cursor
+
+    If the optional *live* argument is true, the tooltip is intended to be
+    updated often, for example, on every mouse move. The :meth:`show` method
+    of a live tooltip only remembers the new text and position. The tooltip
+    is updated no more than *max_fps* times per second, and the calls that
+    don't change anything are skipped. The pending updates of all live
+    tooltips are flushed by a single timer::
+
+        tt = ToolTip(live=True, relative_to="screen")
+
+        @ahkpy.set_timer(0.001)
+        def follow():
+            x, y = ahkpy.get_mouse_pos(relative_to="screen")
+            tt.show(f"{x}, {y}", x=x + 16, y=y + 16)
+
+    The :attr:`suppressed` attribute counts the :meth:`show` calls that didn't
+    result in a call to AHK.
+
+    If the optional *virtual* argument is true, the tooltip shares the 20 AHK
+    tooltip slots with the other virtual tooltips instead of raising an error
+    when all slots are taken. When there are more shown virtual tooltips than
+    slots, the tooltips with the highest *priority* are visible, and the most
+    recently shown tooltip wins among the tooltips of equal priority. The rest
+    of the tooltips wait and are shown as soon as a slot is freed::
+
+        hints = [
+            ToolTip(win.title, x=win.x, y=win.y, relative_to="screen", virtual=True)
+            for win in ahkpy.windows
+        ]
+        for hint in hints:
+            hint.show()
+
+    The tooltips that are not virtual take the slot from the virtual tooltip
+    of the lowest priority if there are no free slots. The slot of a tooltip
+    is freed when the tooltip is garbage-collected.
     """
 
     text: Optional[str] = None
@@ -35,22 +74,49 @@ class ToolTip:
     y: Optional[int] = None
     relative_to: str = "window"
     timeout: Optional[float] = None
+    live: bool = False
+    max_fps: float = 60
+    virtual: bool = False
+    priority: int = 0
 
     _pool = queue.LifoQueue(maxsize=20)
     for tooltip_id in range(20, 0, -1):
         _pool.put(tooltip_id)
     del tooltip_id
 
-    def __init__(self, text=None, *, x=None, y=None, relative_to="window", timeout=None):
+    def __init__(self, text=None, *, x=None, y=None, relative_to="window", timeout=None, live=False, max_fps=60,
+                 virtual=False, priority=0):
         self.text = text
         self.x = x
         self.y = y
         if relative_to not in COORD_MODES:
             raise ValueError(f"{relative_to!r} is not a valid coord mode")
         self.relative_to = relative_to
+        self.timeout = timeout
+        self.live = live
+        if max_fps <= 0:
+            raise ValueError("max_fps must be positive")
+        self.max_fps = max_fps
+        self.virtual = virtual
+        self.priority = priority
+
+        #: The number of :meth:`show` calls of a live tooltip that were skipped
+        #: because they didn't change the tooltip or were merged with the next
+        #: call.
+        self.suppressed = 0
 
         self._id: Optional[int] = None
         self._timer: Optional[Timer] = None
+        self._finalizer: Optional[weakref.finalize] = None
+        # The order of the last show() call. Used to rank the virtual tooltips.
+        self._seq = 0
+        # The (text, x, y, relative_to) tuples that were sent to AHK and are
+        # waiting to be sent. A virtual tooltip that waits for a slot has the
+        # _shown state, but no _id.
+        self._shown = None
+        self._pending = None
+        self._last_flush = float("-inf")
+        self._hide_at = None
 
     def show(self, text=None, *, x=UNSET, y=UNSET, relative_to=None, timeout=UNSET):
         """Show the tooltip.
@@ -98,13 +164,16 @@ class ToolTip:
         if relative_to is None:
             relative_to = self.relative_to
 
-        tooltip_id = self._acquire()
-        with global_ahk_lock:
-            _set_coord_mode("tooltip", relative_to)
-            ahk_call("ToolTip", str(text), x, y, tooltip_id)
-
         if timeout is UNSET:
             timeout = self.timeout
+
+        state = (str(text), x, y, relative_to)
+        self._seq = next(_show_counter)
+        if self.live:
+            self._update_live(state, timeout)
+            return
+
+        self._show_now(state)
         if timeout is not None:
             if self._timer:
                 self._timer.start(timeout)
@@ -114,29 +183,202 @@ class ToolTip:
             self._timer.stop()
             self._timer = None
 
+    def _show_now(self, state):
+        tooltip_id = self._acquire()
+        if tooltip_id is not None:
+            _backend.show(tooltip_id, *state)
+        self._shown = state
+
+    def _update_live(self, state, timeout):
+        now = time.perf_counter()
+        self._hide_at = now + timeout if timeout is not None else None
+        # The tooltip without coordinates follows the mouse cursor, so it's
+        # never up to date.
+        follows_mouse = state[1] == "" or state[2] == ""
+        current = self._pending or self._shown
+        if state == current and not follows_mouse:
+            self.suppressed += 1
+        elif self._pending is None and now - self._last_flush >= 1 / self.max_fps:
+            self._last_flush = now
+            self._show_now(state)
+        else:
+            if self._pending is not None:
+                self.suppressed += 1
+            self._pending = state
+        if self._pending is not None or self._hide_at is not None:
+            _schedule_live_flush(self)
+
+    def _flush(self, now):
+        # Return True if the tooltip still needs flushing.
+        if self._hide_at is not None and now >= self._hide_at:
+            self.hide()
+            return False
+        if self._pending is not None and now - self._last_flush >= 1 / self.max_fps:
+            self._last_flush = now
+            state, self._pending = self._pending, None
+            self._show_now(state)
+        return self._pending is not None or self._hide_at is not None
+
     def hide(self):
         """Hide the tooltip."""
-        if self._id is None:
-            return
-        ahk_call("ToolTip", "", "", "", self._id)
+        self._pending = None
+        self._shown = None
+        self._hide_at = None
+        _live_tooltips.pop(id(self), None)
+        _virtual_slots.waiting.pop(id(self), None)
         if self._timer:
             self._timer.stop()
             self._timer = None
+        if self._id is None:
+            return
+        _backend.hide(self._id)
         self._release()
 
     def _acquire(self):
-        if self._id is None:
-            try:
-                self._id = ToolTip._pool.get_nowait()
-            except queue.Empty:
-                raise RuntimeError("cannot show more than 20 tooltips simultaneously") from None
-        return self._id
+        # Return the tooltip slot id, or None if the virtual tooltip has to
+        # wait for a free slot.
+        if self._id is not None:
+            return self._id
+        try:
+            tooltip_id = ToolTip._pool.get_nowait()
+        except queue.Empty:
+            tooltip_id = _virtual_slots.preempt(self)
+        if tooltip_id is None:
+            if not self.virtual:
+                raise RuntimeError("cannot show more than 20 tooltips simultaneously")
+            _virtual_slots.waiting[id(self)] = weakref.ref(self)
+            return None
+
+        self._id = tooltip_id
+        _virtual_slots.waiting.pop(id(self), None)
+        if self.virtual:
+            # The slot of the garbage-collected virtual tooltip is given to
+            # the waiting ones.
+            self._finalizer = weakref.finalize(self, _release_tooltip_id, tooltip_id)
+            self._finalizer.atexit = False
+            _virtual_slots.holders[tooltip_id] = weakref.ref(self)
+        else:
+            # The regular tooltip stays shown until it's hidden or times out,
+            # even if it's not referenced anymore.
+            _shown_tooltips[tooltip_id] = self
+        return tooltip_id
 
     def _release(self):
         if self._id is None:
             return
+        if self._finalizer is not None:
+            self._finalizer.detach()
+            self._finalizer = None
+        tooltip_id, self._id = self._id, None
+        _virtual_slots.holders.pop(tooltip_id, None)
+        _shown_tooltips.pop(tooltip_id, None)
         try:
-            ToolTip._pool.put_nowait(self._id)
+            ToolTip._pool.put_nowait(tooltip_id)
         except queue.Full:
             raise RuntimeError("tooltip pool is corrupted") from None
-        self._id = None
+        _virtual_slots.fill()
+
+    def _evict(self):
+        # Hide the virtual tooltip, but keep its state so that it's shown again
+        # when a slot is freed. Return the freed slot id.
+        tooltip_id, self._id = self._id, None
+        self._finalizer.detach()
+        self._finalizer = None
+        _backend.hide(tooltip_id)
+        _virtual_slots.holders.pop(tooltip_id, None)
+        _virtual_slots.waiting[id(self)] = weakref.ref(self)
+        return tooltip_id
+
+
+_show_counter = itertools.count(1)
+
+
+def _virtual_rank(tooltip):
+    return (tooltip.priority, tooltip._seq)
+
+
+class _VirtualSlots:
+    def __init__(self):
+        # The virtual tooltips that hold slots by the slot ids.
+        self.holders: Dict[int, weakref.ref] = {}
+        # The shown virtual tooltips without slots by their ids.
+        self.waiting: Dict[int, weakref.ref] = {}
+
+    def preempt(self, tooltip):
+        # Take the slot from the lowest-ranked virtual tooltip if it ranks
+        # below the given tooltip.
+        holders = [ref() for ref in self.holders.values()]
+        holders = [holder for holder in holders if holder is not None]
+        if not holders:
+            return None
+        victim = min(holders, key=_virtual_rank)
+        if tooltip.virtual and _virtual_rank(victim) >= _virtual_rank(tooltip):
+            return None
+        return victim._evict()
+
+    def fill(self):
+        # Show the highest-ranked waiting tooltips in the free slots.
+        while self.waiting and not ToolTip._pool.empty():
+            tooltips = [ref() for ref in self.waiting.values()]
+            tooltips = [tooltip for tooltip in tooltips if tooltip is not None]
+            if not tooltips:
+                self.waiting.clear()
+                break
+            tooltip = max(tooltips, key=_virtual_rank)
+            tooltip._show_now(tooltip._shown)
+
+
+_virtual_slots = _VirtualSlots()
+# The shown regular tooltips by their slot ids.
+_shown_tooltips: Dict[int, ToolTip] = {}
+
+
+def _release_tooltip_id(tooltip_id):
+    # Called when the tooltip that holds the slot is garbage-collected.
+    _backend.hide(tooltip_id)
+    _virtual_slots.holders.pop(tooltip_id, None)
+    try:
+        ToolTip._pool.put_nowait(tooltip_id)
+    except queue.Full:
+        return
+    _virtual_slots.fill()
+
+
+# The live tooltips with pending updates by their ids. ToolTip instances are
+# not hashable.
+_live_tooltips: Dict[int, ToolTip] = {}
+_live_flusher: Optional[Timer] = None
+
+
+def _schedule_live_flush(tooltip):
+    global _live_flusher
+    _live_tooltips[id(tooltip)] = tooltip
+    interval = 1 / max(t.max_fps for t in _live_tooltips.values())
+    if _live_flusher is None:
+        _live_flusher = set_timer(interval, _flush_live_tooltips)
+    elif _live_flusher.interval > interval:
+        _live_flusher.start(interval)
+
+
+def _flush_live_tooltips():
+    global _live_flusher
+    now = time.perf_counter()
+    for tooltip in list(_live_tooltips.values()):
+        if not tooltip._flush(now):
+            _live_tooltips.pop(id(tooltip), None)
+    if not _live_tooltips and _live_flusher is not None:
+        _live_flusher.stop()
+        _live_flusher = None
+
+
+class _AHKToolTipBackend:
+    def show(self, tooltip_id, text, x, y, relative_to):
+        with global_ahk_lock:
+            _set_coord_mode("tooltip", relative_to)
+            ahk_call("ToolTip", text, x, y, tooltip_id)
+
+    def hide(self, tooltip_id):
+        ahk_call("ToolTip", "", "", "", tooltip_id)
+
+
+_backend = _AHKToolTipBackend()
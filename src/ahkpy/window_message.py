@@ -1,16 +1,79 @@
 import dataclasses as dc
 import functools
-from typing import Callable
+import uuid
+from array import array
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
 
 from .flow import ahk_call, _wrap_callback
 
 __all__ = [
+    "MessageFilter",
     "MessageHandler",
+    "MessageStats",
+    "get_message_stats",
     "on_message",
 ]
 
 
-def on_message(msg_number: int, func=None, *args, max_threads=1, prepend_handler=False):
+@dc.dataclass(frozen=True)
+class MessageFilter:
+    """The filter of the window messages that is evaluated by AHK before
+    calling the Python handler.
+
+    The message passes the filter if it's sent to one of the *hwnds* windows,
+    and its *wParam* value masked with *w_param_mask* equals *w_param*. An
+    empty *hwnds* matches any window. The default *w_param_mask* of 0 matches
+    any *wParam*::
+
+        # Only the WM_SYSCOMMAND messages with SC_CLOSE sent to the given
+        # window.
+        ahkpy.MessageFilter(hwnds={win.id}, w_param_mask=0xFFF0, w_param=0xF060)
+    """
+
+    hwnds: FrozenSet[int] = frozenset()
+    w_param_mask: int = 0
+    w_param: int = 0
+
+    def __post_init__(self):
+        object.__setattr__(self, "hwnds", frozenset(self.hwnds))
+        if self.w_param & ~self.w_param_mask:
+            raise ValueError("w_param must not have bits outside of w_param_mask")
+
+
+@dc.dataclass(frozen=True)
+class MessageStats:
+    """The counters of the window messages handled by the filtered and
+    batched handlers.
+
+    Returned by the :func:`get_message_stats` function.
+    """
+
+    #: The number of messages passed to the Python handlers.
+    delivered: int
+    #: The number of messages dropped by the filters before entering Python.
+    filtered: int
+    #: The number of messages accumulated into batches.
+    batched: int
+
+
+# The delivered, filtered, and batched counters by the message numbers. AHK
+# writes into the arrays, so they are never freed.
+_message_counters: Dict[int, array] = {}
+
+
+def get_message_stats(msg_number: int) -> MessageStats:
+    """Get the counters of the messages *msg_number* handled by the handlers
+    registered with the *filter* or *batch_interval* arguments of
+    :func:`on_message`.
+    """
+    counters = _message_counters.get(int(msg_number))
+    if counters is None:
+        return MessageStats(0, 0, 0)
+    return MessageStats(*counters)
+
+
+def on_message(msg_number: int, func=None, *args, max_threads=1, prepend_handler=False,
+               filter: Optional[MessageFilter] = None, batch_interval: Optional[float] = None):
     """Register *func* to be called on window message *msg_number*.
 
     Upon receiving a window message, the *func* will be called with the
@@ -37,6 +100,24 @@ def on_message(msg_number: int, func=None, *args, max_threads=1, prepend_handler
     will be registered to be called before any other functions previously
     registered for *msg_number*.
 
+    The optional *filter* argument is a :class:`MessageFilter` that is checked
+    by AHK, so the messages that don't match it don't enter Python at all.
+
+    If the optional *batch_interval* argument is given, the matching messages
+    are accumulated and the *func* is called at most every *batch_interval*
+    seconds with a single argument: the list of the ``(w_param, l_param, msg,
+    hwnd)`` tuples. The batched messages can't return a value to the sender.
+    Use it for chatty messages like ``WM_MOUSEMOVE``::
+
+        WM_MOUSEMOVE = 0x0200
+
+        @ahkpy.on_message(WM_MOUSEMOVE, batch_interval=0.05)
+        def handler(messages):
+            print(len(messages), "moves")
+
+    The counters of the filtered and batched handlers are returned by
+    :func:`get_message_stats`.
+
     If *func* is given, returns an instance of :class:`MessageHandler`.
     Otherwise, the function works as a decorator::
 
@@ -54,10 +135,18 @@ def on_message(msg_number: int, func=None, *args, max_threads=1, prepend_handler
     if max_threads is not None and max_threads <= 0:
         raise ValueError("max_threads must be positive")
 
+    if batch_interval is not None and batch_interval <= 0:
+        raise ValueError("batch_interval must be positive")
+    if filter is not None and not isinstance(filter, MessageFilter):
+        raise TypeError(f"filter must be a MessageFilter, not {type(filter).__name__}")
+
     if prepend_handler:
         max_threads *= -1
 
     def on_message_decorator(func):
+        if filter is not None or batch_interval is not None:
+            return _on_message_filter(msg_number, functools.partial(func, *args), max_threads, filter, batch_interval)
+
         func = _wrap_callback(
             functools.partial(func, *args),
             ("w_param", "l_param", "msg", "hwnd"),
@@ -72,6 +161,55 @@ def on_message(msg_number: int, func=None, *args, max_threads=1, prepend_handler
     return on_message_decorator(func)
 
 
+def _on_message_filter(msg_number, func, max_threads, filter, batch_interval):
+    msg_number = int(msg_number)
+    if batch_interval is None:
+        func = _wrap_callback(
+            func,
+            ("w_param", "l_param", "msg", "hwnd"),
+            _bare_message_handler,
+            _message_handler,
+        )
+        period = 0
+    else:
+        func = functools.partial(_batch_message_handler, func)
+        period = max(1, round(batch_interval * 1000))
+    if filter is None:
+        filter = MessageFilter()
+
+    counters = _message_counters.get(msg_number)
+    if counters is None:
+        counters = _message_counters[msg_number] = array("q", [0, 0, 0])
+
+    handler = _FilteredMessageFunc(str(uuid.uuid4()), func)
+    ahk_call(
+        "OnMessageFilter", handler.id, msg_number, handler, max_threads,
+        " ".join(str(hwnd) for hwnd in sorted(filter.hwnds)),
+        filter.w_param_mask, filter.w_param, period, counters.buffer_info()[0],
+    )
+    return MessageHandler(msg_number, handler)
+
+
+@dc.dataclass(frozen=True)
+class _FilteredMessageFunc:
+    # The Python side of the handler registered by the AHK message filter. The
+    # id is the key in the AHK MESSAGE_FILTERS registry.
+    id: str
+    func: Callable
+    __slots__ = ("id", "func")
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+
+def _parse_message_batch(batch: str) -> List[Tuple[int, int, int, int]]:
+    return [tuple(map(int, line.split())) for line in batch.splitlines()]
+
+
+def _batch_message_handler(func, batch):
+    func(_parse_message_batch(batch))
+
+
 def _bare_message_handler(func, *_):
     return func()
 
@@ -97,4 +235,7 @@ class MessageHandler:
 
     def unregister(self):
         """Unregister the message handler."""
+        if isinstance(self.func, _FilteredMessageFunc):
+            ahk_call("OnMessageFilterRemove", self.func.id)
+            return
         ahk_call("OnMessage", self.msg_number, self.func, 0)
@@ -1,4 +1,8 @@
+import cProfile
+import io
+import json
 import os
+import pstats
 import subprocess
 import sys
 from textwrap import dedent
@@ -6,6 +10,7 @@ from textwrap import dedent
 import pytest
 
 import ahkpy as ahk
+from ahkpy import main
 from ahkpy.main import STATUS_CONTROL_C_EXIT
 
 try:
@@ -396,3 +401,86 @@ def test_keyboard_interrupt_broken_handler(request, tmpdir, child_ahk):
     assert proc.isalive()
     ahk.send("{F24}")
     proc.wait()
+
+
+def test_expand_optional_values():
+    assert main.expand_optional_values(["--profile", "script.py", "--profile"]) == [
+        "--profile=ahkpy.pstats", "script.py", "--profile",
+    ]
+    assert main.expand_optional_values(["-q", "--trace-bridge", "--profile=out", "-c", "1"]) == [
+        "-q", "--trace-bridge=ahkpy-bridge.jsonl", "--profile=out", "-c", "1",
+    ]
+    assert main.expand_optional_values(["-", "--profile"]) == ["-", "--profile"]
+
+
+def test_bridge_tracer():
+    class FakeAHK:
+        executable = "AutoHotkey.exe"
+
+        def call(self, cmd, *args):
+            if cmd == "Fail":
+                raise ahk.Error("failed")
+            return len(args)
+
+    file = io.StringIO()
+    tracer = main.BridgeTracer(FakeAHK(), file)
+    assert tracer.executable == "AutoHotkey.exe"
+    assert tracer.call("Send", "a", "b") == 2
+    with pytest.raises(ahk.Error):
+        tracer.call("Fail")
+
+    first, second = map(json.loads, file.getvalue().splitlines())
+    assert first["cmd"] == "Send"
+    assert first["args"] == 2
+    assert first["error"] is None
+    assert first["duration"] >= 0
+    assert second["cmd"] == "Fail"
+    assert second["error"] == "Error"
+    assert second["t"] >= first["t"]
+
+    file.close()
+    assert tracer.call("Send") == 0
+
+
+def test_callback_summary():
+    def user_callback():
+        return sum(range(100))
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(3):
+        user_callback()
+    # The callback called through the ahkpy wrapper.
+    ahk.window_message._bare_message_handler(user_callback, 0, 0, 0, 0)
+    profiler.disable()
+
+    out = io.StringIO()
+    main.print_callback_summary(profiler, out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].split() == ["calls", "cumtime", "callback"]
+    assert any("user_callback" in line and line.split()[0] == "4" for line in lines)
+    assert not any("test_callback_summary" in line for line in lines)
+    assert pstats.Stats(profiler).total_calls > 0
+
+
+def test_profile(tmpdir, child_ahk):
+    script = tmpdir / "script.py"
+    script.write(dedent("""\
+        import ahkpy as ahk
+
+        def on_timer():
+            ahk.get_mouse_pos()
+
+        ahk.set_timer(0.01, on_timer)
+        ahk.sleep(0.1)
+    """))
+    profile = tmpdir / "out.pstats"
+    trace = tmpdir / "bridge.jsonl"
+    res = child_ahk.run([f"--profile={profile}", f"--trace-bridge={trace}", script])
+    assert res.returncode == 0
+    assert "on_timer" in res.stderr
+
+    stats = pstats.Stats(str(profile))
+    assert any(name == "on_timer" for _, _, name in stats.stats)
+    records = [json.loads(line) for line in trace.read().splitlines()]
+    assert any(record["cmd"] == "MouseGetPos" for record in records)
@@ -1,6 +1,59 @@
+import contextlib
 import sys
+import tracemalloc
+from array import array
+
+import pytest
 
 import ahkpy as ahk
+from ahkpy import clipboard
+
+
+class FakeClipboard:
+    def __init__(self):
+        self.store = {}
+        self.registered = {}
+        self.is_open = False
+        self.opened = 0
+
+    @contextlib.contextmanager
+    def open(self):
+        assert not self.is_open
+        self.is_open = True
+        self.opened += 1
+        try:
+            yield
+        finally:
+            self.is_open = False
+
+    def formats(self):
+        assert self.is_open
+        return list(self.store)
+
+    def get(self, format_id):
+        assert self.is_open
+        value = self.store.get(format_id)
+        if value is None:
+            return None
+        return memoryview(bytearray(value)).toreadonly()
+
+    def set(self, format_id, view):
+        assert self.is_open
+        self.store[format_id] = bytes(view)
+
+    def clear(self):
+        assert self.is_open
+        self.store.clear()
+
+    def register_format(self, name):
+        return self.registered.setdefault(name, 0xC000 + len(self.registered))
+
+
+@pytest.fixture
+def fake_clipboard(monkeypatch):
+    fake = FakeClipboard()
+    monkeypatch.setattr(clipboard, "_backend", fake)
+    return fake
 
 
 def test_clipboard(request, child_ahk):
@@ -22,6 +75,178 @@ def test_clipboard(request, child_ahk):
     assert ahk.wait_clipboard(timeout=0.1) == ""
 
 
+def test_clipboard_data(fake_clipboard):
+    text = "hello\0".encode("utf-16-le")
+    ahk.set_clipboard_data({
+        "text": text,
+        "html": bytearray(b"<b>hello</b>"),
+        "My Format": array("i", [1, 2]),
+        8: memoryview(b"dib"),
+    })
+    assert fake_clipboard.opened == 1
+    html_id = fake_clipboard.registered["HTML Format"]
+    my_id = fake_clipboard.registered["My Format"]
+    assert ahk.get_clipboard_formats() == [13, html_id, my_id, 8]
+
+    data = ahk.get_clipboard_data()
+    assert isinstance(data, memoryview)
+    assert data.readonly
+    assert data == text
+    assert ahk.get_clipboard_data("html") == b"<b>hello</b>"
+    assert ahk.get_clipboard_data(my_id) == array("i", [1, 2]).tobytes()
+    assert ahk.get_clipboard_data("dib") == b"dib"
+    assert ahk.get_clipboard_data("png") is None
+
+    with pytest.raises(ValueError, match="0 is not a valid clipboard format"):
+        ahk.get_clipboard_data(0)
+    with pytest.raises(TypeError, match="clipboard format must be an int or a str"):
+        ahk.get_clipboard_data(1.5)
+
+
+def test_clipboard_snapshot(fake_clipboard):
+    fake_clipboard.store = {13: b"h\0i\0\0\0", 2: b"hbitmap", 0xC001: b"custom"}
+    snapshot = ahk.clipboard_snapshot()
+    assert isinstance(snapshot, ahk.ClipboardSnapshot)
+    # The GDI handles are skipped.
+    assert set(snapshot.data) == {13, 0xC001}
+    assert snapshot.size == 12
+
+    ahk.set_clipboard_data({"text": b"x\0\0\0"})
+    assert fake_clipboard.store == {13: b"x\0\0\0"}
+
+    snapshot.restore()
+    assert fake_clipboard.store == {13: b"h\0i\0\0\0", 0xC001: b"custom"}
+
+
+def test_clipboard_data_roundtrip(request):
+    snapshot = ahk.clipboard_snapshot()
+    request.addfinalizer(snapshot.restore)
+
+    ahk.set_clipboard_data({
+        "text": "hello\0".encode("utf-16-le"),
+        "html": b"<b>hello</b>",
+    })
+    assert ahk.get_clipboard() == "hello"
+    assert ahk.get_clipboard_data("html")[:12] == b"<b>hello</b>"
+    assert 13 in ahk.get_clipboard_formats()
+
+    saved = ahk.clipboard_snapshot()
+    ahk.set_clipboard("other")
+    saved.restore()
+    assert ahk.get_clipboard() == "hello"
+    assert ahk.get_clipboard_data("html")[:12] == b"<b>hello</b>"
+
+
+def test_clipboard_history():
+    with pytest.raises(ValueError, match="max_items must be positive"):
+        ahk.ClipboardHistory(max_items=0)
+
+    history = ahk.ClipboardHistory(max_bytes=100, max_items=3, compress_threshold=20)
+    assert history.add("") is False
+    assert history.add("one")
+    assert history.add("two")
+    assert history.add("one")
+    assert list(history) == ["one", "two"]
+    assert history.deduplicated == 1
+    assert "two" in history
+
+    long_text = "Lorem ipsum " * 50
+    assert history.add(long_text)
+    assert history.size < 100
+    assert list(history) == [long_text, "one", "two"]
+
+    assert history.add("three")
+    assert list(history) == ["three", long_text, "one"]
+    assert history.evicted == 1
+
+    # The compressed text fits, but the incompressible one doesn't.
+    assert history.add("x" * 100 + "y" * 100) is True
+    assert history.add("".join(chr(0x4e00 + i) for i in range(300))) is False
+    assert list(history) == ["x" * 100 + "y" * 100, "three", long_text]
+
+    assert history.search("IPSUM") == [long_text]
+    assert history.search("IPSUM", case_sensitive=True) == []
+    assert history.search("e") == ["three", long_text]
+
+    history.clear()
+    assert len(history) == 0
+    assert history.size == 0
+
+
+def test_clipboard_history_search():
+    history = ahk.ClipboardHistory(max_bytes=64 * 1024, compress_threshold=20)
+    texts = [f"Entry {i:02} " * 20_000 for i in range(50)]
+    for text in texts:
+        history.add(text)
+    history.add("Short entry")
+    assert len(history) == 51
+
+    tracemalloc.start()
+    try:
+        assert history.search("ENTRY 42 ") == [texts[42]]
+        assert history.search("entry", case_sensitive=True) == ["Short entry"]
+        assert history.search("Entry 07", case_sensitive=True) == [texts[7]]
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # The texts are decompressed one at a time and are not kept.
+    assert current < 64 * 1024
+    assert peak < 5 * len(texts[0])
+    assert history.size <= 64 * 1024
+
+
+def test_clipboard_history_memory():
+    history = ahk.ClipboardHistory(max_bytes=10_000, max_items=1000)
+    for i in range(5000):
+        history.add(f"entry {i} " * (i % 50))
+        assert history.size <= 10_000
+    assert history.evicted > 0
+    assert len(history) < 1000
+
+
+def test_clipboard_history_file(tmp_path):
+    path = tmp_path / "history.bin"
+    history = ahk.ClipboardHistory(max_items=3, compress_threshold=10, path=path)
+    for text in ["one", "two", "three", "four", "two", "a much longer text"]:
+        history.add(text)
+    history.stop()
+    assert list(history) == ["a much longer text", "two", "four"]
+
+    loaded = ahk.ClipboardHistory(max_items=3, path=path)
+    assert list(loaded) == list(history)
+    loaded.add("five")
+    # A partially written record is ignored.
+    with open(path, "ab") as f:
+        f.write(b"\x01\x00")
+    loaded.stop()
+    assert list(ahk.ClipboardHistory(path=path)) == ["five", "a much longer text", "two", "four"]
+
+    for i in range(100):
+        loaded.add(str(i % 5))
+    loaded.stop()
+    assert path.stat().st_size < 500
+
+    path.write_bytes(b"garbage")
+    with pytest.raises(ValueError, match="is not a clipboard history file"):
+        ahk.ClipboardHistory(path=path)
+
+
+def test_clipboard_history_recording(request):
+    snapshot = ahk.clipboard_snapshot()
+    request.addfinalizer(snapshot.restore)
+
+    with ahk.ClipboardHistory() as history:
+        ahk.set_clipboard("first")
+        ahk.sleep(0)
+        ahk.set_clipboard("second")
+        ahk.sleep(0)
+        ahk.set_clipboard("first")
+        ahk.sleep(0)
+    ahk.set_clipboard("third")
+    ahk.sleep(0)
+    assert list(history) == ["first", "second"]
+
+
 def test_on_clipboard_change(request):
     stored = ahk.get_clipboard()
     request.addfinalizer(lambda: ahk.set_clipboard(stored))
@@ -76,6 +301,117 @@ def test_on_clipboard_change(request):
     assert history == ["HELLO AGAIN", "hello again!!"]
 
 
+class FakeCountdown:
+    def __init__(self, interval, func):
+        self.interval = interval
+        self.func = func
+        self.running = True
+        self.starts = 1
+
+    def start(self):
+        self.running = True
+        self.starts += 1
+
+    def stop(self):
+        self.running = False
+
+    def fire(self):
+        assert self.running
+        self.running = False
+        self.func()
+
+
+@pytest.fixture
+def fake_countdown(monkeypatch):
+    timers = []
+
+    def set_countdown(interval, func):
+        timer = FakeCountdown(interval, func)
+        timers.append(timer)
+        return timer
+
+    monkeypatch.setattr(clipboard, "set_countdown", set_countdown)
+    monkeypatch.setattr(clipboard, "get_clipboard", lambda: contents[-1])
+    contents = ["one"]
+    return timers, contents
+
+
+def test_debounced_clipboard_handler(fake_countdown):
+    timers, contents = fake_countdown
+    calls = []
+
+    def handler(clipboard):
+        calls.append(clipboard)
+
+    wrapped = clipboard._wrap_callback(handler, ("clipboard",), clipboard._bare_clipboard_handler,
+                                       clipboard._clipboard_handler)
+    debounced = clipboard._DebouncedClipboardHandler(wrapped, 0.05, coalesce=True)
+    handle = ahk.ClipboardHandler(debounced)
+    for text in ["a", "b", "c"]:
+        contents.append(text)
+        assert debounced(1) is False
+    assert calls == []
+    [timer] = timers
+    assert timer.interval == 0.05
+    assert timer.starts == 3
+    timer.fire()
+    assert calls == ["c"]
+    assert debounced.received == 3
+    assert handle.suppressed == 2
+
+    # A new burst starts after the countdown.
+    contents.append("d")
+    debounced(1)
+    timer.fire()
+    assert calls == ["c", "d"]
+    assert handle.suppressed == 2
+
+    debounced.stop()
+    assert not timer.running
+
+
+def test_leading_clipboard_handler(fake_countdown):
+    timers, contents = fake_countdown
+    calls = []
+    wrapped = clipboard._wrap_callback(lambda: calls.append(contents[-1]), ("clipboard",),
+                                       clipboard._bare_clipboard_handler, clipboard._clipboard_handler)
+    debounced = clipboard._DebouncedClipboardHandler(wrapped, 0.05, coalesce=False)
+    for text in ["a", "b", "c"]:
+        contents.append(text)
+        debounced(1)
+    assert calls == ["a"]
+    assert debounced.suppressed == 2
+    timers[0].fire()
+    assert calls == ["a"]
+    contents.append("d")
+    debounced(1)
+    assert calls == ["a", "d"]
+
+
+def test_on_clipboard_change_debounce(request):
+    snapshot = ahk.clipboard_snapshot()
+    request.addfinalizer(snapshot.restore)
+
+    with pytest.raises(ValueError, match="debounce must be positive"):
+        ahk.on_clipboard_change(print, debounce=-1)
+
+    history = []
+
+    @ahk.on_clipboard_change(debounce=0.1)
+    def handler(clipboard):
+        history.append(clipboard)
+
+    request.addfinalizer(handler.unregister)
+
+    for text in ["first", "second", "third"]:
+        ahk.set_clipboard(text)
+        ahk.sleep(0.01)
+    assert history == []
+    ahk.sleep(0.2)
+    assert history == ["third"]
+    assert handler.suppressed == 2
+
+
 def test_clipboard_returns(request, child_ahk):
     stored = ahk.get_clipboard()
     request.addfinalizer(lambda: ahk.set_clipboard(stored))
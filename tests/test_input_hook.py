@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+
+import ahkpy as ahk
+
+
+def feed_keys(hook, *vks, is_down=True):
+    for vk in vks:
+        hook.feed(vk, vk + 0x100, is_down)
+
+
+def test_validation():
+    with pytest.raises(ValueError, match="capacity must be positive"):
+        ahk.InputHook(0)
+    with pytest.raises(ValueError, match="'nooo' is not a valid overflow policy"):
+        ahk.InputHook(overflow="nooo")
+    with pytest.raises(TypeError, match="callback must be callable"):
+        ahk.InputHook(callback=1)
+
+
+def test_drop_oldest():
+    hook = ahk.InputHook(3)
+    assert hook.get_nowait() is None
+
+    feed_keys(hook, 1, 2, 3, 4, 5)
+    assert len(hook) == 3
+    assert hook.received == 5
+    assert hook.dropped == 2
+
+    event = hook.get_nowait()
+    assert event == ahk.KeyEvent(vk=3, sc=0x103, is_down=True, time=event.time, repeat=1)
+
+    hook.stop()
+    assert [event.vk for event in hook] == [4, 5]
+    assert hook.get(timeout=1) is None
+
+
+def test_coalesce():
+    hook = ahk.InputHook(2, overflow="coalesce")
+    feed_keys(hook, 1, 2, 2, 2)
+    feed_keys(hook, 2, is_down=False)
+    hook.stop()
+
+    events = list(hook)
+    assert [(event.vk, event.is_down, event.repeat) for event in events] == [(2, True, 3), (2, False, 1)]
+    assert hook.coalesced == 2
+    assert hook.dropped == 1
+
+
+def test_block():
+    hook = ahk.InputHook(2, overflow="block", block_timeout=1)
+    consumed = []
+
+    def consume():
+        for event in hook:
+            consumed.append(event.vk)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    feed_keys(hook, *range(1, 101))
+    hook.stop()
+    consumer.join(timeout=1)
+
+    assert consumed == list(range(1, 101))
+    assert hook.dropped == 0
+
+    hook = ahk.InputHook(1, overflow="block", block_timeout=0.01)
+    feed_keys(hook, 1, 2)
+    assert hook.blocked == 1
+    assert hook.dropped == 1
+
+
+def test_callback():
+    events = []
+    hook = ahk.InputHook(callback=events.append)
+    feed_keys(hook, 1, 2)
+    assert [event.vk for event in events] == [1, 2]
+    assert len(hook) == 0
+
+
+def test_async_iterator():
+    hook = ahk.InputHook()
+
+    async def consume():
+        return [event.vk async for event in hook]
+
+    async def main():
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        threading.Thread(target=feed_keys, args=(hook, 1, 2, 3)).start()
+        await asyncio.sleep(0.01)
+        hook.stop()
+        return await task
+
+    assert asyncio.run(main()) == [1, 2, 3]
+
+
+def test_input_hook(request):
+    hook = ahk.InputHook()
+    request.addfinalizer(hook.stop)
+    hook.start()
+    assert hook.is_running
+
+    ahk.send("{F13}")
+    ahk.sleep(0)
+    down = hook.get(timeout=1)
+    up = hook.get(timeout=1)
+    assert (down.vk, down.is_down) == (0x7c, True)
+    assert (up.vk, up.is_down) == (0x7c, False)
+
+    hook.stop()
+    assert not hook.is_running
+    assert list(hook) == []
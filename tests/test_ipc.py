@@ -0,0 +1,162 @@
+import pytest
+
+import ahkpy as ahk
+from ahkpy import ipc
+
+
+@pytest.fixture
+def hub():
+    return {}
+
+
+def open_channel(hub, name="test", **kwargs):
+    return ipc.Channel(name, transport=ipc.MemoryTransport(hub), **kwargs)
+
+
+def test_send(hub):
+    a = open_channel(hub)
+    b = open_channel(hub)
+    c = open_channel(hub)
+    other = open_channel(hub, "other")
+    assert a.peers() == [b.address, c.address]
+    assert other.peers() == []
+
+    assert a.send({"x": [1, 2]}) == 2
+    msg = b.receive_nowait()
+    assert msg == ipc.Message({"x": [1, 2]}, a.address)
+    assert not msg.is_request
+    with pytest.raises(ValueError, match="not a request"):
+        msg.reply(1)
+    assert b.receive_nowait() is None
+    assert len(c) == 1
+    assert c.receive().data == {"x": [1, 2]}
+    assert len(other) == 0
+
+    c.close()
+    assert a.peers() == [b.address]
+    with pytest.raises(ValueError, match="the channel is closed"):
+        c.send(1)
+    with pytest.raises(ahk.Error, match="did not accept the message"):
+        a.send(1, peer=c.address)
+
+
+def test_chunks(hub):
+    a = open_channel(hub, serializer="bytes", chunk_size=10)
+    b = open_channel(hub, serializer="bytes")
+    payload = bytes(range(256)) * 4
+    a.send(payload, peer=b.address)
+    assert a.stats.frames_sent == 103
+    assert a.stats.sent == 1
+    assert a.stats.bytes_sent == len(payload) + 103 * ipc.FRAME.size
+    assert b.receive_nowait().data == payload
+    assert b.stats.received == 1
+    assert b.stats.bytes_received == a.stats.bytes_sent
+
+    # The empty message is sent as one frame.
+    a.send(b"", peer=b.address)
+    assert b.receive_nowait().data == b""
+
+    # The frames of different messages can interleave.
+    frames = []
+    a._transport.send = lambda address, frame: frames.append(frame) or True
+    a.send(b"first message", peer=b.address)
+    a.send(b"second message", peer=b.address)
+    assert len(frames) == 4
+    for frame in [frames[0], frames[2], frames[3], frames[1]]:
+        assert b._receive_frame(frame)
+    assert [b.receive_nowait().data for _ in range(2)] == [b"second message", b"first message"]
+
+    assert not b._receive_frame(b"short")
+    assert not b._receive_frame(ipc.FRAME.pack(2, 0, 1, 0, 0, 0, 1))
+    assert not b._receive_frame(ipc.FRAME.pack(1, 0, 1, 0, 0, 1, 1))
+    assert b.stats.dropped == 3
+
+
+def test_request(hub):
+    def handler(data):
+        if data == "fail":
+            raise RuntimeError("boom")
+        return data * 2
+
+    server = open_channel(hub, handler=handler, serializer="pickle")
+    client = open_channel(hub, serializer="pickle")
+    assert client.request(21) == 42
+    assert client.request("ab", peer=server.address) == "abab"
+    with pytest.raises(ahk.Error, match=r"remote handler failed: RuntimeError\('boom'\)"):
+        client.request("fail")
+    assert client.stats.requests == 3
+    assert client.stats.latency > 0
+    assert client.stats.throughput > 0
+    assert len(server) == 0
+
+    # A second client makes the peer ambiguous.
+    other = open_channel(hub)
+    with pytest.raises(ahk.Error, match="request needs a single peer, but the channel has 2"):
+        client.request(1)
+    other.close()
+
+    # The requests without a handler are queued and answered manually.
+    manual = open_channel(hub, "manual")
+    manual_client = open_channel(hub, "manual")
+    replies = []
+
+    def reply_later(address, frame):
+        result = manual._receive_frame(frame)
+        msg = manual.receive_nowait()
+        assert msg.is_request
+        msg.reply(msg.data + 1)
+        replies.append(msg)
+        return result
+
+    manual_client._transport.send = reply_later
+    assert manual_client.request(1) == 2
+    assert len(replies) == 1
+
+    # The unexpected responses are dropped.
+    replies[0].reply(3)
+    assert manual_client.stats.dropped == 1
+
+
+def test_serializers(hub):
+    with pytest.raises(ValueError, match="'xml' is not a valid serializer"):
+        open_channel(hub, serializer="xml")
+    with pytest.raises(TypeError, match="serializer must have the dumps and loads methods"):
+        open_channel(hub, serializer=object())
+    with pytest.raises(ValueError, match="chunk_size must be positive"):
+        open_channel(hub, chunk_size=0)
+
+    class Upper:
+        @staticmethod
+        def dumps(obj):
+            return obj.upper().encode()
+
+        @staticmethod
+        def loads(data):
+            return data.decode()
+
+    a = open_channel(hub, serializer=Upper)
+    b = open_channel(hub, serializer=Upper)
+    a.send("hello")
+    assert b.receive_nowait().data == "HELLO"
+
+
+def test_window_channel(child_ahk):
+    def code():
+        import ahkpy as ahk
+        import sys
+
+        ahk.hotkey("F24", sys.exit)
+        channel = ahk.ipc.Channel("ahkpy-test", handler=lambda data: data[::-1])  # noqa: F841
+        print("ok00")
+
+    child_ahk.popen_code(code)
+    child_ahk.wait(0)
+
+    with ipc.Channel("ahkpy-test", chunk_size=1024) as channel:
+        peer, = channel.peers()
+        assert channel.request("hello") == "olleh"
+        big = "x" * 100_000 + "y"
+        assert channel.request(big, peer=peer) == big[::-1]
+        assert channel.stats.frames_sent > 100
+
+    ahk.send("{F24}")
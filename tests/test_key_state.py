@@ -1,6 +1,13 @@
 import pytest
 
 import ahkpy as ahk
+import _ahk
+from ahkpy import key_state
+
+
+@pytest.fixture
+def call_spy(mocker):
+    return mocker.spy(_ahk, "call")
 
 
 def test_get_key_state(child_ahk):
@@ -14,6 +21,60 @@ def test_get_key_state(child_ahk):
     assert ahk.is_key_pressed("F13") is False
 
 
+def test_get_key_states():
+    with pytest.raises(ValueError, match="'beep' is not a valid key or the state of the key could not be determined"):
+        ahk.get_key_states(["F13", "beep"])
+    with pytest.raises(ValueError, match="'nooo' is not a valid key state mode"):
+        ahk.get_key_states(["F13"], mode="nooo")
+
+    assert ahk.get_key_states([]) == {}
+    assert ahk.get_key_states(["F13", "F14"]) == {"F13": False, "F14": False}
+    ahk.send("{F13 Down}")
+    assert ahk.get_key_states(["F13", "F14"]) == {"F13": True, "F14": False}
+    assert 0x7c in ahk.get_keyboard_snapshot()
+    assert "F13" in ahk.get_keyboard_snapshot()
+    assert "F14" not in ahk.get_keyboard_snapshot()
+    ahk.send("{F13 Up}")
+    assert ahk.get_key_states(["F13", "F14"]) == {"F13": False, "F14": False}
+    assert 0x7c not in ahk.get_keyboard_snapshot()
+
+
+def test_key_states_calls_per_poll(call_spy):
+    keys = ["LButton", "RButton", "Shift", "Ctrl", "Alt", "LWin"]
+
+    for key in keys:
+        ahk.is_key_pressed(key)
+    assert call_spy.call_count == len(keys)
+
+    call_spy.reset_mock()
+    ahk.get_key_states(keys)
+    assert call_spy.call_count == 1
+
+    call_spy.reset_mock()
+    ahk.get_keyboard_snapshot()
+    assert call_spy.call_count == 1
+
+
+def test_keyboard_snapshot():
+    snapshot = ahk.KeyboardSnapshot.from_vks([0x01, 0x10, 0x41])
+    assert len(snapshot) == 3
+    assert list(snapshot) == [0x01, 0x10, 0x41]
+    assert 0x41 in snapshot
+    assert 0x42 not in snapshot
+    assert snapshot.modifiers == ahk.KeyboardSnapshot.from_vks([0x10])
+    assert list(snapshot - snapshot.modifiers) == [0x01, 0x41]
+    assert snapshot | ahk.KeyboardSnapshot.from_vks([0xff]) == ahk.KeyboardSnapshot.from_vks([0x01, 0x10, 0x41, 0xff])
+    assert snapshot ^ snapshot == ahk.KeyboardSnapshot()
+    assert not ahk.KeyboardSnapshot()
+    assert bytes(snapshot)[0] == 0b10
+    assert repr(snapshot) == "KeyboardSnapshot({0x01, 0x10, 0x41})"
+
+    with pytest.raises(ValueError, match="must be between 0 and 255"):
+        ahk.KeyboardSnapshot.from_vks([256])
+    with pytest.raises(ValueError, match="must be a 256-bit unsigned integer"):
+        ahk.KeyboardSnapshot(-1)
+
+
 def test_get_key():
     key = "LWin"
     assert ahk.get_key_name(key) == "LWin"
@@ -27,6 +88,52 @@ def test_get_key():
     with pytest.raises(ValueError, match="is not a valid key"):
         ahk.get_key_vk("noooo")
 
+    assert ahk.get_key_name_from_vk(112) == "F1"
+    assert ahk.get_key_name_from_sc(59) == "F1"
+    assert ahk.get_key_name_from_vk(0x60) == "Numpad0"
+    assert ahk.get_key_name_from_sc(0x52) == "NumpadIns"
+    with pytest.raises(ValueError, match="256 is not a valid virtual key code"):
+        ahk.get_key_name_from_vk(256)
+
+
+def test_key_table(call_spy, monkeypatch):
+    # Start with an empty table, other tests may have looked up the keys.
+    monkeypatch.setattr(key_state, "_key_table", None)
+    table = ahk.key_table()
+    assert table["F1"] == (112, 59)
+    assert table["LWin"] == (0x5b, 0x15b)
+
+    call_spy.reset_mock()
+    for _ in range(1000):
+        assert ahk.get_key_name("lwin") == "LWin"
+        assert ahk.get_key_vk("F1") == 112
+        assert ahk.get_key_sc("F1") == 59
+        assert ahk.get_key_name_from_vk(112) == "F1"
+        assert ahk.get_key_name_from_sc(59) == "F1"
+    assert call_spy.call_count == 0
+
+    # Keys that are not in the table are resolved by AHK once.
+    assert ahk.get_key_name("vk5b") == "LWin"
+    assert ahk.get_key_name("vk5b") == "LWin"
+    assert call_spy.call_count == 1
+
+
+def test_key_table_codes(monkeypatch):
+    # The names of the codes are taken from their own lookup pass.
+    table = "\n".join([
+        "vk\t45\tInsert\t45\t338",
+        "vk\t96\tNumpad0\t96\t82",
+        "sc\t82\tNumpadIns\t45\t82",
+        "sc\t338\tInsert\t45\t338",
+    ])
+    monkeypatch.setattr(key_state, "ahk_call", lambda cmd: table)
+    monkeypatch.setattr(key_state, "_get_keyboard_layout", lambda: 1)
+    monkeypatch.setattr(key_state, "_key_table", None)
+    assert ahk.get_key_name_from_sc(0x52) == "NumpadIns"
+    assert ahk.get_key_name_from_vk(0x60) == "Numpad0"
+    assert ahk.get_key_name_from_vk(0x2d) == "Insert"
+    assert ahk.key_table() == {"Insert": (45, 338), "Numpad0": (96, 82), "NumpadIns": (45, 82)}
+
 
 def test_key_wait(child_ahk):
     def code():
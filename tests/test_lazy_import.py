@@ -0,0 +1,99 @@
+import importlib
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import ahkpy as ahk
+
+
+def run_python(code):
+    res = subprocess.run([sys.executable, "-c", textwrap.dedent(code)], capture_output=True, encoding="utf-8")
+    assert res.returncode == 0, res.stderr
+    return json.loads(res.stdout)
+
+
+def test_lazy_names():
+    for module_name, names in ahk._LAZY_MODULES.items():
+        module = importlib.import_module(f"ahkpy.{module_name}")
+        if not names:
+            # The names of ahkpy.ipc and ahkpy.colors are not exported.
+            assert getattr(ahk, module_name) is module
+            continue
+        assert sorted(names) == sorted(getattr(module, "__all__", [])), module_name
+        for name in names:
+            assert getattr(ahk, name) is getattr(module, name)
+
+    assert isinstance(ahk.hotkey, type(ahk.default_context.hotkey))
+    assert ahk.hotkey == ahk.default_context.hotkey
+    assert ahk.hotstring == ahk.default_context.hotstring
+    assert ahk.remap_key == ahk.default_context.remap_key
+    assert callable(ahk.block_input)
+    assert callable(ahk.message_box)
+    assert "Window" in dir(ahk)
+    assert "ipc" in dir(ahk)
+    with pytest.raises(AttributeError, match="module 'ahkpy' has no attribute 'nope'"):
+        ahk.nope
+
+
+def test_star_import():
+    namespace = {}
+    exec("from ahkpy import *", namespace)
+    assert namespace["Window"] is ahk.Window
+    assert namespace["set_timer"] is ahk.set_timer
+    assert namespace["hotkey"] == ahk.default_context.hotkey
+    assert namespace["Error"] is ahk.Error
+
+
+def test_import_budget():
+    # Only the modules needed to register the hotkeys are imported eagerly.
+    modules = run_python("""\
+        import json, sys
+        import ahkpy
+        print(json.dumps(sorted(name for name in sys.modules if name.startswith("ahkpy."))))
+    """)
+    assert modules == [
+        "ahkpy.block_input",
+        "ahkpy.exceptions",
+        "ahkpy.flow",
+        "ahkpy.hotkey",
+        "ahkpy.hotkey_context",
+        "ahkpy.hotstring",
+        "ahkpy.key_state",
+        "ahkpy.message_box",
+        "ahkpy.remap_key",
+        "ahkpy.sending",
+        "ahkpy.settings",
+        "ahkpy.unset",
+        "ahkpy.window_message",
+    ]
+
+
+def test_numpy_not_imported():
+    # NumPy is imported only by the functions that need it.
+    modules = run_python("""\
+        import json, sys
+        import ahkpy
+        ahkpy.get_mouse_pos, ahkpy.MouseSampler, ahkpy.screen.Screenshot
+        print(json.dumps(sorted(name for name in sys.modules if name.split(".")[0] == "numpy")))
+    """)
+    assert modules == []
+
+
+def test_import_time_benchmark():
+    measure = """\
+        import json, sys, time
+        start = time.perf_counter()
+        import ahkpy
+        {extra}
+        print(json.dumps(time.perf_counter() - start))
+    """
+    lazy = min(run_python(measure.format(extra="")) for _ in range(3))
+    full = min(
+        run_python(measure.format(extra="[getattr(ahkpy, name) for name in ahkpy.__all__]"))
+        for _ in range(3)
+    )
+    print(f"import ahkpy: {lazy * 1000:.1f} ms, with all modules: {full * 1000:.1f} ms")
+    assert lazy < full
@@ -0,0 +1,120 @@
+import pytest
+
+import ahkpy as ahk
+from ahkpy import macro
+
+
+@pytest.fixture
+def sample_macro():
+    m = ahk.Macro()
+    m.append(macro.MOUSE_MOVE, 0, 10, 10)
+    m.append(macro.MOUSE_MOVE, 5, 20, 20)
+    m.append(macro.MOUSE_DOWN, 3, 0)
+    m.append(macro.MOUSE_UP, 50, 0)
+    m.append(macro.KEY_DOWN, 500, 0x41, 0x1e)
+    m.append(macro.KEY_UP, 2, 0x41, 0x1e)
+    m.append(macro.MOUSE_WHEEL, 0, 1)
+    return m
+
+
+def test_to_bytes(sample_macro):
+    data = sample_macro.to_bytes()
+    assert len(data) == macro.HEADER.size + 13 * len(sample_macro)
+
+    restored = ahk.Macro.from_bytes(data)
+    assert list(restored) == list(sample_macro)
+    assert restored.duration == 0.56
+
+    with pytest.raises(ValueError, match="data is not a macro"):
+        ahk.Macro.from_bytes(b"nooo")
+    with pytest.raises(ValueError, match="macro data is truncated"):
+        ahk.Macro.from_bytes(data[:-1])
+    with pytest.raises(ValueError, match="9 is not a valid event kind"):
+        sample_macro.append(9, 0)
+
+
+def test_compile(sample_macro):
+    assert sample_macro._compile() == [
+        (0.0, "{Blind}{Click 20 20 0}{Click Left down}"),
+        (0.058, "{Blind}{Click Left up}"),
+        (0.558, "{Blind}{vk41sc01E down}{vk41sc01E up}{Click WheelDown}"),
+    ]
+
+    chunks = sample_macro._compile(speed=2)
+    assert [round(chunk_time, 3) for chunk_time, _ in chunks] == [0.0, 0.029, 0.279]
+
+    assert sample_macro._compile(speed=None) == [
+        (0.0, "{Blind}{Click 20 20 0}{Click Left down}{Click Left up}"
+              "{vk41sc01E down}{vk41sc01E up}{Click WheelDown}"),
+    ]
+
+
+def test_replay_validation(sample_macro):
+    with pytest.raises(ValueError, match="speed must be positive"):
+        ahk.replay(sample_macro, speed=0)
+
+
+def test_record_mouse_hotkeys(monkeypatch):
+    class FakeHotkey:
+        def __init__(self, context):
+            self.context = context
+            self.enabled = True
+
+        def enable(self):
+            self.enabled = True
+
+        def disable(self):
+            self.enabled = False
+
+    monkeypatch.setattr(macro.HotkeyContext, "hotkey", lambda self, key_name, func: FakeHotkey(self))
+    monkeypatch.setattr(macro, "_mouse_hotkeys", [])
+    monkeypatch.setattr(macro, "_mouse_recorders", set())
+
+    # The mouse hotkeys are created once for all recorders.
+    first = ahk.MacroRecorder()
+    second = ahk.MacroRecorder()
+    for _ in range(3):
+        macro._add_mouse_recorder(first)
+        macro._add_mouse_recorder(second)
+        contexts = [hk.context for hk in macro._mouse_hotkeys]
+        assert len(contexts) == len(macro.MOUSE_HOTKEYS)
+        assert all(hk.enabled for hk in macro._mouse_hotkeys)
+        macro._remove_mouse_recorder(first)
+        assert all(hk.enabled for hk in macro._mouse_hotkeys)
+        macro._remove_mouse_recorder(second)
+        macro._remove_mouse_recorder(second)
+        assert not any(hk.enabled for hk in macro._mouse_hotkeys)
+    assert [hk.context for hk in macro._mouse_hotkeys] == contexts
+
+    # The predicates record the events and don't let the hotkeys fire.
+    macro._add_mouse_recorder(first)
+    for key_name in ["*LButton", "*XButton1 Up", "*WheelDown"]:
+        hk = macro._mouse_hotkeys[list(macro.MOUSE_HOTKEYS).index(key_name)]
+        assert hk.context.active_when() is False
+    macro._remove_mouse_recorder(first)
+    assert [(kind, arg1) for kind, _, arg1, _ in first.macro] == [
+        (macro.MOUSE_DOWN, 0),
+        (macro.MOUSE_UP, 3),
+        (macro.MOUSE_WHEEL, 1),
+    ]
+    assert len(second.macro) == 0
+
+
+def test_record(request):
+    recorder = ahk.record(mouse=False)
+    request.addfinalizer(recorder.stop)
+    ahk.send("{F13}")
+    ahk.sleep(0)
+    m = recorder.stop()
+
+    assert [(kind, arg1) for kind, _, arg1, _ in m] == [
+        (macro.KEY_DOWN, 0x7c),
+        (macro.KEY_UP, 0x7c),
+    ]
+
+    times = []
+    hk = ahk.hotkey("F13", times.append, 1)
+    request.addfinalizer(hk.disable)
+    ahk.replay(m, speed=None, level=10)
+    ahk.sleep(0)
+    assert times == [1]
@@ -5,6 +5,7 @@ import pytest
 
 import ahkpy as ahk
 import _ahk
+from ahkpy import menu as menu_module
 
 
 def noop():
@@ -126,6 +127,315 @@ def test_chaining(call_spy):
     ])
 
 
+@pytest.fixture
+def menu_ops(monkeypatch):
+    # Collect the menu operations instead of applying them in AHK.
+    applied = []
+    monkeypatch.setattr(menu_module, "_apply_menu_ops", applied.extend)
+    return applied
+
+
+def test_build_spec(menu_ops):
+    def handler(item_name, item_pos, menu):
+        calls.append((item_name, item_pos))
+
+    calls = []
+    menu = ahk.Menu()
+    submenu = ahk.Menu()
+    menu.build([
+        ("Open", handler, {"default": True, "checked": True}),
+        None,
+        ("Recent", [
+            ("a.txt", handler),
+            ("b.txt", noop, {"enabled": False, "priority": 5}),
+        ]),
+        ("Sub", submenu, {"icon": "shell32.dll", "icon_number": 3, "icon_width": 16}),
+    ])
+
+    recent_name = menu_ops[2][1]
+    slots = [op[5] for op in menu_ops]
+    assert menu_ops == [
+        ("I", menu.name, "", "Open", "*", slots[0], "P0 -Radio -Break -BarBreak", "DC", "", "", ""),
+        ("I", menu.name, "", "", "", None),
+        # The submenu items go before the submenu.
+        ("I", recent_name, "", "a.txt", "*", slots[2], "P0 -Radio -Break -BarBreak", "", "", "", ""),
+        ("I", recent_name, "", "b.txt", "*", slots[3], "P5 -Radio -Break -BarBreak", "X", "", "", ""),
+        ("I", menu.name, "", "Recent", f":{recent_name}", None, "-Radio -Break -BarBreak", "", "", "", ""),
+        ("I", menu.name, "", "Sub", f":{submenu.name}", None, "-Radio -Break -BarBreak", "", "shell32.dll", "4", "16"),
+    ]
+    dispatch = menu_module._menu_dispatch
+    # The wrapper of the repeated callback is reused.
+    assert dispatch.callbacks[slots[0]] is dispatch.callbacks[slots[2]]
+    dispatch(slots[2], "a.txt", 1, recent_name)
+    assert calls == [("a.txt", 0)]
+
+    with pytest.raises(TypeError, match="unknown menu item options: colour"):
+        menu.build([("X", noop, {"colour": 1})])
+    with pytest.raises(TypeError, match="menu item must be None or a tuple"):
+        menu.build(["X"])
+    with pytest.raises(TypeError, match="menu item target must be"):
+        menu.build([("X", 1)])
+    with pytest.raises(ValueError, match="contains a control character"):
+        menu.build([("X\x1fY", noop)])
+    with pytest.raises(ValueError, match="submenu 'X' must not be empty"):
+        menu.build([("X", [])])
+
+
+def test_dynamic_submenu(menu_ops):
+    menu = ahk.Menu()
+    windows = []
+    provider_calls = []
+
+    def provider():
+        provider_calls.append(1)
+        return [(title, noop) for title in windows]
+
+    dynamic = menu_module._DynamicSubmenu(menu, provider, 1, "(empty)")
+    menu.build(dynamic.placeholder_spec())
+    menu_ops.clear()
+
+    windows[:] = ["Notepad", "Calculator", "Paint"]
+    dynamic.refresh(now=10)
+    # The placeholder is renamed and enabled.
+    assert [op[:5] for op in menu_ops] == [
+        ("R", menu.name, "1&", "Notepad"),
+        ("U", menu.name, "1&", "", "-X"),
+        ("I", menu.name, "", "Calculator", "*"),
+        ("I", menu.name, "", "Paint", "*"),
+    ]
+
+    # The result is cached.
+    menu_ops.clear()
+    windows.remove("Calculator")
+    dynamic.refresh(now=10.5)
+    assert provider_calls == [1]
+    assert menu_ops == []
+
+    # Only the changed items are deleted and inserted.
+    dynamic.refresh(now=11)
+    assert menu_ops == [("D", menu.name, "2&")]
+    menu_ops.clear()
+    windows.insert(1, "Word")
+    dynamic.refresh(now=12)
+    assert [op[:4] for op in menu_ops] == [("I", menu.name, "2&", "Word")]
+    menu_ops.clear()
+    dynamic.refresh(now=13)
+    assert menu_ops == []
+    assert [item.name for item in menu_module._menu_models[menu.name].items] == ["Notepad", "Word", "Paint"]
+
+    windows.clear()
+    dynamic.refresh(now=14)
+    assert [op[:5] for op in menu_ops] == [
+        ("D", menu.name, "3&"),
+        ("D", menu.name, "2&"),
+        ("R", menu.name, "1&", "(empty)"),
+        ("U", menu.name, "1&", "", "+X"),
+    ]
+
+
+def test_sync(menu_ops):
+    def handler(item_name, item_pos, menu):
+        calls.append((item_name, item_pos))
+
+    menu = ahk.Menu()
+    calls = []
+    menu.sync([
+        ("Open", noop, {"default": True}),
+        ("Save", noop),
+        None,
+        ("Recent", [("a.txt", noop), ("b.txt", noop)]),
+        None,
+        ("Exit", noop),
+    ])
+    recent = menu_module._menu_models[menu.name].items[3]
+    assert recent.owned
+    slots = [item.slot for item in menu_module._menu_models[menu.name].items]
+    menu_ops.clear()
+
+    menu.sync([
+        ("Exit", noop),
+        ("Open", handler, {"default": True, "checked": True}),
+        ("Save as", noop),
+        None,
+        ("Recent", [("b.txt", noop), ("c.txt", noop)]),
+        None,
+    ])
+    assert menu_ops == [
+        # "Exit" is moved to the top.
+        ("D", menu.name, "6&"),
+        ("U", menu.name, "1&", "", "+C", "", "", "", ""),
+        ("R", menu.name, "2&", "Save as"),
+        ("D", recent.kind[1:], "1&"),
+        ("I", recent.kind[1:], "", "c.txt", "*", menu_ops[4][5], "P0 -Radio -Break -BarBreak", "", "", "", ""),
+        ("I", menu.name, "1&", "Exit", "*", slots[5], "P0 -Radio -Break -BarBreak", "", "", "", ""),
+    ]
+    # The slots are reused and the callbacks are replaced.
+    items = menu_module._menu_models[menu.name].items
+    assert [item.slot for item in items] == [slots[5], slots[0], slots[1], None, None, None]
+    menu_module._menu_dispatch(slots[0], "Open", 2, menu.name)
+    assert calls == [("Open", 1)]
+
+    # Nothing to change.
+    menu_ops.clear()
+    menu.sync([
+        ("Exit", noop),
+        ("Open", noop, {"default": True, "checked": True}),
+        ("Save as", noop),
+        None,
+        ("Recent", [("b.txt", noop), ("c.txt", noop)]),
+        None,
+    ])
+    assert menu_ops == []
+
+    # The owned submenu is deleted with the item.
+    menu.sync([("Exit", noop), ("Save as", noop, {"default": True})])
+    assert menu_ops == [
+        ("D", menu.name, "6&"),
+        ("D", menu.name, "5&"),
+        ("Z", recent.kind[1:]),
+        ("D", menu.name, "4&"),
+        ("D", menu.name, "2&"),
+        ("U", menu.name, "2&", "", "+D"),
+    ]
+    assert recent.kind[1:] not in menu_module._menu_models
+
+    with pytest.raises(ValueError, match="duplicate menu item name 'exit'"):
+        menu.sync([("Exit", noop), ("exit", noop)])
+
+
+def test_sync_stale(menu_ops, monkeypatch):
+    menu = ahk.Menu()
+    menu.sync([("A", noop), ("B", noop)])
+    menu_ops.clear()
+    monkeypatch.setattr(menu_module, "ahk_call", lambda *args: None)
+    menu.add("C", noop)
+    menu.sync([("A", noop), ("B", noop)])
+    assert [op[:4] for op in menu_ops] == [
+        ("X", menu.name),
+        ("I", menu.name, "", "A"),
+        ("I", menu.name, "", "B"),
+    ]
+
+
+def test_sync_after_add(menu_ops, monkeypatch):
+    # The items added before the first sync shift the positions, so the menu
+    # is recreated.
+    monkeypatch.setattr(menu_module, "ahk_call", lambda *args: None)
+    menu = ahk.Menu()
+    menu.add("Foo", noop)
+    menu.sync([("A", noop), ("B", noop)])
+    assert [op[:4] for op in menu_ops] == [
+        ("X", menu.name),
+        ("I", menu.name, "", "A"),
+        ("I", menu.name, "", "B"),
+    ]
+    menu_ops.clear()
+    menu.sync([("B", noop)])
+    assert menu_ops == [("D", menu.name, "1&")]
+
+    # So is the tray menu with the items added at the startup.
+    menu_module._menu_models.pop("tray", None)
+    ahk.tray_menu.add("Exit", noop)
+    ahk.tray_menu.sync([("A", noop)])
+    assert menu_ops[1][:2] == ("X", "tray")
+    menu_module._forget_menu_model("tray")
+
+
+def test_dynamic_submenu_delete_parent(menu_ops, monkeypatch):
+    handles = iter(range(1000, 2000))
+    monkeypatch.setattr(menu_module, "ahk_call", lambda cmd, *args: next(handles) if cmd == "MenuGetHandle" else None)
+    monkeypatch.setattr(menu_module, "_watch_menu_popups", noop)
+
+    def dynamic_names(parent):
+        return [
+            dynamic.menu.name
+            for dynamic in menu_module._dynamic_submenus.values()
+            if dynamic.parent == parent
+        ]
+
+    menu = ahk.Menu()
+    menu.add_dynamic_submenu("Sub", lambda: [("Dynamic", noop)])
+    sub_name, = dynamic_names(menu)
+    assert sub_name in menu_module._menu_models
+    menu_ops.clear()
+    menu.delete_all_items()
+    assert dynamic_names(menu) == []
+    assert sub_name not in menu_module._menu_models
+    assert menu_ops == [("Z", sub_name)]
+
+    # Rebuilding the changed menu deletes its dynamic submenus too.
+    menu.add_dynamic_submenu("Sub", lambda: [("Dynamic", noop)])
+    sub_name, = dynamic_names(menu)
+    menu_ops.clear()
+    menu.sync([("A", noop)])
+    assert [op[:2] for op in menu_ops] == [("X", menu.name), ("Z", sub_name), ("I", menu.name)]
+    assert dynamic_names(menu) == []
+
+
+def test_sync_benchmark(menu_ops):
+    # Changing one item of a 300-item menu takes a couple of operations
+    # instead of 300 deletions and 300 insertions.
+    menu = ahk.Menu()
+    items = [(f"Snippet {i}", noop) for i in range(300)]
+    menu.sync(items)
+    assert len(menu_ops) == 300
+
+    menu_ops.clear()
+    items[150] = ("Snippet 150", noop, {"checked": True})
+    menu.sync(items)
+    assert menu_ops == [("U", menu.name, "151&", "", "+C", "", "", "", "")]
+
+    menu_ops.clear()
+    del items[10]
+    items.insert(200, ("New snippet", noop))
+    menu.sync(items)
+    assert [op[0] for op in menu_ops] == ["D", "I"]
+
+    menu_ops.clear()
+    items.append(items.pop(0))
+    menu.sync(items)
+    assert [op[:4] for op in menu_ops] == [
+        ("D", menu.name, "1&"),
+        ("I", menu.name, "", "Snippet 0"),
+    ]
+
+
+def test_dynamic_submenu_ahk(menu):
+    provided = []
+
+    def provider():
+        provided.append(1)
+        return [("Dynamic", noop)]
+
+    menu.add_dynamic_submenu("Sub", provider, max_age=0)
+    assert provided == []
+    handle, dynamic = next(
+        (handle, dynamic)
+        for handle, dynamic in menu_module._dynamic_submenus.items()
+        if dynamic.provider is provider
+    )
+    assert dynamic.menu.get_handle() == handle
+    menu_module._on_init_menu_popup(handle, 0, menu_module.WM_INITMENUPOPUP, 0)
+    assert provided == [1]
+    dynamic.menu.delete_menu()
+    assert handle not in menu_module._dynamic_submenus
+
+
+def test_build(call_spy, menu):
+    items = [(f"Snippet {i}", noop) for i in range(500)]
+    res = menu.build([
+        ("Snippets", items),
+        None,
+        ("E&xit", sys.exit, {"default": True}),
+    ])
+    assert res is menu
+    assert call_spy.call_count == 1
+    assert call_spy.mock_calls[0][1][0] == "MenuBuild"
+    handle = menu.get_handle()
+    assert isinstance(handle, int)
+    menu.update("E&xit", new_name="Quit")
+
+
 def test_insert(call_spy, menu):
     menu.add("Test", noop)
 
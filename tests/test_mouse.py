@@ -1,6 +1,10 @@
+from array import array
+
 import pytest
 
 import ahkpy as ahk
+import _ahk
+from ahkpy import mouse
 
 
 def test_click_validation():
@@ -74,6 +78,138 @@ def test_move():
         ahk.mouse_move(0, 0, relative_to="nooo")
 
 
+@pytest.fixture(params=["numpy", "python"])
+def path_backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(mouse, "_numpy", lambda: None)
+
+
+def test_mouse_path_points(path_backend):
+    path = mouse._compute_mouse_path([(0, 0), (100, 0)], 1, "linear", "polyline", 10)
+    assert path == [(x, 0) for x in range(0, 101, 10)]
+
+    path = mouse._compute_mouse_path([(0, 0), (100, 0), (100, 100)], 1, "linear", "polyline", 4)
+    assert path == [(0, 0), (50, 0), (100, 0), (100, 50), (100, 100)]
+
+    path = mouse._compute_mouse_path([(0, 0), (50, 100), (100, 0)], 1, "linear", "bezier", 2)
+    assert path == [(0, 0), (50, 50), (100, 0)]
+
+    path = mouse._compute_mouse_path([(0, 0), (100, 0)], 1, "ease_in_out", "polyline", 4)
+    assert path[0] == (0, 0)
+    assert path[2] == (50, 0)
+    assert path[-1] == (100, 0)
+    assert path[1][0] < 25
+
+    path = mouse._compute_mouse_path([(0, 0), (100, 0)], 1, lambda t: t ** 2, "polyline", 2)
+    assert path == [(0, 0), (25, 0), (100, 0)]
+
+    path = mouse._compute_mouse_path([(10, 10)], 0, "linear", "polyline", 120)
+    assert path == [(10, 10), (10, 10)]
+
+
+def test_mouse_path_validation():
+    with pytest.raises(ValueError, match="points must not be empty"):
+        ahk.mouse_path([])
+    with pytest.raises(ValueError, match="'nooo' is not a valid easing"):
+        ahk.mouse_path([(0, 0)], easing="nooo")
+    with pytest.raises(TypeError, match="easing must be"):
+        ahk.mouse_path([(0, 0)], easing=1)
+    with pytest.raises(ValueError, match="'nooo' is not a valid curve"):
+        ahk.mouse_path([(0, 0)], curve="nooo")
+    with pytest.raises(ValueError, match="duration must be positive"):
+        ahk.mouse_path([(0, 0)], duration=-1)
+    with pytest.raises(ValueError, match="'cursor' coord mode is not supported"):
+        ahk.mouse_path([(0, 0)], relative_to="cursor")
+    with pytest.raises(ValueError, match="'nooo' is not a valid mouse button"):
+        ahk.drag_path([(0, 0)], "nooo")
+
+
+def test_mouse_path(mocker):
+    call_spy = mocker.spy(_ahk, "call")
+    ahk.mouse_path([(0, 0), (300, 300)], duration=0.1, rate=100, relative_to="screen")
+    path_calls = [c for c in call_spy.call_args_list if c.args[0] == "MousePath"]
+    assert len(path_calls) == 1
+    points, interval = path_calls[0].args[1:]
+    assert len(points.split()) == 11
+    assert interval == pytest.approx(10)
+    assert ahk.get_mouse_pos(relative_to="screen") == (300, 300)
+
+
+def test_mouse_sampler_validation():
+    with pytest.raises(ValueError, match="hz must be positive"):
+        ahk.MouseSampler(hz=0)
+    with pytest.raises(ValueError, match="capacity must be greater than 1"):
+        ahk.MouseSampler(capacity=1)
+    with pytest.raises(ValueError, match="'nooo' is not a valid coord mode"):
+        ahk.MouseSampler(relative_to="nooo")
+
+
+def test_mouse_sampler_buffer(path_backend):
+    sampler = ahk.MouseSampler(hz=100, capacity=4)
+    assert sampler.interval == 0.01
+    assert sampler.last() is None
+    assert len(sampler) == 0
+
+    for i in range(6):
+        sampler.feed(i * 10, i * i, time=i / 100)
+    assert sampler.count == 6
+    assert len(sampler) == 4
+    assert sampler.last() == (50, 25)
+    assert sampler.dropped == 0
+
+    times, xs, ys = sampler.snapshot()
+    assert list(xs) == [20, 30, 40, 50]
+    assert list(ys) == [4, 9, 16, 25]
+    assert list(times) == pytest.approx([0.02, 0.03, 0.04, 0.05])
+
+    xs = array("i", [0] * 3)
+    ys = array("i", [0] * 3)
+    times = array("d", [0] * 3)
+    assert sampler.read_into(times, xs, ys) == 3
+    assert list(xs) == [30, 40, 50]
+
+    vx, vy = sampler.velocity()
+    assert list(vx) == pytest.approx([1000, 1000, 1000])
+    assert list(vy) == pytest.approx([500, 700, 900])
+    ax, ay = sampler.acceleration()
+    assert list(ax) == pytest.approx([0, 0], abs=1e-6)
+    assert list(ay) == pytest.approx([20000, 20000])
+
+    assert sampler.jitter == pytest.approx(0)
+    sampler.feed(60, 0, time=0.08)
+    assert sampler.dropped == 2
+    sampler.feed(70, 0, time=0.092)
+    # The interval with the dropped samples is skipped.
+    assert sampler.jitter == pytest.approx(0.001)
+
+
+def test_mouse_sampler(request):
+    ahk.mouse_move(100, 100, relative_to="screen")
+    sampler = ahk.MouseSampler(hz=50, with_window=True)
+    request.addfinalizer(sampler.stop)
+    sampler.start()
+    assert sampler.is_running
+    ahk.sleep(0.2)
+    ahk.mouse_move(200, 150, relative_to="screen")
+    ahk.sleep(0.2)
+    sampler.stop()
+    assert not sampler.is_running
+
+    count = sampler.count
+    assert count >= 10
+    assert sampler.last() == (200, 150)
+    assert sampler.last_window() == ahk.get_window_under_mouse()
+    times, xs, ys = sampler.snapshot()
+    assert (xs[0], ys[0]) == (100, 100)
+    assert list(times) == sorted(times)
+    assert sampler.jitter < sampler.interval
+
+    ahk.sleep(0.1)
+    assert sampler.count == count
+
+
 def test_get_mouse_pos(notepad):
     ahk.mouse_move(x=0, y=0, relative_to="window")
     x, y = ahk.get_mouse_pos(relative_to="screen")
@@ -0,0 +1,165 @@
+import datetime as dt
+import time
+
+import pytest
+
+import ahkpy as ahk
+
+
+class VirtualClock:
+    def __init__(self, when):
+        self.time = when.timestamp()
+
+    def __call__(self):
+        return self.time
+
+    def set(self, scheduler, when):
+        self.time = when.timestamp()
+        scheduler.run_pending()
+
+    def advance(self, scheduler, secs, step=1):
+        stop = self.time + secs
+        while self.time < stop:
+            self.time = min(stop, self.time + step)
+            scheduler.run_pending()
+
+
+def test_cron_spec():
+    spec = ahk.CronSpec("0 9 * * mon-fri")
+    # Saturday.
+    assert spec.next_after(dt.datetime(2023, 3, 11, 12, 0)) == dt.datetime(2023, 3, 13, 9, 0)
+    assert spec.next_after(dt.datetime(2023, 3, 13, 8, 59, 30)) == dt.datetime(2023, 3, 13, 9, 0)
+    assert spec.next_after(dt.datetime(2023, 3, 13, 9, 0)) == dt.datetime(2023, 3, 14, 9, 0)
+
+    spec = ahk.CronSpec("*/15 8-10 * * *")
+    assert spec.next_after(dt.datetime(2023, 3, 1, 8, 50)) == dt.datetime(2023, 3, 1, 9, 0)
+    assert spec.next_after(dt.datetime(2023, 3, 1, 10, 45)) == dt.datetime(2023, 3, 2, 8, 0)
+    assert spec.minutes == [0, 15, 30, 45]
+
+    # Either the day of month or the day of week must match.
+    spec = ahk.CronSpec("30 0 13 * fri")
+    assert spec.next_after(dt.datetime(2023, 3, 1)) == dt.datetime(2023, 3, 3, 0, 30)
+    assert spec.next_after(dt.datetime(2023, 3, 11)) == dt.datetime(2023, 3, 13, 0, 30)
+
+    assert ahk.CronSpec("0 0 29 feb *").next_after(dt.datetime(2023, 3, 1)) == dt.datetime(2024, 2, 29)
+    assert ahk.CronSpec("@monthly").next_after(dt.datetime(2023, 12, 5)) == dt.datetime(2024, 1, 1)
+    assert ahk.CronSpec("0 0 * * 7").weekdays == [0]
+    assert ahk.CronSpec("5/20,1 * * * *").minutes == [1, 5, 25, 45]
+
+    with pytest.raises(ValueError, match="expected 5 fields"):
+        ahk.CronSpec("* * * *")
+    with pytest.raises(ValueError, match="'60' is out of range"):
+        ahk.CronSpec("60 * * * *")
+    with pytest.raises(ValueError, match="invalid field 'x'"):
+        ahk.CronSpec("* x * * *")
+    with pytest.raises(ValueError, match="never matches"):
+        ahk.CronSpec("0 0 31 2 *").next_after(dt.datetime(2023, 1, 1))
+
+
+def test_schedule_cron():
+    clock = VirtualClock(dt.datetime(2023, 3, 1, 8, 59, 30))
+    scheduler = ahk.Scheduler(clock=clock)
+    calls = []
+
+    @scheduler.schedule("* * * * *")
+    def every_minute():
+        calls.append(dt.datetime.fromtimestamp(clock()))
+
+    assert isinstance(every_minute, ahk.Job)
+    assert every_minute.next_run == dt.datetime(2023, 3, 1, 9, 0)
+    clock.advance(scheduler, 140)
+    assert calls == [dt.datetime(2023, 3, 1, 9, 0), dt.datetime(2023, 3, 1, 9, 1)]
+
+    every_minute.stop()
+    assert not every_minute.is_running
+    assert every_minute.next_run is None
+    assert len(scheduler) == 0
+    clock.advance(scheduler, 60)
+    assert len(calls) == 2
+
+    with pytest.raises(TypeError, match="schedule must be a cron expression"):
+        scheduler.schedule([1], print)
+
+
+def test_schedule_aligned():
+    clock = VirtualClock(dt.datetime(2023, 3, 1, 23, 50))
+    scheduler = ahk.Scheduler(clock=clock)
+    calls = []
+    job = scheduler.schedule(dt.timedelta(minutes=7), lambda: calls.append(dt.datetime.fromtimestamp(clock())))
+    clock.advance(scheduler, 20 * 60, step=30)
+    assert calls == [
+        dt.datetime(2023, 3, 1, 23, 55),
+        # The runs are realigned at midnight.
+        dt.datetime(2023, 3, 2, 0, 0),
+        dt.datetime(2023, 3, 2, 0, 7),
+    ]
+    assert job.runs == 3
+
+    with pytest.raises(ValueError, match="interval must be positive"):
+        scheduler.schedule(0, print)
+    with pytest.raises(ValueError, match="not longer than a day"):
+        scheduler.schedule(dt.timedelta(days=2), print)
+
+
+def test_schedule_order():
+    clock = VirtualClock(dt.datetime(2023, 3, 1, 12, 0))
+    scheduler = ahk.Scheduler(clock=clock)
+    calls = []
+    once = scheduler.schedule(dt.datetime(2023, 3, 1, 12, 0, 30), calls.append, "once")
+    scheduler.schedule(60, calls.append, "minute")
+    scheduler.schedule(20, calls.append, "20 s")
+    assert [job.spec for job in scheduler.jobs] == [20, dt.datetime(2023, 3, 1, 12, 0, 30), 60]
+
+    clock.advance(scheduler, 60)
+    assert calls == ["20 s", "once", "20 s", "minute", "20 s"]
+    assert not once.is_running
+    assert len(scheduler) == 2
+
+
+def test_schedule_clock_jumps():
+    clock = VirtualClock(dt.datetime(2023, 3, 1, 12, 0))
+    scheduler = ahk.Scheduler(clock=clock)
+    calls = []
+    hourly = scheduler.schedule("@hourly", calls.append, "hourly")
+
+    # The computer was asleep for three and a half hours.
+    clock.set(scheduler, dt.datetime(2023, 3, 1, 15, 30))
+    assert calls == ["hourly"]
+    assert hourly.missed == 2
+    assert hourly.next_run == dt.datetime(2023, 3, 1, 16, 0)
+
+    # The clock was set back.
+    clock.set(scheduler, dt.datetime(2023, 3, 1, 9, 15))
+    assert hourly.next_run == dt.datetime(2023, 3, 1, 10, 0)
+    clock.set(scheduler, dt.datetime(2023, 3, 1, 10, 0))
+    assert calls == ["hourly", "hourly"]
+
+
+def test_schedule_errors(monkeypatch):
+    clock = VirtualClock(dt.datetime(2023, 3, 1, 12, 0))
+    scheduler = ahk.Scheduler(clock=clock)
+    errors = []
+    monkeypatch.setattr("sys.excepthook", lambda *args: errors.append(args[1]))
+    calls = []
+    scheduler.schedule(1, lambda: 1 / 0)
+    scheduler.schedule(1, calls.append, 1)
+    clock.advance(scheduler, 2)
+    assert len(errors) == 2
+    assert isinstance(errors[0], ZeroDivisionError)
+    assert calls == [1, 1]
+
+
+def test_schedule_ahk(request):
+    # The runs are aligned to the whole seconds. Start early in a second so
+    # that the sleep below covers exactly one run.
+    while not 0.1 <= time.time() % 1 < 0.3:
+        ahk.sleep(0.01)
+    calls = []
+    job = ahk.schedule(1, calls.append, 1)
+    request.addfinalizer(job.stop)
+    ahk.sleep(1.05)
+    assert calls == [1]
+    assert job.next_run.microsecond == 0
+    job.stop()
+    ahk.sleep(1)
+    assert calls == [1]
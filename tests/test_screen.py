@@ -0,0 +1,211 @@
+import pytest
+
+import ahkpy as ahk
+from ahkpy import colors, screen
+
+
+@pytest.fixture(params=["numpy", "python"])
+def search_backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(screen, "_numpy", lambda: None)
+
+
+class Framebuffer:
+    def __init__(self, width, height, color=(0, 0, 0)):
+        self.width = width
+        self.height = height
+        r, g, b = color
+        self.data = bytearray(bytes([b, g, r, 0]) * (width * height))
+        self.calls = 0
+
+    def fill(self, rect, color):
+        x, y, width, height = rect
+        r, g, b = color
+        for row in range(y, y + height):
+            start = (row * self.width + x) * 4
+            self.data[start:start+width*4] = bytes([b, g, r, 0]) * width
+
+    def __call__(self, x, y, width, height, buffer):
+        self.calls += 1
+        for row in range(height):
+            start = ((y + row) * self.width + x) * 4
+            buffer[row*width*4:(row+1)*width*4] = self.data[start:start+width*4]
+
+
+@pytest.fixture
+def framebuffer():
+    fb = Framebuffer(64, 48)
+    previous = screen.set_backend(fb)
+    yield fb
+    screen.set_backend(previous)
+
+
+def test_colors():
+    assert colors.to_hex(0, 128, 255) == "0080ff"
+    assert colors.to_tuple(colors.to_hex(1, 2, 3)) == (1, 2, 3)
+
+
+def test_capture(framebuffer):
+    framebuffer.fill((10, 5, 2, 3), (255, 0, 0))
+    shot = screen.capture((8, 4, 16, 8))
+    assert isinstance(shot, ahk.Screenshot)
+    assert shot.rect == (8, 4, 16, 8)
+    assert shot.get_pixel(8, 4) == (0, 0, 0)
+    assert shot.get_pixel(10, 5) == (255, 0, 0)
+    assert shot.get_pixel_hex(11, 7) == "ff0000"
+    with pytest.raises(ValueError, match=r"point \(0, 0\) is out of the captured area"):
+        shot.get_pixel(0, 0)
+
+    view = shot.buffer
+    assert view.shape == (8, 16, 4)
+    assert view[1, 2, 2] == 255
+
+    # The buffer is reused and the view sees the new pixels.
+    framebuffer.fill((8, 4, 1, 1), (0, 0, 9))
+    shot.refresh()
+    assert framebuffer.calls == 2
+    assert view[0, 0, 0] == 9
+
+    with pytest.raises(ValueError, match="rect size must be positive"):
+        screen.Screenshot((0, 0, 0, 10))
+    with pytest.raises(TypeError, match="backend must be callable"):
+        screen.set_backend(1)
+
+
+def test_pixel_search(framebuffer, search_backend):
+    framebuffer.fill((3, 2, 2, 2), (10, 20, 30))
+    framebuffer.fill((30, 40, 1, 1), (12, 18, 30))
+    # A false match of the "1e140a" bytes across the pixel boundary.
+    framebuffer.data[1:4] = bytes([30, 20, 10])
+    shot = screen.capture((0, 0, 64, 48))
+
+    assert shot.pixel_search((10, 20, 30)) == (3, 2)
+    assert shot.pixel_search("0a141e") == (3, 2)
+    assert shot.pixel_search_all((10, 20, 30)) == [(3, 2), (4, 2), (3, 3), (4, 3)]
+    assert shot.pixel_search_all((10, 20, 30), variation=2) == [(3, 2), (4, 2), (3, 3), (4, 3), (30, 40)]
+    assert shot.pixel_search((1, 2, 3)) is None
+
+    with pytest.raises(ValueError, match="variation must be between 0 and 255"):
+        shot.pixel_search((1, 2, 3), variation=256)
+    with pytest.raises(ValueError, match="color values must be between 0 and 255"):
+        shot.pixel_search((1, 2, 300))
+    with pytest.raises(TypeError, match="color values must be integers"):
+        shot.pixel_search((1, 2, 3.0))
+
+
+def test_image_search(framebuffer, search_backend):
+    framebuffer.fill((20, 10, 4, 3), (200, 100, 50))
+    framebuffer.fill((21, 11, 2, 1), (0, 255, 0))
+    # A partial match of the template.
+    framebuffer.fill((40, 30, 4, 3), (200, 100, 50))
+    template = screen.capture((20, 10, 4, 3))
+
+    framebuffer.fill((20, 10, 4, 3), (0, 0, 0))
+    framebuffer.fill((5, 30, 4, 3), (201, 99, 50))
+    framebuffer.fill((6, 31, 2, 1), (0, 254, 1))
+    shot = screen.capture((0, 0, 64, 48))
+    assert shot.image_search(template) is None
+    assert shot.image_search(template, variation=1) == (5, 30)
+
+    big = screen.capture((0, 0, 64, 48))
+    assert template.image_search(big) is None
+
+
+def test_diff(framebuffer, search_backend):
+    before = screen.capture((10, 10, 20, 20))
+    same = screen.capture((10, 10, 20, 20))
+    assert before.diff(same) is None
+
+    framebuffer.fill((12, 15, 3, 2), (1, 1, 1))
+    framebuffer.fill((20, 11, 1, 1), (50, 50, 50))
+    after = screen.capture((10, 10, 20, 20))
+    assert before.diff(after) == (12, 11, 9, 6)
+    assert before.diff(after, variation=1) == (20, 11, 1, 1)
+
+    with pytest.raises(ValueError, match="screenshots must be of the same size"):
+        before.diff(screen.capture((0, 0, 5, 5)))
+
+
+def test_capture_screen():
+    shot = screen.capture()
+    assert shot.width > 0 and shot.height > 0
+    pixel = shot.get_pixel(shot.width - 1, shot.height - 1)
+    assert all(0 <= c <= 255 for c in pixel)
+
+    area = screen.capture((0, 0, 10, 10))
+    assert area.get_pixel(5, 5) == shot.get_pixel(5, 5)
+
+
+def test_region_watcher(framebuffer, search_backend):
+    with pytest.raises(ValueError, match="threshold must be positive"):
+        screen.RegionWatcher((0, 0, 10, 10), threshold=0)
+    with pytest.raises(ValueError, match="intervals must satisfy"):
+        screen.RegionWatcher((0, 0, 10, 10), min_interval=1, max_interval=0.5)
+
+    watcher = screen.RegionWatcher((8, 8, 40, 30), tile_size=16, max_interval=0.1)
+    assert watcher.check() == []
+    assert watcher.frames == 2
+    assert watcher.tiles_compared == 0
+    assert watcher.interval == pytest.approx(0.015)
+
+    framebuffer.fill((30, 20, 2, 2), (255, 255, 255))
+    assert watcher.check() == [(24, 8, 16, 16)]
+    assert watcher.tiles_compared == 1
+    assert watcher.interval == 0.01
+
+    # Edge tiles are smaller than the tile size.
+    framebuffer.fill((46, 36, 3, 3), (255, 255, 255))
+    assert watcher.check() == [(40, 24, 8, 14)]
+    assert watcher.check() == []
+    for _ in range(10):
+        watcher.check()
+    assert watcher.interval == 0.1
+
+    # The reference frame is kept without update.
+    framebuffer.fill((8, 8, 1, 1), (1, 1, 1))
+    assert watcher.check(update=False) == [(8, 8, 16, 16)]
+    assert watcher.check(update=False) == [(8, 8, 16, 16)]
+
+
+def test_region_watcher_threshold(framebuffer, search_backend):
+    watcher = screen.RegionWatcher((0, 0, 64, 48), threshold=5, variation=10)
+    watcher.reset()
+    framebuffer.fill((0, 0, 4, 1), (255, 255, 255))
+    framebuffer.fill((40, 40, 10, 1), (5, 5, 5))
+    assert watcher.check(update=False) == []
+    # The hashes changed, but the pixels are within the variation.
+    assert watcher.tiles_compared == 2
+    framebuffer.fill((40, 40, 1, 1), (255, 255, 255))
+    assert watcher.check() == [(0, 0, 32, 32), (32, 32, 32, 16)]
+
+
+def test_region_watcher_tiles(framebuffer, search_backend):
+    # Only the tiles with the changed hashes are compared pixel by pixel.
+    fb = Framebuffer(640, 480)
+    screen.set_backend(fb)
+    watcher = screen.RegionWatcher((0, 0, 640, 480), tile_size=32)
+    watcher.reset()
+    for i in range(20):
+        fb.fill((i * 32, i * 24, 1, 1), (i, 255, 0))
+        assert len(watcher.check()) == 1
+    assert watcher.tiles_compared == 20
+
+
+def test_wait_change(child_ahk):
+    def code():
+        import ahkpy as ahk
+        import sys
+
+        ahk.hotkey("F24", sys.exit)
+        ahk.sleep(0.3)
+        ahk.ToolTip("hello", x=0, y=0, relative_to="screen").show()
+        print("ok00")
+
+    child_ahk.popen_code(code)
+    changed = screen.wait_change((0, 0, 200, 100), timeout=3)
+    assert changed
+    child_ahk.wait(0)
+    assert screen.wait_change((0, 0, 200, 100), timeout=0.1) == []
+    ahk.send("{F24}")
@@ -0,0 +1,173 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+
+from ahkpy import server as server_module
+
+
+class StubBackend:
+    def __init__(self):
+        self.calls = []
+        self.hotkeys = {}
+        self.batches = 0
+
+    @contextlib.contextmanager
+    def batch(self):
+        self.batches += 1
+        yield
+
+    def poll(self):
+        pass
+
+    def send(self, keys, **options):
+        self.calls.append((keys, options))
+
+    def windows(self, **criteria):
+        if criteria.get("title") == "Notepad":
+            return [{"id": 1, "title": "Notepad"}]
+        return []
+
+    def active_window(self):
+        return None
+
+    def hotkey(self, key, callback):
+        self.hotkeys[key] = callback
+        return key
+
+    def remove_hotkey(self, handle):
+        del self.hotkeys[handle]
+
+
+def run_with_client(server, func):
+    async def main():
+        loop = asyncio.get_running_loop()
+        address = loop.create_future()
+        task = loop.create_task(server.serve("127.0.0.1", 0, ready=address.set_result))
+        host, port = await address
+        try:
+            return await loop.run_in_executor(None, func, host, port, loop)
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    return asyncio.run(main())
+
+
+def test_pipeline():
+    backend = StubBackend()
+    server = server_module.RPCServer(backend, poll_interval=0)
+
+    def client_code(host, port, loop):
+        with server_module.Client(host, port) as client:
+            assert client.call("ping") == "pong"
+            results = client.pipeline([("send", {"keys": f"{{F{i % 12 + 1}}}"}) for i in range(100)])
+            assert results == [None] * 100
+            assert client.pipeline([
+                ("windows", {"title": "Notepad"}),
+                ("active_window", {}),
+                ("windows", {}),
+            ]) == [[{"id": 1, "title": "Notepad"}], None, []]
+
+            with pytest.raises(RuntimeError, match="LookupError: unknown method 'nope'"):
+                client.call("nope")
+            with pytest.raises(RuntimeError, match="TypeError"):
+                client.call("send", wrong=1)
+            return client.call("stats")
+
+    stats = run_with_client(server, client_code)
+    assert [keys for keys, _ in backend.calls[:3]] == ["{F1}", "{F2}", "{F3}"]
+    assert len(backend.calls) == 100
+    assert server.stats["send"].calls == 101
+    assert server.stats["send"].errors == 1
+    assert stats["methods"]["windows"]["calls"] == 2
+    assert stats["methods"]["ping"]["errors"] == 0
+    # The pipelined requests are executed in a few batches.
+    assert server.batches < 50
+    assert backend.batches == server.batches
+
+
+def test_hotkey_events():
+    backend = StubBackend()
+    server = server_module.RPCServer(backend, poll_interval=0)
+
+    def client_code(host, port, loop):
+        with server_module.Client(host, port) as client:
+            client.call("hotkey", key="F13")
+            assert list(backend.hotkeys) == ["F13"]
+            loop.call_soon_threadsafe(backend.hotkeys["F13"])
+            assert client.wait_event() == {"event": "hotkey", "key": "F13"}
+
+            client.call("hotkey", key="F14")
+            loop.call_soon_threadsafe(backend.hotkeys["F14"])
+            # The events that arrive before the responses are kept.
+            assert client.call("ping") == "pong"
+            assert client.events == [{"event": "hotkey", "key": "F14"}]
+
+            client.call("remove_hotkey", key="F13")
+            with pytest.raises(RuntimeError, match="hotkey 'F13' is not registered"):
+                client.call("remove_hotkey", key="F13")
+            assert list(backend.hotkeys) == ["F14"]
+
+        # The hotkeys are removed when the client disconnects.
+        for _ in range(100):
+            if not backend.hotkeys:
+                break
+            time.sleep(0.01)
+        assert backend.hotkeys == {}
+
+    run_with_client(server, client_code)
+
+
+def test_shared_hotkeys():
+    backend = StubBackend()
+    server = server_module.RPCServer(backend, poll_interval=0)
+
+    def client_code(host, port, loop):
+        with server_module.Client(host, port) as first, server_module.Client(host, port) as second:
+            first.call("hotkey", key="F13")
+            second.call("hotkey", key="f13")
+            # Both clients share a single AHK hotkey.
+            assert list(backend.hotkeys) == ["F13"]
+            loop.call_soon_threadsafe(backend.hotkeys["F13"])
+            assert first.wait_event() == {"event": "hotkey", "key": "F13"}
+            assert second.wait_event() == {"event": "hotkey", "key": "f13"}
+
+            second.call("remove_hotkey", key="F13")
+            assert list(backend.hotkeys) == ["F13"]
+            second.call("hotkey", key="F13")
+            first.close()
+            for _ in range(100):
+                if len(server._connections) == 1:
+                    break
+                time.sleep(0.01)
+            # The hotkey stays enabled for the second client.
+            assert list(backend.hotkeys) == ["F13"]
+            loop.call_soon_threadsafe(backend.hotkeys["F13"])
+            assert second.wait_event() == {"event": "hotkey", "key": "F13"}
+            second.call("remove_hotkey", key="F13")
+            assert backend.hotkeys == {}
+
+    run_with_client(server, client_code)
+
+
+def test_invalid_messages():
+    server = server_module.RPCServer(StubBackend(), poll_interval=0)
+
+    def client_code(host, port, loop):
+        with server_module.Client(host, port) as client:
+            client._sock.sendall(server_module.HEADER.pack(3) + b"{x}")
+            assert client._read_message()["error"]["type"] == "ValueError"
+            client._sock.sendall(server_module._encode([1, 2]))
+            assert client._read_message() == {
+                "id": None,
+                "error": {"type": "ValueError", "message": "invalid request"},
+            }
+            assert client.call("ping") == "pong"
+
+    run_with_client(server, client_code)
+
+    with pytest.raises(ValueError, match="max_batch must be positive"):
+        server_module.RPCServer(StubBackend(), max_batch=0)
@@ -3,6 +3,7 @@ import sys
 import pytest
 
 import ahkpy as ahk
+from ahkpy import timer as timer_module
 
 
 def test_validation():
@@ -135,3 +136,351 @@ def test_timer_returns(child_ahk):
     )
 
     ahk.send("{F24}")
+
+
+class VirtualClock:
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+    def advance(self, wheel, secs, step=0.01):
+        stop = self.time + secs
+        while self.time < stop - 1e-9:
+            self.time = min(stop, self.time + step)
+            wheel.tick()
+
+
+def test_timer_wheel_order():
+    clock = VirtualClock()
+    wheel = ahk.TimerWheel(resolution=0.01, clock=clock)
+    calls = []
+
+    wheel.set_countdown(0.05, calls.append, "low", priority=-1)
+    wheel.set_countdown(0.05, calls.append, "high", priority=10)
+    wheel.set_countdown(0.05, calls.append, "normal")
+    wheel.set_countdown(0.03, calls.append, "first")
+    assert len(wheel) == 4
+
+    clock.advance(wheel, 0.02)
+    assert calls == []
+    clock.advance(wheel, 0.01)
+    assert calls == ["first"]
+    # Skipping several ticks still fires the timers in the order of deadlines.
+    clock.time = 0.2
+    wheel.set_countdown(0, calls.append, "zero")
+    wheel.tick()
+    assert calls == ["first", "high", "normal", "low", "zero"]
+    assert len(wheel) == 0
+
+    wheel.set_countdown(0, calls.append, "next tick")
+    wheel.tick()
+    assert calls[-1] == "zero"
+    clock.time += 0.01
+    wheel.tick()
+    assert calls[-1] == "next tick"
+
+
+def test_timer_wheel_periodic():
+    clock = VirtualClock()
+    wheel = ahk.TimerWheel(resolution=0.01, clock=clock)
+    times = []
+
+    @wheel.set_timer(0.015)
+    def timer():
+        times.append(clock.time)
+
+    assert isinstance(timer, ahk.WheelTimer)
+    clock.advance(wheel, 1.5)
+    # The timer doesn't drift even if the interval is not a multiple of the
+    # resolution.
+    assert len(times) == 100
+    assert times[-1] == pytest.approx(1.5)
+
+    timer.update(interval=0.5)
+    times.clear()
+    clock.advance(wheel, 1.01)
+    assert times == [pytest.approx(2.0), pytest.approx(2.5)]
+
+    timer.update(priority=5)  # Doesn't restart the timer
+    clock.advance(wheel, 0.5)
+    assert times[-1] == pytest.approx(3.0)
+
+    timer.stop()
+    assert not timer.is_running
+    clock.advance(wheel, 1)
+    assert len(times) == 3
+
+    timer.start(interval=0.1, periodic=False)
+    clock.advance(wheel, 1)
+    assert len(times) == 4
+
+    with pytest.raises(ValueError, match="interval must be positive"):
+        timer.update(interval=-1)
+    with pytest.raises(TypeError, match="must not be None"):
+        ahk.WheelTimer(wheel).update()
+
+
+def test_timer_wheel_cancel():
+    clock = VirtualClock()
+    wheel = ahk.TimerWheel(resolution=0.01, clock=clock)
+    calls = []
+
+    victim = wheel.set_countdown(0.1, calls.append, "victim")
+    restarted = wheel.set_countdown(0.1, calls.append, "restarted")
+
+    @wheel.set_countdown(0.1, priority=1)
+    def killer():
+        calls.append("killer")
+        victim.stop()
+        restarted.start()
+
+    clock.advance(wheel, 0.1)
+    assert calls == ["killer"]
+    clock.advance(wheel, 0.1)
+    assert calls == ["killer", "restarted"]
+
+
+def test_timer_wheel_levels():
+    clock = VirtualClock()
+    wheel = ahk.TimerWheel(resolution=1, clock=clock)
+    fired = []
+    # Exercise every level of the wheel and the timers beyond its range.
+    intervals = [1, 255, 256, 300, 16383, 16384, 20000, 1 << 20, (1 << 26) + 5, 1 << 27]
+    for interval in reversed(intervals):
+        wheel.set_countdown(interval, fired.append, interval)
+
+    for interval in intervals:
+        clock.time = interval - 1
+        wheel.tick()
+        assert fired[-1:] != [interval]
+        clock.time = interval
+        wheel.tick()
+        assert fired[-1] == interval
+    assert fired == intervals
+
+
+def test_timer_wheel_many():
+    clock = VirtualClock()
+    wheel = ahk.TimerWheel(resolution=0.01, clock=clock)
+    count = 0
+
+    def inc():
+        nonlocal count
+        count += 1
+
+    timers = [wheel.set_timer(0.01 * (i % 100 + 1), inc) for i in range(5000)]
+    for t in timers[::2]:
+        t.stop()
+    assert len(wheel) == 2500
+    clock.advance(wheel, 1)
+    # Each of the 2500 timers fires 100 / (i % 100 + 1) times.
+    assert count == sum(100 // (i % 100 + 1) for i in range(1, 5000, 2))
+
+
+def test_timer_wheel_ahk():
+    wheel = ahk.TimerWheel()
+    times = []
+    timer = wheel.set_timer(0.05, times.append, 1)
+    ahk.sleep(0.26)
+    timer.stop()
+    assert 4 <= len(times) <= 5
+    ahk.sleep(0.05)
+    assert wheel._driver is None
+
+
+def test_wheel_timer_stats():
+    clock = VirtualClock()
+    wheel = ahk.TimerWheel(resolution=0.01, clock=clock)
+    skip_calls = []
+    catch_up_calls = []
+
+    def busy():
+        skip_calls.append(clock.time)
+        # The callback takes 15 ms.
+        clock.time += 0.015
+
+    skipping = wheel.set_timer(0.1, busy)
+    catching_up = wheel.set_timer(0.1, catch_up_calls.append, 1, catch_up=True)
+    clock.advance(wheel, 0.3)
+    assert len(skip_calls) == 3
+    assert len(catch_up_calls) == 3
+
+    # The main thread was busy for half a second.
+    clock.time += 0.5
+    wheel.tick()
+    assert len(skip_calls) == 4
+    assert len(catch_up_calls) == 4
+    clock.advance(wheel, 0.05)
+    assert len(skip_calls) == 4
+    # The missed periods are run on the next ticks.
+    assert len(catch_up_calls) == 8
+
+    stats = skipping.stats
+    assert stats.name == "test_wheel_timer_stats.<locals>.busy"
+    assert stats.calls == 4
+    assert stats.skipped == 4
+    assert stats.overruns == 0
+    assert stats.max_duration == pytest.approx(0.015)
+    assert stats.mean_duration == pytest.approx(0.015)
+    assert stats.max_lateness == pytest.approx(0.4, abs=0.02)
+    assert sum(count for _, count in stats.lateness_histogram) == 4
+    assert catching_up.stats.skipped == 0
+    assert catching_up.stats.calls == 8
+
+    report = ahk.get_timer_stats()
+    assert report.index(stats) < report.index(catching_up.stats)
+    assert "test_wheel_timer_stats.<locals>.busy" in ahk.timer_report()
+
+    stats.reset()
+    assert stats.calls == 0
+    assert stats.lateness_histogram[0] == (0.001, 0)
+
+
+def test_timer_stats(monkeypatch):
+    class FakeTime:
+        now = 100.0
+
+        def perf_counter(self):
+            return self.now
+
+    fake_time = FakeTime()
+    monkeypatch.setattr(timer_module, "time", fake_time)
+    calls = []
+    stats = ahk.TimerStats(calls.append)
+
+    def func():
+        calls.append(fake_time.now)
+        fake_time.now += 0.3
+
+    stats._schedule(100.5, 0.25, True, False)
+    fake_time.now = 101.0
+    timer_module._run_timer(func, stats)
+    assert calls == [101.0]
+    assert stats.calls == 1
+    assert stats.skipped == 2
+    assert stats.overruns == 1
+    assert stats.max_lateness == pytest.approx(0.5)
+    assert stats.last_scheduled == 100.5
+    assert stats.last_fired == 101.0
+    assert stats._scheduled == pytest.approx(101.25)
+
+    stats._schedule(101.25, 0.25, True, True)
+    fake_time.now = 101.8
+    timer_module._run_timer(func, stats)
+    # One call on time and two to catch up the missed periods, each timed
+    # separately.
+    assert calls[1:] == [101.8, pytest.approx(102.1), pytest.approx(102.4)]
+    assert stats.calls == 4
+    assert stats.skipped == 2
+    assert stats.overruns == 4
+    assert stats.total_duration == pytest.approx(1.2)
+    assert stats.max_duration == pytest.approx(0.3)
+    # The last catch-up call was scheduled at 101.75 and started at 102.4.
+    assert stats.max_lateness == pytest.approx(0.65)
+    assert stats.last_scheduled == pytest.approx(101.75)
+    assert stats._scheduled == pytest.approx(102.05)
+
+
+def test_timer_stats_ahk(request):
+    timer = ahk.set_timer(0.05, ahk.sleep, 0.01)
+    request.addfinalizer(timer.stop)
+    ahk.sleep(0.3)
+    timer.stop()
+    stats = timer.stats
+    assert stats.name == "sleep"
+    assert 4 <= stats.calls <= 6
+    assert stats.mean_duration >= 0.01
+    assert stats.overruns == 0
+
+
+def test_frame_loop():
+    clock = VirtualClock()
+    loop = ahk.FrameLoop(hz=100, clock=clock)
+    assert loop.budget == 0.01
+    calls = []
+
+    def task(name, cost):
+        calls.append(name)
+        clock.time += cost
+
+    loop.add(task, "low", 0, priority=-1)
+    loop.add(task, "every other", 0, every=2)
+    slow = loop.add(task, "slow", 0.006)
+    loop.add(task, "high", 0.005, priority=1)
+    assert [t.priority for t in loop.tasks] == [1, 0, 0, -1]
+
+    loop.tick()
+    # "slow" exhausted the budget, the rest are deferred.
+    assert calls == ["high", "every other", "slow"]
+    assert loop.overruns == 1
+    assert loop.frame_time == pytest.approx(0.011)
+    calls.clear()
+
+    clock.time += 0.01
+    loop.tick()
+    assert calls == ["low", "high", "slow"]
+    assert loop.overruns == 2
+    calls.clear()
+
+    low = loop.tasks[-1]
+    assert low.deferred == 1
+    assert low.stats.calls == 1
+    assert low.stats.max_lateness == pytest.approx(0.021)
+    assert slow.stats.mean_duration == pytest.approx(0.006)
+
+    slow.stop()
+    assert not slow.is_running
+    clock.time += 0.01
+    loop.tick()
+    assert calls == ["high", "every other", "low"]
+    assert loop.frames == 3
+    assert loop.overruns == 2
+    assert loop.max_frame_time == pytest.approx(0.011)
+    assert loop.mean_frame_time == pytest.approx((0.011 + 0.011 + 0.005) / 3)
+
+    loop.reset_stats()
+    assert loop.frames == 0
+
+    with pytest.raises(ValueError, match="every must be at least 1"):
+        loop.add(print, every=0)
+    with pytest.raises(ValueError, match="hz must be positive"):
+        ahk.FrameLoop(hz=0)
+
+
+def test_frame_loop_remove():
+    clock = VirtualClock()
+    loop = ahk.FrameLoop(hz=60, clock=clock)
+    calls = []
+
+    @loop.add
+    def first():
+        calls.append("first")
+        second.stop()
+
+    @loop.add
+    def second():
+        calls.append("second")
+
+    assert isinstance(first, ahk.FrameTask)
+    loop.tick()
+    assert calls == ["first"]
+    assert len(loop) == 1
+    second.start()
+    loop.tick()
+    assert calls == ["first", "first"]
+
+
+def test_frame_loop_ahk(request):
+    loop = ahk.FrameLoop(hz=50)
+    calls = []
+    task = loop.add(calls.append, 1)
+    request.addfinalizer(task.stop)
+    ahk.sleep(0.2)
+    assert 5 <= len(calls) <= 11
+    task.stop()
+    assert loop._driver is None
+    count = len(calls)
+    ahk.sleep(0.1)
+    assert len(calls) == count
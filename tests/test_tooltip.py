@@ -1,8 +1,199 @@
+import gc
 import os
+import queue
 
 import pytest
 
 import ahkpy as ahk
+from ahkpy import tooltip as tooltip_module
+
+
+class FakeBackend:
+    def __init__(self):
+        self.calls = []
+
+    def show(self, tooltip_id, text, x, y, relative_to):
+        self.calls.append(("show", tooltip_id, text, x, y))
+
+    def hide(self, tooltip_id):
+        self.calls.append(("hide", tooltip_id))
+
+
+class FakeTimer:
+    def __init__(self, interval, func):
+        self.interval = interval
+        self.func = func
+        self.running = True
+
+    def start(self, interval):
+        self.interval = interval
+
+    def stop(self):
+        self.running = False
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr(tooltip_module, "_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    fake = FakeTime()
+    timers = []
+
+    def set_timer(interval, func):
+        timers.append(FakeTimer(interval, func))
+        return timers[-1]
+
+    monkeypatch.setattr(tooltip_module, "time", fake)
+    monkeypatch.setattr(tooltip_module, "set_timer", set_timer)
+    monkeypatch.setattr(tooltip_module, "_live_tooltips", {})
+    monkeypatch.setattr(tooltip_module, "_live_flusher", None)
+    fake.timers = timers
+    return fake
+
+
+def test_live(fake_backend, fake_time):
+    tt = ahk.ToolTip(live=True, max_fps=10)
+    tt.show("a", x=1, y=1)
+    assert fake_backend.calls == [("show", tt._id, "a", 1, 1)]
+
+    # The same state is not sent again.
+    tt.show("a", x=1, y=1)
+    assert tt.suppressed == 1
+
+    # The updates within a frame are coalesced.
+    fake_time.now += 0.01
+    tt.show("b", x=2, y=2)
+    tt.show("c", x=3, y=3)
+    assert len(fake_backend.calls) == 1
+    assert tt.suppressed == 2
+    timer, = fake_time.timers
+    assert timer.interval == pytest.approx(0.1)
+
+    timer.func()
+    assert len(fake_backend.calls) == 1
+    fake_time.now += 0.1
+    timer.func()
+    assert fake_backend.calls[-1] == ("show", tt._id, "c", 3, 3)
+    assert not timer.running
+    assert tooltip_module._live_tooltips == {}
+
+    # The tooltip at the mouse cursor is always updated.
+    fake_time.now += 0.2
+    tt.show("c")
+    fake_time.now += 0.2
+    tt.show("c")
+    assert fake_backend.calls[-2:] == [
+        ("show", tt._id, "c", "", ""),
+        ("show", tt._id, "c", "", ""),
+    ]
+
+    # The timeout is handled by the flush timer.
+    tt.show("c", timeout=0.5)
+    timer = fake_time.timers[-1]
+    fake_time.now += 0.5
+    timer.func()
+    assert fake_backend.calls[-1][0] == "hide"
+    assert not timer.running
+
+    with pytest.raises(ValueError, match="max_fps must be positive"):
+        ahk.ToolTip(live=True, max_fps=0)
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    pool = queue.LifoQueue(maxsize=20)
+    for tooltip_id in range(20, 0, -1):
+        pool.put(tooltip_id)
+    monkeypatch.setattr(ahk.ToolTip, "_pool", pool)
+    monkeypatch.setattr(tooltip_module, "_virtual_slots", tooltip_module._VirtualSlots())
+    monkeypatch.setattr(tooltip_module, "_shown_tooltips", {})
+    return pool
+
+
+def test_virtual(fake_backend, fake_pool):
+    def visible():
+        shown = {}
+        for call in fake_backend.calls:
+            if call[0] == "show":
+                shown[call[1]] = call[2]
+            else:
+                shown.pop(call[1], None)
+        return sorted(shown.values())
+
+    hints = [ahk.ToolTip(f"hint{i:02}", x=i, y=i, virtual=True) for i in range(30)]
+    for hint in hints:
+        hint.show()
+    # The most recently shown tooltips are visible.
+    assert visible() == [f"hint{i:02}" for i in range(10, 30)]
+    assert fake_pool.empty()
+
+    # The higher priority wins over the recency.
+    hints[0].priority = 1
+    hints[0].show()
+    hints[1].show()
+    assert "hint00" in visible()
+    assert "hint01" in visible()
+    assert "hint10" not in visible()
+    assert "hint11" not in visible()
+
+    # The waiting tooltip of the lower priority doesn't take the slot.
+    low = ahk.ToolTip("low", virtual=True, priority=-1)
+    low.show()
+    assert "low" not in visible()
+
+    # The freed slot is given to the highest-ranked waiting tooltip.
+    hints[29].hide()
+    assert "hint29" not in visible()
+    assert "hint11" in visible()
+    assert len(visible()) == 20
+
+    # The tooltip that is not virtual takes the slot of the lowest-ranked
+    # virtual tooltip.
+    regular = ahk.ToolTip("regular")
+    regular.show()
+    assert "regular" in visible()
+    assert "hint11" not in visible()
+
+    # The slot of the garbage-collected tooltip is reused.
+    del hints[28]
+    gc.collect()
+    assert "hint28" not in visible()
+    assert "hint11" in visible()
+    assert len(visible()) == 20
+
+    for hint in hints:
+        hint.hide()
+    regular.hide()
+    assert visible() == ["low"]
+    low.hide()
+    assert visible() == []
+    assert fake_pool.qsize() == 20
+    assert tooltip_module._virtual_slots.waiting == {}
+
+
+def test_unreferenced(fake_backend, fake_pool):
+    # The regular tooltip stays shown after the object is dropped.
+    ahk.ToolTip("Loading...").show()
+    gc.collect()
+    assert [call[0] for call in fake_backend.calls] == ["show"]
+    assert fake_pool.qsize() == 19
+    tooltip, = tooltip_module._shown_tooltips.values()
+    tooltip.hide()
+    assert fake_pool.qsize() == 20
+    assert tooltip_module._shown_tooltips == {}
 
 
 def test_basic(request):
@@ -4,6 +4,7 @@ import sys
 import pytest
 
 import ahkpy as ahk
+from ahkpy import window_message
 
 
 def test_on_message(request):
@@ -47,6 +48,61 @@ def test_on_message(request):
     assert result == 0
 
 
+def test_message_filter():
+    f = ahk.MessageFilter(hwnds=[2, 1], w_param_mask=0xFFF0, w_param=0xF060)
+    assert f.hwnds == frozenset({1, 2})
+    with pytest.raises(ValueError, match="w_param must not have bits outside"):
+        ahk.MessageFilter(w_param_mask=0xF0, w_param=0x1)
+    with pytest.raises(ValueError, match="batch_interval must be positive"):
+        ahk.on_message(0x5555, batch_interval=0)
+    with pytest.raises(TypeError, match="filter must be a MessageFilter"):
+        ahk.on_message(0x5555, filter={"hwnds": [1]})
+
+    assert window_message._parse_message_batch("1 2 512 100\n3 -4 512 100\n") == [
+        (1, 2, 512, 100),
+        (3, -4, 512, 100),
+    ]
+    assert ahk.get_message_stats(0x5557) == ahk.MessageStats(0, 0, 0)
+
+
+def test_on_message_filter(request):
+    win = ahk.all_windows.first(pid=os.getpid())
+    args = []
+
+    @ahk.on_message(0x5557, filter=ahk.MessageFilter(hwnds={win.id}, w_param_mask=0xFF, w_param=0x10))
+    def handler(w_param, l_param, msg, hwnd):
+        args.append((w_param, l_param))
+        return 42
+
+    request.addfinalizer(handler.unregister)
+
+    assert win.send_message(0x5557, 0x110, 1) == 42
+    assert win.send_message(0x5557, 0x11, 2) == 0
+    assert args == [(0x110, 1)]
+    assert ahk.get_message_stats(0x5557) == ahk.MessageStats(delivered=1, filtered=1, batched=0)
+
+    handler.unregister()
+    assert win.send_message(0x5557, 0x10, 3) == 0
+    assert ahk.get_message_stats(0x5557).delivered == 1
+
+
+def test_on_message_batch(request):
+    win = ahk.all_windows.first(pid=os.getpid())
+    batches = []
+
+    @ahk.on_message(0x5558, batch_interval=0.05)
+    def handler(messages):
+        batches.append(messages)
+
+    request.addfinalizer(handler.unregister)
+
+    for i in range(5):
+        assert win.post_message(0x5558, i, 0)
+    ahk.sleep(0.1)
+    assert batches == [[(i, 0, 0x5558, win.id) for i in range(5)]]
+    assert ahk.get_message_stats(0x5558) == ahk.MessageStats(delivered=5, filtered=0, batched=5)
+
+
 def test_on_message_timeout(child_ahk):
     def code():
         import ahkpy as ahk